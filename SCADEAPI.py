@@ -1,11 +1,32 @@
 from logging import getLevelName
-import jpype, json
-import uuid, os, re
-from jpype.types import JInt
+import json
+import uuid, os, time, threading, atexit
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from SCADEBackend import get_backend
+from SCADETrace import log, tracer
+from SCADEParser import parse_dataflow, schedule_equations, equation_reads, DataflowScheduleError
+from SCADEIndex import index_project, file_signature
+from SCADELayout import LAYER_GAP, layered_layout, orthogonal_route, grid_layout, route_transitions, partition_graph, page_format
+
+# 编译后的类型表达式（不可变）：base 始终为基础类型名，sizes 为由内到外的数组维度，
+# base_type 为已解析的基础 Type 对象（仅 describe_type 填写，类型字符串编译时为 None）；
+# describe_type 遇到未解析的基础类型（NamedType 没有引用任何 Type）时 base 与 base_type 均为 None
+# 例如 "uint32^10^20" -> TypeDescriptor("uint32", ("10", "20"), None)
+TypeDescriptor = namedtuple("TypeDescriptor", ["base", "sizes", "base_type"], defaults=(None,))
+
+# 同一 JVM 内已加载的项目会话：.etp 绝对路径 -> 会话 dict
+# 会话保存 ResourceSet、project、mainModel、类型注册表以及各模型文件加载时的 mtime
+MODEL_SESSIONS = {}
 
 class SCADE_Builder:
-    def __init__(self):
-        #
+    def __init__(self, backend=None):
+        # 后端：提供下面这些工厂/工具类，"jpype"（默认）或 "memory"，也可直接传入后端对象
+        # 为 None 时读取环境变量 SCADE_BACKEND
+        if backend is None or isinstance(backend, str):
+            backend = get_backend(backend)
+        self.backend = backend
+
         self.URI = None
         self.ResourceSetImpl = None
         self.ScadeModelReader = None
@@ -35,9 +56,78 @@ class SCADE_Builder:
         self.current_canvas = None
         self.current_full_dir = "Package1::Operator1/"
 
-        # _Lx临时变量相关
+        # 路径解析缓存：规范化路径 -> (package, operator, canvas, 经过的对象)
+        # 创建/删除 Package、Operator、状态机、状态时由 invalidate_path_cache 精确失效，重新加载模型时清空
+        self.path_cache = {}
+
+        # 符号表：当前 Operator/canvas 下变量名 -> 变量对象的索引
+        # 选中 canvas 时构建一次，create_input/create_output/create_local/create_local_E 时增量维护
+        self.symbol_table = None
+
+        # create_dataFlow 中 pre/fby 反馈环的前向引用：当前等式允许引用的未创建变量，
+        # 以及待补全的 (变量名, IdExpression, 目标 GE, 输入下标)
+        self.forward_refs = frozenset()
+        self.pending_links = []
+
+        # 类型注册表：类型名（含 Package1::Type1 形式的限定名）-> Type 对象
+        # 加载/初始化模型时一次遍历建立，新增类型时通过 register_type 维护
+        self.type_registry = {}
+        # find_typeObject 遍历模型后仍未找到的类型名，避免对同一个不存在的名称反复遍历整个模型
+        # register_type / build_type_registry / 切换会话时清空
+        self.missing_types = set()
+
+        # 类型表达式编译缓存：类型字符串 -> TypeDescriptor，以及每个类型字符串的命中/未命中计数
+        self.type_expr_cache = {}
+        self.type_expr_stats = {}
+
+        # 当前项目的来源："load" / "init"（新建且从未写盘），第一次写盘后变为 "load"
+        self.project_dir = None
+        self.project_name = None
+        self.project_source = None
+
+        # 事务：begin_transaction 之后的 save_project 只记为待保存，commit_transaction 时统一写盘一次
+        self.in_transaction = False
+        self.deferred_saves = 0
+        # begin_transaction 时选中的路径，abort_transaction 后切回
+        self.transaction_path = None
+
+        # 脏资源记录：每次修改模型时登记被修改对象所在的 resource（URI 字符串 -> resource），
+        # save_project 只序列化这些 resource 和项目文件
+        self.dirty_resources = {}
+
+        # 异步写盘（write-behind）：开启后 save_project 只提交保存请求，由后台线程合并后写盘
+        # model_lock 保护对 EMF 模型的访问，后台写盘与工具调用互斥
+        self.model_lock = threading.RLock()
+        self.save_condition = threading.Condition()
+        self.write_behind = False
+        self.save_worker = None
+        self.flush_at_exit = False
+        self.pending_save_resources = {}
+        self.save_requested = 0
+        self.save_completed = 0
+        self.last_save_report = None
+        self.last_save_error = None
+
+        # _Lx临时变量相关：规范化路径 -> {左侧变量名: EquationGE}
+        # 首次访问某路径时由 get_ge_index 从 canvas 已有的 NetDiagram 建立，之后随新建的 GE 增量维护
         self.lx_to_ge = {}
-        self.lx_to_ge[self.current_full_dir] = {}
+
+        # patch 模式使用的已有数据流索引：规范化路径 -> {"equations", "duplicates", "ges", "edges", "diagram"}
+        # 首次 patch 时由 get_dataflow_index 建立，之后随增删的等式、GE、Edge 增量维护；非 patch 的 create_dataFlow 使其失效
+        self.dataflow_index = {}
+        # patch 时被修改的等式的左侧局部变量：变量名 -> Variable，重新生成等式时由 create_local_E 沿用同一个对象
+        self.reusable_locals = {}
+
+        # 只读项目索引（SCADEIndex.ProjectIndex）：不加载模型，直接流式解析磁盘上的 .etp/.xscade 得到
+        # get_project_index 再次调用时只重新解析变化的文件，各文件的部分索引持久化在 .etp 旁的 SQLite 缓存中
+        # use_project_index 为 True 时 load_project_and_model 顺带刷新索引，find_operator / find_typeObject /
+        # switch_to_operator_by_path 先用它排除不存在的名称，不必遍历 EMF 模型
+        self.project_index = None
+        self.use_project_index = True
+        # 显式调用 get_project_index / validate_project 重新解析索引时的进程数，
+        # None 表示使用 SCADEIndex.default_workers()（环境变量 SCADE_INDEX_WORKERS 或 CPU 数）；
+        # load_project_and_model 顺带的刷新始终串行，不启动进程池（spawn 会重新执行调用方未加 __main__ 保护的脚本）
+        self.index_workers = None
 
         self.counters = {}
 
@@ -97,132 +187,377 @@ class SCADE_Builder:
                   scade_lib_path=None,
                   current_dir=None):
         """
-        启动 JVM，并设置 classpath。
+        启动后端（jpype 后端启动 JVM 并设置 classpath，memory 后端无需启动）。
         可传入参数自定义路径，也可使用默认路径。
         """
-        if jpype.isJVMStarted():
-            print("⚠️ JVM 已启动，跳过")
-            return
-
-        # 默认值（可改为类属性或读取配置）
-        jvm_path = jvm_path or r"C:\Program Files\Java\jdk-11.0.2\bin\server\jvm.dll"
-        scade_lib_path = scade_lib_path or r"C:\Program Files\ANSYS Inc\v202\SCADE\contrib\lib\*"
-        current_dir = current_dir or os.getcwd()
-
-        jpype.startJVM(jvm_path, classpath=[scade_lib_path, current_dir])
-        self.jvm_started = True
-        print("✅ JVM 启动成功")
+        if self.backend.start(jvm_path, scade_lib_path, current_dir):
+            self.jvm_started = True
 
 
     def shutdown_jvm(self):
-        jpype.shutdownJVM()
-        print("✅ JVM 已关闭")
+        self.backend.shutdown()
 
 
     def init_scade_classes(self):
-        self.URI = jpype.JClass("org.eclipse.emf.common.util.URI")
-        self.ResourceSetImpl = jpype.JClass("org.eclipse.emf.ecore.resource.impl.ResourceSetImpl")
-
-        self.ScadeModelReader = jpype.JClass("com.esterel.scade.api.util.ScadeModelReader")
-        self.ScadeModelWriter = jpype.JClass("com.esterel.scade.api.util.ScadeModelWriter")
-
-        self.OperatorKind = jpype.JClass("com.esterel.scade.api.OperatorKind")
-
-        self.ScadePackage = jpype.JClass("com.esterel.scade.api.ScadePackage")
-        self.theScadeFactory = self.ScadePackage.eINSTANCE.getScadeFactory()
-
-        self.CodegenPragmasPackage = jpype.JClass("com.esterel.scade.api.pragmas.codegen.CodegenPragmasPackage")
-        self.theCodegenPragmasFactory = self.CodegenPragmasPackage.eINSTANCE.getCodegenPragmasFactory()
-
-        self.EditorPragmasPackage = jpype.JClass("com.esterel.scade.api.pragmas.editor.EditorPragmasPackage")
-        self.theEditorPragmasFactory = self.EditorPragmasPackage.eINSTANCE.getEditorPragmasFactory()
-
-        self.EditorPragmasUtil = jpype.JClass("com.esterel.scade.api.pragmas.editor.util.EditorPragmasUtil")
-        self.EcoreUtil = jpype.JClass("org.eclipse.emf.ecore.util.EcoreUtil")
+        # URI、ResourceSetImpl、ScadeModelReader/Writer、theScadeFactory、EcoreUtil 等均由后端提供
+        for name, value in self.backend.load_classes().items():
+            setattr(self, name, value)
 
 
     def init_project_and_model(self, project_dir: str, project_name: str):
+        self.project_dir, self.project_name, self.project_source = project_dir, project_name, "init"
+        self.project_index = None
+        self.dirty_resources = {}
+        self.path_cache = {}
+        self.lx_to_ge = {}
+        self.dataflow_index = {}
         self.baseURI = self.URI.createFileURI(project_dir)
         self.projectURI = self.baseURI.appendSegment(f"{project_name}.etp")
         self.resourceSet = self.ResourceSetImpl()
         self.project = self.ScadeModelWriter.createEmptyScadeProject(self.projectURI, self.resourceSet)
         self.mainModel = self.ScadeModelWriter.loadModel(self.projectURI, self.resourceSet)
-        print("✅ 项目和模型初始化完成")
+        self.build_type_registry()
+        log.info("✅ 项目和模型初始化完成")
 
 
     def load_project_and_model(self, project_dir: str, project_name: str):
         project_file = os.path.join(project_dir, f"{project_name}.etp")
         if not os.path.exists(project_file):
-            print(f"❌ 项目文件不存在: {project_file}")
+            log.error("❌ 项目文件不存在: %s", project_file)
+            return
+
+        self.project_dir, self.project_name, self.project_source = project_dir, project_name, "load"
+        self.dirty_resources = {}
+        self.path_cache = {}
+        self.lx_to_ge = {}
+        self.dataflow_index = {}
+        session_key = os.path.abspath(project_file)
+        session = MODEL_SESSIONS.get(session_key)
+        if session is not None and self.refresh_session(session):
+            self.activate_session(session)
+            self.refresh_project_index()
+            log.info("✅ 复用已加载的项目和模型")
             return
 
         self.baseURI = self.URI.createFileURI(project_dir)
         self.projectURI = self.baseURI.appendSegment(f"{project_name}.etp")
         self.resourceSet = self.ResourceSetImpl()
 
-        # 尝试只加载模型，跳过 getProject
-        self.mainModel = self.ScadeModelReader.loadModel(self.projectURI, self.resourceSet)
+        # 只解析一次：loadModel 会把项目和所有 .xscade 载入 resourceSet，getProject 直接复用
+        with tracer.span("load", project=project_name):
+            self.mainModel = self.ScadeModelReader.loadModel(self.projectURI, self.resourceSet)
         if self.mainModel is None:
-            print("❌ loadModel() 也失败了")
-        else:
-            print("✅ 只通过 loadModel() 加载模型成功")
-
+            log.error("❌ loadModel() 失败")
+            return
         self.project = self.ScadeModelReader.getProject(self.projectURI, self.resourceSet)
-        self.mainModel = self.ScadeModelReader.loadModel(self.projectURI, self.resourceSet)
-        print("✅ 项目和模型初始化完成")
+        self.refresh_project_index()
+        with tracer.span("resolve:type_registry"):
+            self.build_type_registry()
+
+        session = {
+            "project_file": session_key,
+            "baseURI": self.baseURI,
+            "projectURI": self.projectURI,
+            "resourceSet": self.resourceSet,
+            "project": self.project,
+            "mainModel": self.mainModel,
+            "type_registry": self.type_registry,
+            "mtimes": {},
+        }
+        self.remember_session_state(session)
+        MODEL_SESSIONS[session_key] = session
+        log.info("✅ 项目和模型初始化完成")
+
+
+    def get_project_index(self, project_dir: str = None, project_name: str = None, workers: int = None):
+        """
+        返回项目的只读索引（SCADEIndex.ProjectIndex），不需要 JVM，也不加载模型。
+        省略参数时使用当前项目；索引反映磁盘上的文件，内存中尚未保存的修改不在其中。
+        workers 为解析变化文件时的进程数，省略时使用 index_workers。
+        """
+        project_dir = project_dir or self.project_dir
+        project_name = project_name or self.project_name
+        if not project_dir or not project_name:
+            log.error("❌ 未指定项目")
+            return None
+        project_file = os.path.abspath(os.path.join(project_dir, f"{project_name}.etp"))
+        if not os.path.exists(project_file):
+            log.error("❌ 项目文件不存在: %s", project_file)
+            return None
+
+        previous = self.project_index
+        if previous is not None and previous.project_file != project_file:
+            previous = None
+        workers = workers if workers is not None else self.index_workers
+        self.project_index = index_project(project_file, previous, workers=workers)
+        return self.project_index
+
+
+    def validate_project(self, project_dir: str = None, project_name: str = None, workers: int = None):
+        """
+        校验磁盘上的项目文件：按文件并行建立索引（逐文件检查），再做跨文件检查。
+        返回 [(严重程度, 文件, 路径, 说明)]，无法读取项目时返回 None。
+        """
+        index = self.get_project_index(project_dir, project_name, workers)
+        if index is None:
+            return None
+        with tracer.span("validate"):
+            issues = index.validate()
+        errors = sum(1 for issue in issues if issue[0] == "error")
+        log.info("✅ 项目校验完成: %s 个错误, %s 个警告", errors, len(issues) - errors)
+        return issues
+
+
+    def refresh_project_index(self):
+        """
+        use_project_index 开启时刷新当前项目的索引（未变化的文件直接取自缓存）；索引失败不影响模型加载。
+        加载时隐式调用，串行解析（workers=1）：进程池只用于显式的索引/校验调用。
+        """
+        if not self.use_project_index:
+            self.project_index = None
+            return None
+        try:
+            with tracer.span("index"):
+                return self.get_project_index(workers=1)
+        except (OSError, ET.ParseError) as exc:
+            log.warning("⚠️ 项目索引建立失败，查找时直接遍历模型: %s", exc)
+            self.project_index = None
+            return None
+
+
+    def index_covers(self, resource) -> bool:
+        """
+        项目索引对 resource 是否仍然准确：索引属于当前项目、该文件被完整索引过（XML 解析没有失败）且磁盘上没有变化，
+        内存中也没有尚未写盘的修改（包括事务中推迟的和异步写盘排队中的）。
+        """
+        index = self.project_index
+        if index is None or resource is None or self.projectURI is None:
+            return False
+        uri = resource.getURI()
+        if uri is None or not uri.isFile():
+            return False
+        key = str(uri)
+        if key in self.dirty_resources or key in self.pending_save_resources:
+            return False
+        path = os.path.abspath(str(uri.toFileString()))
+        persist_as = os.path.relpath(path, os.path.dirname(index.project_file))
+        if persist_as in index.unreadable:
+            return False
+        signature = index.signatures.get(persist_as)
+        return signature is not None and file_signature(path) == signature and \
+            os.path.abspath(str(self.projectURI.toFileString())) == index.project_file
+
+
+    def index_covers_model(self) -> bool:
+        """
+        项目索引是否覆盖整个已加载模型（每个 .xscade resource 都满足 index_covers）。
+        """
+        if self.project_index is None or self.resourceSet is None:
+            return False
+        for resource in self.resourceSet.getResources():
+            uri = resource.getURI()
+            if uri is not None and str(uri.toFileString()).endswith(".xscade") and not self.index_covers(resource):
+                return False
+        return True
+
+
+    def get_model_file_mtimes(self, resourceSet, project_file: str):
+        """
+        收集 resourceSet 中所有本地文件资源以及 .etp 的 mtime：文件路径 -> (mtime, resource)。
+        .etp 本身对应的 resource 记为 None。
+        """
+        mtimes = {project_file: (os.path.getmtime(project_file), None)}
+        for resource in resourceSet.getResources():
+            uri = resource.getURI()
+            if uri is None or not uri.isFile():
+                continue
+            path = os.path.abspath(str(uri.toFileString()))
+            if path == project_file or not os.path.exists(path):
+                continue
+            mtimes[path] = (os.path.getmtime(path), resource)
+        return mtimes
+
+
+    def remember_session_state(self, session=None):
+        """
+        记录会话当前对应的磁盘状态（加载或保存之后调用），并开启 EMF 的修改跟踪，
+        以便再次打开时识别出内存中尚未保存的改动。
+        """
+        if session is None:
+            session = self.get_current_session()
+            if session is None:
+                return
+        for resource in session["resourceSet"].getResources():
+            resource.setTrackingModification(True)
+        session["mtimes"] = self.get_model_file_mtimes(session["resourceSet"], session["project_file"])
+
+
+    def get_current_session(self):
+        for session in MODEL_SESSIONS.values():
+            if session["resourceSet"] == self.resourceSet:
+                return session
+        return None
+
+
+    def refresh_session(self, session):
+        """
+        对比会话记录的 mtime 与磁盘文件：
+        - 全部未变：直接复用
+        - 仅部分 .xscade 变化（或内存中有未保存改动）：只重新加载这些 resource，再由 loadModel 复用其余 resource
+        - .etp 变化或文件被删除：返回 False，由调用方完整重新加载
+        """
+        changed = []
+        for path, (mtime, resource) in session["mtimes"].items():
+            if not os.path.exists(path):
+                return False
+            if resource is None:
+                # .etp 本身变化（或项目有未保存改动）时整体重新加载
+                if os.path.getmtime(path) != mtime or session["project"].eResource().isModified():
+                    return False
+            elif os.path.getmtime(path) != mtime or resource.isModified():
+                changed.append(resource)
+
+        # 会话之后新建但从未保存的 resource（如 create_package）也说明内存与磁盘不一致
+        for resource in session["resourceSet"].getResources():
+            uri = resource.getURI()
+            if uri is not None and uri.isFile() and os.path.abspath(str(uri.toFileString())) not in session["mtimes"]:
+                return False
+
+        if not changed:
+            return True
+
+        for resource in changed:
+            log.debug("🟡 重新加载已变化的模型文件: %s", resource.getURI().toFileString())
+            resource.unload()
+            resource.load(None)
+
+        resourceSet = session["resourceSet"]
+        session["mainModel"] = self.ScadeModelReader.loadModel(session["projectURI"], resourceSet)
+        if session["mainModel"] is None:
+            return False
+        session["project"] = self.ScadeModelReader.getProject(session["projectURI"], resourceSet)
+        self.mainModel = session["mainModel"]
+        session["type_registry"] = self.build_type_registry()
+        self.remember_session_state(session)
+        return True
+
+
+    def activate_session(self, session):
+        self.baseURI = session["baseURI"]
+        self.projectURI = session["projectURI"]
+        self.resourceSet = session["resourceSet"]
+        self.project = session["project"]
+        self.mainModel = session["mainModel"]
+        self.type_registry = session["type_registry"]
+        self.missing_types = set()
+        self.symbol_table = None
+        self.path_cache = {}
+        self.lx_to_ge = {}
+        self.dataflow_index = {}
 
 
     def find_operator(self, op_name: str):
         if self.current_package is None:
-            print("❌ 当前未选中 Package")
+            log.error("❌ 当前未选中 Package")
+            return None
+        # 索引准确且其中没有该 Operator 时不必遍历包的声明
+        qualified_name = f"{self.get_qualified_name(self.current_package)}::{op_name}"
+        if self.index_covers(self.current_package.eResource()) and not self.project_index.contains("operators", qualified_name):
+            log.error("❌ 未找到 Operator: %s", op_name)
             return None
         declarations = self.current_package.getDeclarations()
         for decl in declarations:
             if decl.eClass().getName() == "Operator":
                 if decl.getName() == op_name:
-                    print(f"✅ 找到 Operator: {op_name}")
+                    log.info("✅ 找到 Operator: %s", op_name)
                     return decl
-        print(f"❌ 未找到 Operator: {op_name}")
+        log.error("❌ 未找到 Operator: %s", op_name)
         return None
 
 
     def switch_to_operator_by_path(self, path_str: str):
         """
-        递归切换到完整路径中指定的 Package、Operator 以及 Operator 内部的 canvas（状态机/状态等）。
+        递归切换到完整路径中指定的 Package、Operator 以及 Operator 内部的 canvas（状态/分支动作）。
         - 例如:
             "Package1::Package2::Operator3/SM1:State1:SM2:State2:SM3:State3:"
             1️⃣ :: 之前为包名
             2️⃣ / 之前是 Operator
-            3️⃣ / 之后以 : 分隔的为 Operator 内部 canvas 路径，可递归处理
+            3️⃣ / 之后以 : 分隔的为 Operator 内部 canvas 路径，可递归处理：
+               状态机名:状态名、WhenBlock 名:分支 pattern、IfBlock 名:then/else...
+        解析结果按规范化路径缓存在 path_cache 中，再次切换到同一路径时不再遍历模型。
         """
-        self.current_full_dir = path_str.strip()
-        self.lx_to_ge[self.current_full_dir] = {}
+        self.current_full_dir = self.normalize_path(path_str)
         if not path_str.strip():
-            print("❌ 空路径")
+            log.error("❌ 空路径")
             return None
 
-        # 拆分为 "Package::...::Operator/内部路径"
+        key = self.normalize_path(path_str)
+        entry = self.path_cache.get(key)
+        if entry is None:
+            entry = self.resolve_path(path_str)
+            if entry is None:
+                return None
+            if entry[3] is not None:
+                # 解析成功（含只到 Package 的情况）才缓存
+                self.path_cache[key] = entry
+
+        package, operator, canvas, chain = entry
+        self.current_package = package
+        if operator is None:
+            self.current_operator = None
+            self.current_canvas = None
+            self.symbol_table = None
+            log.info("✅ 只切换到了 Package: %s", package.getName())
+            return package
+
+        self.current_operator = operator
+        self.current_canvas = canvas
+        self.build_symbol_table()
+        if chain is None:
+            # canvas 路径中有找不到的段：停在已找到的部分，不缓存
+            return None
+        log.info("✅ 完成全路径切换: %s", path_str)
+        return canvas
+
+
+    def normalize_path(self, path_str: str):
+        """
+        规范化路径，作为 path_cache 的键："Package1::Operator1/SM1:S1:" -> "Package1::Operator1/SM1:S1"
+        """
         if "/" in path_str:
             package_op_part, canvas_part = path_str.split("/", 1)
         else:
-            package_op_part, canvas_part = path_str, None
+            package_op_part, canvas_part = path_str, ""
+        segments = [seg.strip() for seg in package_op_part.strip().split("::") if seg.strip()]
+        canvas_segments = [seg.strip() for seg in canvas_part.strip().split(":") if seg.strip()]
+        return "::".join(segments) + "/" + ":".join(canvas_segments)
+
 
-        # 处理 package 和 operator
-        segments = [seg for seg in package_op_part.strip().split("::") if seg]
+    def resolve_path(self, path_str: str):
+        """
+        在模型中解析路径，返回 (package, operator, canvas, chain)：
+        - 未找到 Operator 时 operator、canvas 为 None（只切换到 Package）
+        - chain 为路径上依次经过的全部对象，用于 invalidate_path_cache；canvas 路径中有段找不到时为 None
+        - 找不到 Package 时返回 None
+        """
+        # 拆分为 "Package::...::Operator/内部路径"
+        package_op_part, _, canvas_part = self.normalize_path(path_str).partition("/")
+        segments = [seg for seg in package_op_part.split("::") if seg]
         if len(segments) < 1:
-            print("❌ 路径中缺少包名")
+            log.error("❌ 路径中缺少包名")
             return None
 
         # 根包
         root_pkg_name = segments[0]
         current = None
         for obj in self.mainModel.getDeclarations():
-            if hasattr(obj, "getName") and obj.eClass().getName() == "Package" and obj.getName() == root_pkg_name:
+            if obj.eClass().getName() == "Package" and obj.getName() == root_pkg_name:
                 current = obj
                 break
         if current is None:
-            print(f"❌ 未找到根 Package: {root_pkg_name}")
+            log.error("❌ 未找到根 Package: %s", root_pkg_name)
             return None
+        chain = [current]
 
         # 递归进入中间包
         for pkg_name in segments[1:-1]:
@@ -232,87 +567,200 @@ class SCADE_Builder:
                     next_pkg = decl
                     break
             if next_pkg is None:
-                print(f"❌ 未找到子包: {pkg_name}")
+                log.error("❌ 未找到子包: %s", pkg_name)
                 return None
             current = next_pkg
+            chain.append(current)
 
-        # Operator
+        # Operator：索引准确且其中没有该 Operator 时只切换到 Package
         operator_name = segments[-1]
         operator_obj = None
+        if self.index_covers(current.eResource()) and \
+                not self.project_index.contains("operators", "::".join(segments)):
+            return current, None, None, tuple(chain)
         for op in current.getOperators():
             if op.getName() == operator_name:
                 operator_obj = op
                 break
         if operator_obj is None:
-            self.current_package = current
-            self.current_operator = None
-            self.current_canvas = None
-            print(f"✅ 只切换到了 Package: {current.getName()}")
-            return current
-
-        # 更新当前指针
-        self.current_package = current
-        self.current_operator = operator_obj
-        self.current_canvas = operator_obj
-        print(f"✅ 成功切换到 Operator: {self.current_operator.getName()}")
-
-        # 如果没有 canvas 部分，直接返回 Operator
-        if not canvas_part:
-            return self.current_operator
-
-        # 递归进入 Operator 内部 canvas（状态机、状态…）
-        canvas_segments = [seg for seg in canvas_part.strip(":").split(":") if seg]
-        current_obj = self.current_operator
-
-        for idx, seg in enumerate(canvas_segments):
-            # 检查当前对象是否有 getData() 且 data 下有 getStateMachines()
-            if hasattr(current_obj, "getData") and current_obj.getData() is not None:
-                # ⚠️ 假设 current_operator 已经是一个 Operator 或者 State，且已经加载到 Python 中
-                flows = current_obj.getData()  # EList<Flow>
-                for flow in flows:
-                    # 检查 flow 的类型
-                    eclass_name = flow.eClass().getName()
-                    if eclass_name == "StateMachine":
-                        print(f"✅ 找到 StateMachine: {flow.getName()}")
-                        if flow.getName() == seg:
-                            print(f"✅ 进入 StateMachine: {seg}")
-                            current_obj = flow
-                            break
-                    elif eclass_name == "WhenBlock":
-                        print(f"🔹 找到 WhenBlock: {flow.getName()}")
-                    elif eclass_name == "IfBlock":
-                        print(f"🔹 找到 IfBlock: {flow.getName()}")
-                    else:
-                        print(f"🔸 其他 Flow: {eclass_name}")
-                continue
+            return current, None, None, tuple(chain)
+        chain.append(operator_obj)
+        log.info("✅ 成功切换到 Operator: %s", operator_name)
+
+        # 递归进入 Operator 内部 canvas（状态机、状态、WhenBlock/IfBlock 分支…）
+        current_obj = operator_obj
+        canvas = operator_obj
+        for seg in [seg for seg in canvas_part.split(":") if seg]:
+            current_obj = self.find_canvas_child(current_obj, seg)
+            if current_obj is None:
+                log.error("❌ 当前对象下未找到: %s", seg)
+                return current, operator_obj, canvas, None
+            chain.append(current_obj)
+            # 状态和分支动作（Action）才是可以放置等式的 canvas
+            if current_obj.eClass().getName() in ("State", "Action"):
+                canvas = current_obj
+        return current, operator_obj, canvas, tuple(chain)
+
+
+    def find_canvas_child(self, obj, seg: str):
+        """
+        在 canvas 路径上从 obj 向下找一段：
+        - Operator / State / Action：getData() 中名为 seg 的 StateMachine、WhenBlock、IfBlock
+        - StateMachine：名为 seg 的 State
+        - WhenBlock：pattern 为 seg 的分支，返回其 Action
+        - IfBlock / IfNode：seg 为 then 或 else，到达分支时返回其 Action
+        """
+        eclass_name = obj.eClass().getName()
+        if eclass_name == "StateMachine":
+            for state in obj.getStates():
+                if state.getName() == seg:
+                    return state
+            return None
 
-            # 如果没有状态机匹配，检查是否为状态
-            if hasattr(current_obj, "getStates"):
-                states = current_obj.getStates()
-                for st in states:
-                    if st.getName() == seg:
-                        current_obj = st
-                        print(f"✅ 进入 State: {seg}")
-                        self.current_canvas = current_obj
-                        break
-                continue  # 继续处理下一个段
-
-            # 如果都没找到
-            print(f"❌ 当前对象下未找到: {seg}")
+        if eclass_name == "WhenBlock":
+            for branch in obj.getWhenBranches():
+                if self.get_pattern_text(branch.getPattern()) == seg:
+                    return branch.getAction()
             return None
 
-        print(f"✅ 完成全路径切换: {path_str}")
-        return self.current_canvas
+        if eclass_name in ("IfBlock", "IfNode"):
+            node = obj.getIfNode() if eclass_name == "IfBlock" else obj
+            if seg == "then":
+                child = node.getThen()
+            elif seg == "else":
+                child = node.getElse()
+            else:
+                return None
+            if child is not None and child.eClass().getName() == "IfBranch":
+                return child.getAction()
+            return child
+
+        if hasattr(obj, "getData"):
+            for flow in obj.getData():
+                if flow.eClass().getName() in ("StateMachine", "WhenBlock", "IfBlock") and flow.getName() == seg:
+                    return flow
+        return None
+
+
+    def get_pattern_text(self, pattern):
+        """
+        WhenBranch 的 pattern 转为路径中使用的文本：引用（枚举值等）取名称，常量取值。
+        """
+        if pattern is None:
+            return None
+        if hasattr(pattern, "getPath"):
+            target = pattern.getPath()
+            return target.getName() if target is not None else None
+        if hasattr(pattern, "getValue"):
+            return str(pattern.getValue())
+        return None
+
+
+    def invalidate_path_cache(self, obj=None):
+        """
+        模型结构变化后使路径缓存失效。obj 为 None 时清空；否则只丢弃受 obj 影响的条目：
+        - 路径上经过 obj 的条目（obj 被删除或移动）
+        - obj 为 Operator 时，其所在 Package 的“只到 Package”条目（同名路径现在可以解析到这个 Operator）
+        """
+        if obj is None:
+            self.path_cache = {}
+            return
+        container = obj.eContainer() if obj.eClass().getName() == "Operator" else None
+        for key, (package, operator, canvas, chain) in list(self.path_cache.items()):
+            if obj in chain or (operator is None and container is not None and package == container):
+                del self.path_cache[key]
+
+
+    def get_qualified_name(self, obj):
+        """
+        根据 eContainer() 链拼出 Package1::Package2::Name 形式的限定名。
+        """
+        names = [obj.getName()]
+        container = obj.eContainer()
+        while container is not None and container.eClass().getName() == "Package":
+            names.append(container.getName())
+            container = container.eContainer()
+        return "::".join(reversed(names))
+
+
+    def register_type(self, type_obj):
+        """
+        将 Type 同时以短名和限定名登记到类型注册表，短名重复时保留先登记的（与遍历顺序一致）。
+        """
+        self.missing_types.clear()
+        name = type_obj.getName()
+        self.type_registry.setdefault(name, type_obj)
+        qualified_name = self.get_qualified_name(type_obj)
+        if qualified_name != name:
+            self.type_registry.setdefault(qualified_name, type_obj)
+
+
+    def build_type_registry(self):
+        """
+        遍历一次整个模型，收集所有 Type 到类型注册表。
+        项目索引覆盖整个模型时只访问索引中声明了类型的 Package，不遍历 Operator 内部。
+        """
+        self.type_registry = {}
+        self.missing_types = set()
+        if self.mainModel is None:
+            return self.type_registry
+        if self.index_covers_model():
+            return self.build_type_registry_from_index()
+        allContents = self.EcoreUtil.getAllContents(self.mainModel, True)
+        while allContents.hasNext():
+            obj = allContents.next()
+            # 只取类名叫 "Type" 且有 getName 方法的对象
+            if hasattr(obj, "getName") and obj.eClass().getName() == "Type":
+                self.register_type(obj)
+        log.info("✅ 类型注册表建立完成，共 %s 项", len(self.type_registry))
+        return self.type_registry
+
+
+    def build_type_registry_from_index(self):
+        """
+        按项目索引登记类型：依模型顺序遍历 Package 树，只读取声明了类型的 Package 的声明列表，
+        最后登记预定义类型（与全模型遍历的登记顺序一致）。
+        """
+        type_packages = {name.rsplit("::", 1)[0] for name in self.project_index.types if "::" in name}
+
+        def visit(package, qualified_name):
+            for decl in package.getDeclarations():
+                kind = decl.eClass().getName()
+                if kind == "Package":
+                    visit(decl, f"{qualified_name}::{decl.getName()}")
+                elif kind == "Type" and qualified_name in type_packages:
+                    self.register_type(decl)
+
+        for package in self.mainModel.getPackages():
+            visit(package, package.getName())
+        if hasattr(self.mainModel, "getPredefinedTypes"):
+            for type_obj in self.mainModel.getPredefinedTypes():
+                self.register_type(type_obj)
+        log.info("✅ 类型注册表按项目索引建立完成，共 %s 项", len(self.type_registry))
+        return self.type_registry
 
 
     def find_typeObject(self, name: str):
+        type_obj = self.type_registry.get(name)
+        if type_obj is not None:
+            return type_obj
+        if name in self.missing_types:
+            return None
+
+        # 索引覆盖整个模型且其中没有该类型时，可以确定不存在，不必遍历
+        if self.index_covers_model() and not self.project_index.contains("types", name):
+            return None
+
+        # 注册表未命中（例如注册表建立后由外部加入的类型）时退回全模型遍历，找到后补登记
         allContents = self.EcoreUtil.getAllContents(self.mainModel, True)
         while allContents.hasNext():
             obj = allContents.next()
             # 只取类名叫 "Type" 且有 getName 方法的对象
             if hasattr(obj, "getName") and obj.eClass().getName() == "Type" :
-                if obj.getName() == name:
+                if obj.getName() == name or self.get_qualified_name(obj) == name:
+                    self.register_type(obj)
                     return obj
+        self.missing_types.add(name)
         return None
 
 
@@ -326,29 +774,66 @@ class SCADE_Builder:
         Package.setName(package_name)
         self.mainModel.getPackages().add(Package)
         resourcePackage.getContents().add(Package)
+        self.mark_dirty(Package)
+        self.invalidate_path_cache(Package)
         # 包 Pragma
         Package_Pragma = self.theEditorPragmasFactory.createPackage()
         Package_Pragma.setOid(self.generate_oid())
         Package_Pragma.getComments().add(f"This is {package_name}.")
         Package_Pragma.getComments().add("This package has been generated through the SCADE Eclipse/EMF API.")
         Package.getPragmas().add(Package_Pragma)
-        print(f"✅ Package {package_name} 创建完成")
+        log.info("✅ Package %s 创建完成", package_name)
         self.current_package = Package
         return Package
 
 
+    def compile_type_expression(self, type_name: str):
+        """
+        将类型字符串解析为 TypeDescriptor，每个不同的类型字符串只解析一次。
+        """
+        stats = self.type_expr_stats.get(type_name)
+        if stats is None:
+            stats = self.type_expr_stats[type_name] = {"hit": 0, "miss": 0}
+
+        descriptor = self.type_expr_cache.get(type_name)
+        if descriptor is not None:
+            stats["hit"] += 1
+            return descriptor
+
+        stats["miss"] += 1
+        segments = [seg.strip() for seg in type_name.split("^")]
+        descriptor = TypeDescriptor(segments[0], tuple(segments[1:]))  # ("Type1", ("3", "2"))
+        self.type_expr_cache[type_name] = descriptor
+        return descriptor
+
+
+    def get_type_cache_stats(self):
+        """
+        返回 {类型字符串: {"hit": n, "miss": m}}，用于观察类型表达式缓存的效果。
+        """
+        return {name: dict(stats) for name, stats in self.type_expr_stats.items()}
+
+
     def create_type_from_string(self, type_name: str):
         """
         将 Type1^3^2 转换成多维 Table 嵌套类型。
         - 最里层：NamedType(Type1)
         - 外层：Table（size=3）, Table（size=2）
+        类型字符串经 compile_type_expression 缓存，每次调用只生成一棵新的 EMF 包含树。
         """
-        segments = type_name.split("^")
-        base_type_name = segments[0]
-        sizes = segments[1:]  # ["3", "2"]
+        descriptor = self.compile_type_expression(type_name)
 
         # 找到最里层类型（Type1）
-        base_type = self.find_typeObject(base_type_name)
+        base_type = self.find_typeObject(descriptor.base)
+        return self.stamp_type(base_type, descriptor.sizes)
+
+
+    def stamp_type(self, base_type, sizes):
+        """
+        按 TypeDescriptor 生成新的 NamedType/Table 包含树，create_type_from_string 与 clone_type 共用。
+        - base_type: 最里层引用的 Type 对象
+        - sizes: 由内到外的数组维度
+        """
         current_type = self.theScadeFactory.createNamedType()
         current_type.setType(base_type)
 
@@ -432,13 +917,13 @@ class SCADE_Builder:
 
     def create_constant(self, constant_name: str, type_name: str, value: str):
         if self.current_package is None:
-            print("❌ 当前未选择 Package")
+            log.error("❌ 当前未选择 Package")
             return None
 
         # 名称重复检查
         for existing_constant in self.current_package.getConstants():
             if existing_constant.getName() == constant_name:
-                print(f"⚠️ 输入名 '{constant_name}' 已存在于 Package '{self.current_package.getName()}' 中，拒绝添加。")
+                log.warning("⚠️ 输入名 '%s' 已存在于 Package '%s' 中，拒绝添加。", constant_name, self.current_package.getName())
                 return existing_constant
 
         Constant = self.theScadeFactory.createConstant()
@@ -454,25 +939,26 @@ class SCADE_Builder:
 
         # 添加到当前包
         self.current_package.getDeclarations().add(Constant)
+        self.mark_dirty(Constant)
 
         # codegen pragma
         Constant_KCGPragma = self.theCodegenPragmasFactory.createPragma()
         Constant_KCGPragma.setData(f"C:name {constant_name}")
         Constant.getPragmas().add(Constant_KCGPragma)
 
-        print(f"✅ Constant '{constant_name}' 创建完成")
+        log.info("✅ Constant '%s' 创建完成", constant_name)
         return Constant
 
 
     def create_sensor(self, sensor_name: str, type_name: str):
         if self.current_package is None:
-            print("❌ 当前未选择 Package")
+            log.error("❌ 当前未选择 Package")
             return None
 
         # 名称重复检查
         for existing_sensor in self.current_package.getSensors():
             if existing_sensor.getName() == sensor_name:
-                print(f"⚠️ 输入名 '{sensor_name}' 已存在于 Package '{self.current_package.getName()}' 中，拒绝添加。")
+                log.warning("⚠️ 输入名 '%s' 已存在于 Package '%s' 中，拒绝添加。", sensor_name, self.current_package.getName())
                 return existing_sensor
 
         Sensor = self.theScadeFactory.createSensor()
@@ -484,51 +970,56 @@ class SCADE_Builder:
 
         # 添加到当前包
         self.current_package.getDeclarations().add(Sensor)
+        self.mark_dirty(Sensor)
 
         # codegen pragma
         Sensor_KCGPragma = self.theCodegenPragmasFactory.createPragma()
         Sensor_KCGPragma.setData(f"C:name {sensor_name}")
         Sensor.getPragmas().add(Sensor_KCGPragma)
 
-        print(f"✅ Constant '{sensor_name}' 创建完成")
+        log.info("✅ Constant '%s' 创建完成", sensor_name)
         return Sensor
 
 
     def create_operator(self, operator_name: str):
         if self.current_package is None:
-            print("❌ 当前未选择 Package")
+            log.error("❌ 当前未选择 Package")
             return None
 
         # 名称重复检查
         for existing_operator in self.current_package.getOperators():
             if existing_operator.getName() == operator_name:
-                print(f"⚠️ 输入名 '{operator_name}' 已存在于 Package '{self.current_package.getName()}' 中，拒绝添加。")
+                log.warning("⚠️ 输入名 '%s' 已存在于 Package '%s' 中，拒绝添加。", operator_name, self.current_package.getName())
                 return existing_operator
 
         Operator = self.theScadeFactory.createOperator()
         Operator.setName(operator_name)
         Operator.setKind(self.OperatorKind.NODE_LITERAL)
         self.current_package.getDeclarations().add(Operator)
+        self.mark_dirty(Operator)
+        self.invalidate_path_cache(Operator)
         # codegen pragma
         Operator_KCGPragma = self.theCodegenPragmasFactory.createPragma()
         Operator_KCGPragma.setData(f"C:name {operator_name}")
         Operator.getPragmas().add(Operator_KCGPragma)
-        print(f"✅ Operator {operator_name} 创建完成")
+        log.info("✅ Operator %s 创建完成", operator_name)
         self.current_operator = Operator
         self.current_canvas = Operator
+        self.current_full_dir = f"{self.get_qualified_name(self.current_package)}::{operator_name}/"
+        self.build_symbol_table()
         return Operator
 
 
     def create_input(self, input_name: str, type_name: str):
         if self.current_operator is None:
-            print("❌ 当前未选择 Operator")
+            log.error("❌ 当前未选择 Operator")
             return None
 
         # 名称重复检查
-        for existing_input in self.current_operator.getInputs():
-            if existing_input.getName() == input_name:
-                print(f"⚠️ 输入名 '{input_name}' 已存在于 Operator '{self.current_operator.getName()}' 中，拒绝添加。")
-                return existing_input
+        existing_input = self.get_symbol_table()["Input"].get(input_name)
+        if existing_input is not None:
+            log.warning("⚠️ 输入名 '%s' 已存在于 Operator '%s' 中，拒绝添加。", input_name, self.current_operator.getName())
+            return existing_input
 
         Input = self.theScadeFactory.createVariable()
         Input.setName(input_name)
@@ -538,19 +1029,21 @@ class SCADE_Builder:
         Input.setType(type_obj)
 
         self.current_operator.getInputs().add(Input)
+        self.mark_dirty(Input)
+        self.register_symbol("Input", Input)
         return Input
 
 
     def create_output(self, output_name: str, type_name: str):
         if self.current_operator is None:
-            print("❌ 当前未选择 Operator")
+            log.error("❌ 当前未选择 Operator")
             return None
 
         # 名称重复检查
-        for existing_output in self.current_operator.getOutputs():
-            if existing_output.getName() == output_name:
-                print(f"⚠️ 输入名 '{output_name}' 已存在于 Operator '{self.current_operator.getName()}' 中，拒绝添加。")
-                return existing_output
+        existing_output = self.get_symbol_table()["Output"].get(output_name)
+        if existing_output is not None:
+            log.warning("⚠️ 输入名 '%s' 已存在于 Operator '%s' 中，拒绝添加。", output_name, self.current_operator.getName())
+            return existing_output
 
         Output = self.theScadeFactory.createVariable()
         Output.setName(output_name)
@@ -560,20 +1053,22 @@ class SCADE_Builder:
         Output.setType(type_obj)
 
         self.current_operator.getOutputs().add(Output)
+        self.mark_dirty(Output)
+        self.register_symbol("Output", Output)
         return Output
 
 
     # 根据字符串创建
     def create_local(self, local_name: str, type_name: str):
         if self.current_canvas is None:
-            print("❌ 当前未选择 Operator")
+            log.error("❌ 当前未选择 Operator")
             return None
 
         # 名称重复检查
-        for existing_local in self.current_canvas.getLocals():
-            if existing_local.getName() == local_name:
-                print(f"⚠️ 输入名 '{local_name}' 已存在于 Canvas '{self.current_canvas.getName()}' 中，拒绝添加。")
-                return existing_local
+        existing_local = self.get_symbol_table()["Local"].get(local_name)
+        if existing_local is not None:
+            log.warning("⚠️ 输入名 '%s' 已存在于 Canvas '%s' 中，拒绝添加。", local_name, self.current_full_dir)
+            return existing_local
 
         Local = self.theScadeFactory.createVariable()
         Local.setName(local_name)
@@ -583,92 +1078,581 @@ class SCADE_Builder:
         Local.setType(type_obj)
 
         self.current_canvas.getLocals().add(Local)
+        self.mark_dirty(Local)
+        self.register_symbol("Local", Local)
         return Local
 
 
     # 根据类型创建，这里的type不是string
     def create_local_E(self, type_obj, local_name="Local1"):
         if self.current_canvas is None:
-            print("❌ 当前未选择 Operator")
+            log.error("❌ 当前未选择 Operator")
             return None
 
         # 名称重复检查
-        for existing_local in self.current_canvas.getLocals():
-            if existing_local.getName() == local_name:
-                print(f"⚠️ 输入名 '{local_name}' 已存在于 Canvas '{self.current_canvas.getName()}' 中，拒绝添加。")
-                return existing_local
+        existing_local = self.get_symbol_table()["Local"].get(local_name)
+        if existing_local is not None:
+            log.warning("⚠️ 输入名 '%s' 已存在于 Canvas '%s' 中，拒绝添加。", local_name, self.current_full_dir)
+            return existing_local
 
             # 使用 clone_type() 深拷贝，避免“引用转移”
         cloned_type = self.clone_type(type_obj)
 
+        # patch 时重新生成被修改的等式：沿用原来的变量对象，读取它的其他等式的引用保持有效
+        reused = self.reusable_locals.pop(local_name, None)
+        if reused is not None:
+            reused.setType(cloned_type)
+            self.mark_dirty(reused)
+            self.register_symbol("Local", reused)
+            return reused
+
         Local = self.theScadeFactory.createVariable()
         Local.setName(local_name)
         Local.setType(cloned_type)
         self.current_canvas.getLocals().add(Local)
+        self.mark_dirty(Local)
+        self.register_symbol("Local", Local)
         return Local
 
 
+    def resolve_type_strings(self, items, index: int = 1):
+        """
+        批量声明用：每个不同的类型字符串只解析一次，返回 {类型字符串: (基础 Type 对象, 数组维度)}。
+        每个变量仍需各自 stamp_type 生成一棵包含树（EMF 的包含关系不能共享）。
+        """
+        resolved = {}
+        for item in items:
+            type_name = item[index]
+            if type_name in resolved:
+                continue
+            descriptor = self.compile_type_expression(type_name)
+            base_type = self.find_typeObject(descriptor.base)
+            if base_type is None:
+                log.warning("⚠️ 未找到类型: %s", descriptor.base)
+            resolved[type_name] = (base_type, descriptor.sizes)
+        return resolved
+
+
+    def create_variables(self, kind: str, items):
+        """
+        批量创建 Input / Output / Local，items 为 [(name, type_name), ...]。
+        已存在或在本批中重复的名称跳过（与单个创建时一样返回已有的变量），重名检查为符号表和集合查找。
+        返回 {"objects": 按 items 顺序的变量对象列表, "created": 新建数, "skipped": 跳过数}。
+        """
+        if self.current_operator is None or self.current_canvas is None:
+            log.error("❌ 当前未选择 Operator")
+            return None
+
+        table = self.get_symbol_table()[kind]
+        container = {
+            "Input": self.current_operator.getInputs,
+            "Output": self.current_operator.getOutputs,
+            "Local": self.current_canvas.getLocals,
+        }[kind]()
+        types = self.resolve_type_strings(items)
+
+        variables = []
+        created = {}
+        skipped = 0
+        for name, type_name in items:
+            existing = table.get(name) or created.get(name)
+            if existing is not None:
+                skipped += 1
+                variables.append(existing)
+                continue
+            var = self.theScadeFactory.createVariable()
+            var.setName(name)
+            var.setType(self.stamp_type(*types[type_name]))
+            container.add(var)
+            created[name] = var
+            variables.append(var)
+
+        for var in created.values():
+            self.register_symbol(kind, var)
+        if created:
+            self.mark_dirty(next(iter(created.values())))
+        if skipped:
+            log.warning("⚠️ %s 个 %s 名称已存在或重复，已跳过", skipped, kind)
+        log.info("✅ 批量创建 %s %s 个", kind, len(created))
+        return {"objects": variables, "created": len(created), "skipped": skipped}
+
+
+    def create_inputs(self, items):
+        return self.create_variables("Input", items)
+
+
+    def create_outputs(self, items):
+        return self.create_variables("Output", items)
+
+
+    def create_locals(self, items):
+        return self.create_variables("Local", items)
+
+
+    def create_package_declarations(self, kind: str, items):
+        """
+        批量创建当前 Package 的 Constant / Sensor。
+        - Constant: items 为 [(name, type_name, value), ...]
+        - Sensor:   items 为 [(name, type_name), ...]
+        已有声明的名称只遍历一次放入集合。
+        返回 {"objects": 按 items 顺序的声明对象列表, "created": 新建数, "skipped": 跳过数}。
+        """
+        if self.current_package is None:
+            log.error("❌ 当前未选择 Package")
+            return None
+
+        existing = {}
+        for decl in (self.current_package.getConstants() if kind == "Constant" else self.current_package.getSensors()):
+            existing.setdefault(str(decl.getName()), decl)
+        types = self.resolve_type_strings(items)
+        declarations = self.current_package.getDeclarations()
+
+        results = []
+        skipped = 0
+        created = 0
+        for item in items:
+            name, type_name = item[0], item[1]
+            decl = existing.get(name)
+            if decl is not None:
+                skipped += 1
+                results.append(decl)
+                continue
+            type_obj = self.stamp_type(*types[type_name])
+            if kind == "Constant":
+                decl = self.theScadeFactory.createConstant()
+                decl.setType(type_obj)
+                decl.setValue(self.create_const_value_recursive(item[2], type_obj))
+            else:
+                decl = self.theScadeFactory.createSensor()
+                decl.setType(type_obj)
+            decl.setName(name)
+            declarations.add(decl)
+
+            # codegen pragma
+            KCGPragma = self.theCodegenPragmasFactory.createPragma()
+            KCGPragma.setData(f"C:name {name}")
+            decl.getPragmas().add(KCGPragma)
+            existing[name] = decl
+            results.append(decl)
+            created += 1
+
+        if created:
+            self.mark_dirty(self.current_package)
+        if skipped:
+            log.warning("⚠️ %s 个 %s 名称已存在或重复，已跳过", skipped, kind)
+        log.info("✅ 批量创建 %s %s 个", kind, created)
+        return {"objects": results, "created": created, "skipped": skipped}
+
+
+    def create_constants(self, items):
+        return self.create_package_declarations("Constant", items)
+
+
+    def create_sensors(self, items):
+        return self.create_package_declarations("Sensor", items)
+
+
+    def describe_type(self, type_obj):
+        """
+        将已有的 NamedType/Table 嵌套类型还原成 TypeDescriptor（base 为类型名，base_type 为被引用的 Type 对象）。
+        不支持的类型返回 None。
+        """
+        sizes = []
+        current = type_obj
+        type_name = current.eClass().getName()
+        while type_name == "Table":
+            sizes.append(current.getSize().getValue())  # 只复制 value
+            current = current.getType()
+            type_name = current.eClass().getName()
+        if type_name != "NamedType":
+            log.warning("⚠️ 不支持克隆的 Type 类型: %s", type_name)
+            return None
+        # sizes 当前为由外到内，TypeDescriptor 约定由内到外
+        base_type = current.getType()
+        # 未找到的类型（例如 create_input("I", "Unknown_T")）没有引用任何 Type，克隆时同样保持为空
+        base = str(base_type.getName()) if base_type is not None else None
+        return TypeDescriptor(base, tuple(reversed(sizes)), base_type)
+
+
     def clone_type(self, type_obj):
         """
         深度克隆 Type（NamedType、Table），包括 size 的深拷贝。
         """
-        type_name = type_obj.eClass().getName()
-        if type_name == "NamedType":
-            new_named_type = self.theScadeFactory.createNamedType()
-            new_named_type.setType(type_obj.getType())  # 这里可直接引用
-            return new_named_type
-        elif type_name == "Table":
-            new_table = self.theScadeFactory.createTable()
-            # 深拷贝 size
-            orig_size = type_obj.getSize()
-            new_size = self.theScadeFactory.createConstValue()
-            new_size.setValue(orig_size.getValue())  # 只复制 value
-            new_table.setSize(new_size)
-            # 递归克隆子类型
-            new_table.setType(self.clone_type(type_obj.getType()))
-            return new_table
-        else:
-            print(f"⚠️ 不支持克隆的 Type 类型: {type_name}")
+        descriptor = self.describe_type(type_obj)
+        if descriptor is None:
             return type_obj
+        return self.stamp_type(descriptor.base_type, descriptor.sizes)
+
+
+    def save_project(self, full: bool = False):
+        """
+        保存项目。默认只写 dirty_resources 中登记过的 resource 和项目文件，返回每个文件的写入耗时与字节数；
+        full=True 时按原方式 saveAll 写全部 resource。
+        """
+        if self.in_transaction:
+            self.deferred_saves += 1
+            log.debug("🟡 事务进行中，保存推迟到 commit_transaction")
+            return
+
+        if self.write_behind and not full:
+            return self.request_save()
+
+        with self.model_lock:
+            dirty_resources = self.dirty_resources
+            self.dirty_resources = {}
+            return self.write_project(dirty_resources, full)
+
+
+    def write_project(self, dirty_resources: dict, full: bool = False):
+        """
+        实际写盘，调用方需持有 model_lock。
+        """
+        with tracer.span("save", full=full, resources=len(dirty_resources)):
+            self.ScadeModelWriter.updateProjectWithModelFiles(self.project)
 
+            if full:
+                self.ScadeModelWriter.saveAll(self.project, None)
+                report = None
+            else:
+                # 只写被修改过的 resource，最后写项目文件
+                report = []
+                resources = list(dirty_resources.values()) + [self.project.eResource()]
+                for resource in resources:
+                    report.append(self.save_resource(resource))
+        if report is not None:
+            for entry in report:
+                log.debug("🟡 写入 %s: %s 字节, %.1f ms", entry['resource'], entry['bytes'], entry['seconds'] * 1000)
+
+        # 内存与磁盘一致，更新会话记录的 mtime，避免下次打开时误判为已变化
+        self.remember_session_state()
+        if self.project_source == "init":
+            self.project_source = "load"
+        log.info("✅ 项目保存完成")
+        return report
+
+
+    def set_write_behind(self, enabled: bool):
+        """
+        开启/关闭异步写盘。关闭时先等待已提交的保存完成。
+        注意：与 wait_saved 相同，关闭时调用方不能持有 model_lock。
+        """
+        if enabled and not self.write_behind:
+            self.write_behind = True
+            if self.save_worker is None or not self.save_worker.is_alive():
+                self.save_worker = threading.Thread(target=self.save_worker_loop, name="scade-save-worker", daemon=True)
+                self.save_worker.start()
+            if not self.flush_at_exit:
+                # 进程退出前把尚未落盘的保存写完；后台线程重启时不重复注册
+                atexit.register(self.flush)
+                self.flush_at_exit = True
+            log.info("✅ 已开启异步写盘")
+        elif not enabled and self.write_behind:
+            self.flush()
+            self.write_behind = False
+            log.info("✅ 已关闭异步写盘")
+
+
+    def set_xscade_writer(self, enabled: bool):
+        """
+        开启/关闭 memory 后端的 XSCADE 写盘：开启后 save_project 不经 JVM 直接把 Package 流式写成 .xscade，
+        并更新 .etp 的 FileRef 列表。jpype 后端由 ScadeModelWriter 写盘，不受影响。
+        """
+        if self.backend.name != "memory":
+            log.warning("⚠️ 只有 memory 后端支持 XSCADE 写出器，当前后端: %s", self.backend.name)
+            return False
+        import SCADEXscade
+        SCADEXscade.enable(enabled)
+        log.info("✅ 已开启 XSCADE 写盘" if enabled else "✅ 已关闭 XSCADE 写盘")
+        return True
 
-    def save_project(self):
-        self.ScadeModelWriter.updateProjectWithModelFiles(self.project)
-        self.ScadeModelWriter.saveAll(self.project, None)
-        print("✅ 项目保存完成")
+
+    def request_save(self):
+        """
+        提交一次异步保存：取走当前的脏资源快照，并入待保存集合后立即返回保存序号。
+        后台线程忙时连续提交的多次保存会合并为一次写盘。
+        """
+        with self.save_condition:
+            self.pending_save_resources.update(self.dirty_resources)
+            self.dirty_resources = {}
+            self.save_requested += 1
+            self.save_condition.notify_all()
+            log.debug("🟡 已提交异步保存 #%s", self.save_requested)
+            return self.save_requested
+
+
+    def save_worker_loop(self):
+        while True:
+            with self.save_condition:
+                while self.save_completed >= self.save_requested:
+                    self.save_condition.wait()
+
+            error = None
+            report = None
+            # 先取得 model_lock 再取走待保存的资源：begin_transaction 持锁把待保存的资源同步写盘，
+            # 若先取走再等锁，这批资源会在事务的修改之后才写出，事务中的修改随之落盘
+            with self.model_lock:
+                with self.save_condition:
+                    target = self.save_requested
+                    resources = self.pending_save_resources
+                    self.pending_save_resources = {}
+                if self.in_transaction:
+                    # 事务中不写盘：放回待保存集合，commit_transaction 时一起写出，abort_transaction 时丢弃
+                    with self.save_condition:
+                        for key, resource in resources.items():
+                            self.pending_save_resources.setdefault(key, resource)
+                    log.debug("🟡 事务进行中，异步保存推迟到 commit_transaction")
+                else:
+                    try:
+                        report = self.write_project(resources)
+                    except Exception as exc:
+                        error = exc
+                        log.error("❌ 异步保存失败: %s", exc)
+                        # 失败的资源放回去，下次保存时重试
+                        with self.save_condition:
+                            for key, resource in resources.items():
+                                self.pending_save_resources.setdefault(key, resource)
+
+            with self.save_condition:
+                self.save_completed = target
+                self.last_save_report = report
+                self.last_save_error = error
+                self.save_condition.notify_all()
+
+
+    def wait_saved(self, timeout: float = None):
+        """
+        等待目前为止提交的所有异步保存落盘。超时返回 False；最近一次写盘失败时抛出该异常。
+        注意：调用方不能持有 model_lock，否则后台线程无法写盘。
+        """
+        with self.save_condition:
+            target = self.save_requested
+            if not self.save_condition.wait_for(lambda: self.save_completed >= target, timeout):
+                return False
+            if self.last_save_error is not None:
+                error, self.last_save_error = self.last_save_error, None
+                raise error
+        return True
+
+
+    def flush(self, timeout: float = None):
+        """
+        把尚未提交的修改也提交保存，并等待全部落盘。
+        """
+        if self.write_behind:
+            # 事务中的修改由 commit_transaction 写盘
+            if self.dirty_resources and not self.in_transaction:
+                self.request_save()
+            return self.wait_saved(timeout)
+        return True
+
+
+    def mark_dirty(self, obj=None):
+        """
+        登记 obj 所在的 resource 为已修改；obj 尚未加入任何 resource 时退回到当前 canvas/Operator/Package 所在的 resource。
+        """
+        resource = obj.eResource() if obj is not None else None
+        if resource is None:
+            for owner in (self.current_canvas, self.current_operator, self.current_package):
+                if owner is not None and owner.eResource() is not None:
+                    resource = owner.eResource()
+                    break
+        if resource is None:
+            return None
+        self.dirty_resources.setdefault(str(resource.getURI()), resource)
+        return resource
+
+
+    def save_resource(self, resource):
+        """
+        保存单个 resource，返回 {"resource": 路径, "seconds": 耗时, "bytes": 文件大小}。
+        """
+        uri = resource.getURI()
+        path = str(uri.toFileString()) if uri.isFile() else str(uri)
+        start = time.perf_counter()
+        resource.save(None)
+        seconds = time.perf_counter() - start
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        return {"resource": path, "seconds": seconds, "bytes": size}
+
+
+    def begin_transaction(self):
+        """
+        开始事务：之后的修改照常作用于内存模型，但 save_project 不再写盘。
+        abort_transaction 从磁盘恢复，因此开始前先把尚未保存的修改（含新建后从未保存的项目）同步写盘，
+        使磁盘内容就是事务开始时的状态。
+        """
+        if self.in_transaction:
+            log.warning("⚠️ 事务已在进行中")
+            return False
+        # 异步写盘尚未处理的资源一并写出；后台线程只在持有 model_lock 时取走待保存的资源，
+        # 因此这里持锁取到的就是全部尚未落盘的修改，置位 in_transaction 之后后台线程不再写盘
+        with self.model_lock:
+            if self.mainModel is not None:
+                with self.save_condition:
+                    pending = self.pending_save_resources
+                    self.pending_save_resources = {}
+                pending.update(self.dirty_resources)
+                self.dirty_resources = {}
+                if pending or self.project_source == "init":
+                    self.write_project(pending)
+            self.in_transaction = True
+        self.transaction_path = self.current_full_dir
+        self.deferred_saves = 0
+        log.info("✅ 事务开始")
+        return True
+
+
+    def commit_transaction(self):
+        """
+        提交事务：把事务期间的所有修改一次性写盘，返回事务期间被推迟的保存次数。
+        """
+        if not self.in_transaction:
+            log.warning("⚠️ 当前没有进行中的事务")
+            return None
+        self.in_transaction = False
+        deferred_saves = self.deferred_saves
+        self.deferred_saves = 0
+        self.save_project()
+        log.info("✅ 事务提交完成，合并了 %s 次保存", deferred_saves)
+        return deferred_saves
+
+
+    def abort_transaction(self):
+        """
+        放弃事务：丢弃内存中的修改，从磁盘重新加载项目，恢复到 begin_transaction 时的状态，并尽量切回原路径。
+        """
+        if not self.in_transaction:
+            log.warning("⚠️ 当前没有进行中的事务")
+            return False
+        with self.model_lock:
+            self.in_transaction = False
+            self.deferred_saves = 0
+            self.dirty_resources = {}
+            # 事务期间排队的异步保存属于被丢弃的模型，不能再写盘
+            with self.save_condition:
+                self.pending_save_resources = {}
+
+        session = self.get_current_session()
+        if session is not None:
+            MODEL_SESSIONS.pop(session["project_file"], None)
+
+        self.current_package = None
+        self.current_operator = None
+        self.current_canvas = None
+        self.symbol_table = None
+        if self.project_source == "load":
+            self.load_project_and_model(self.project_dir, self.project_name)
+        elif self.project_source == "init":
+            self.init_project_and_model(self.project_dir, self.project_name)
+
+        self.current_full_dir = self.transaction_path
+        if self.mainModel is not None and self.current_full_dir:
+            self.switch_to_operator_by_path(self.current_full_dir)
+        log.info("✅ 事务已放弃，内存模型已恢复为事务开始时的状态")
+        return True
+
+
+    def build_symbol_table(self):
+        """
+        为当前 Operator/canvas 构建变量名索引，每类变量只遍历一次。
+        - Input / Output: Operator 的输入、输出
+        - OperatorLocal: Operator 自身的局部变量
+        - Local: 当前 canvas 的局部变量（canvas 就是 Operator 时与 OperatorLocal 共用同一个 dict）
+        同名变量只保留第一个，与逐个遍历时的查找结果一致。
+        """
+        if self.current_operator is None or self.current_canvas is None:
+            self.symbol_table = None
+            return None
+
+        table = {"Input": {}, "Output": {}, "OperatorLocal": {}}
+        for var in self.current_operator.getInputs():
+            table["Input"].setdefault(var.getName(), var)
+        for var in self.current_operator.getOutputs():
+            table["Output"].setdefault(var.getName(), var)
+        for var in self.current_operator.getLocals():
+            table["OperatorLocal"].setdefault(var.getName(), var)
+
+        if self.current_canvas == self.current_operator:
+            table["Local"] = table["OperatorLocal"]
+        else:
+            table["Local"] = {}
+            for var in self.current_canvas.getLocals():
+                table["Local"].setdefault(var.getName(), var)
+
+        self.symbol_table = table
+        return table
+
+
+    def get_symbol_table(self):
+        if self.symbol_table is None:
+            self.build_symbol_table()
+        return self.symbol_table
+
+
+    def register_symbol(self, kind: str, var):
+        """
+        新建变量后增量更新符号表，kind 为 'Input' / 'Output' / 'Local'（当前 canvas 的局部变量）。
+        """
+        table = self.get_symbol_table()
+        if table is not None:
+            table[kind].setdefault(var.getName(), var)
 
 
     def determine_var_kind(self, var_name):
         """
         判断给定变量名字是 Input、Local，还是不存在。
         返回 'Input' / 'Local' / 'NotFound'
+        查找顺序：输入 -> Operator 局部变量 -> canvas 局部变量 -> 输出，均为符号表上的 dict 查找。
         """
         if self.current_operator is None:
-            print("❌ 当前未选择 Operator")
+            log.error("❌ 当前未选择 Operator")
             return None
 
-        # 查找输入
-        for var in self.current_operator.getInputs():
-            if var.getName() == var_name:
-                return "Input", var
+        table = self.get_symbol_table()
+        for kind, key in (("Input", "Input"), ("Local", "OperatorLocal"), ("Local", "Local"), ("Output", "Output")):
+            var = table[key].get(var_name)
+            if var is not None:
+                return kind, var
 
-        # 查找局部变量
-        for var in self.current_operator.getLocals():
-            if var.getName() == var_name:
-                return "Local", var
+        # 都没找到
+        return "NotFound", None
 
-        # 查找局部变量
-        for var in self.current_canvas.getLocals():
-            if var.getName() == var_name:
-                return "Local", var
 
-        # 查找局部变量
-        for var in self.current_operator.getOutputs():
-            if var.getName() == var_name:
-                return "Output", var
+    def get_ge_index(self):
+        """
+        返回当前路径的 {左侧变量名: EquationGE} 索引，首次访问时由 build_ge_index 建立并按路径缓存。
+        """
+        index = self.lx_to_ge.get(self.current_full_dir)
+        if index is None:
+            index = self.lx_to_ge[self.current_full_dir] = self.build_ge_index()
+        return index
 
-        # 都没找到
-        return "NotFound", None
+
+    def build_ge_index(self, canvas=None):
+        """
+        遍历 canvas 上所有图形 pragma 的 NetDiagram，把每个 EquationGE 按其等式左侧的变量名登记。
+        同一个多输出等式的各个输出对应同一个 GE；同名只保留第一个。
+        """
+        canvas = canvas if canvas is not None else self.current_canvas
+        index = {}
+        if canvas is None:
+            return index
+        for pragma in canvas.getPragmas():
+            if not hasattr(pragma, "getDiagrams"):
+                continue
+            for diagram in pragma.getDiagrams():
+                if diagram.eClass().getName() != "NetDiagram":
+                    continue
+                for element in diagram.getPresentationElements():
+                    if element.eClass().getName() != "EquationGE":
+                        continue
+                    equation = element.getEquation()
+                    if equation is None:
+                        continue
+                    for var in equation.getLefts():
+                        index.setdefault(var.getName(), element)
+        log.debug("🟡 已从图中建立等式索引: %s 项", len(index))
+        return index
 
 
     # 用于创建和输入关联的等式
@@ -695,11 +1679,22 @@ class SCADE_Builder:
         size.setHeight(height)
         GE.setSize(size)
         self.Operator_Diagram.getPresentationElements().add(GE)
-        self.lx_to_ge[self.current_full_dir][varName] = GE
+        self.get_ge_index()[varName] = GE
+        index = self.dataflow_index.get(self.current_full_dir)
+        if index is not None:
+            index["ges"][Equation] = GE
         return GE
 
 
     def create_Edge(self, GE1, GE2, idx1, idx2):
+        if GE1 is None or GE2 is None:
+            log.warning("⚠️ 连线的%s等式没有 GE，跳过连线", "源" if GE1 is None else "目标")
+            return None
+        # 源等式在其他图中（之前生成的图或分页后的其他页）时不画连线（Edge 只能连接同一张图内的 GE），语义上仍按变量名相连
+        diagram = GE2.eContainer()
+        if GE1.eContainer() != diagram:
+            log.debug("🟡 源等式不在当前图中，跳过连线")
+            return None
         Edge = self.theEditorPragmasFactory.createEdge()
         Edge.setSrcEquation(GE1)
         Edge.setDstEquation(GE2)
@@ -713,7 +1708,11 @@ class SCADE_Builder:
         pt2.setY(1000)
         Edge.getPositions().add(pt1)
         Edge.getPositions().add(pt2)
-        self.Operator_Diagram.getPresentationElements().add(Edge)
+        diagram.getPresentationElements().add(Edge)
+        index = self.dataflow_index.get(self.current_full_dir)
+        if index is not None:
+            index["edges"].setdefault(GE1, []).append(Edge)
+            index["edges"].setdefault(GE2, []).append(Edge)
         return Edge
 
 
@@ -729,7 +1728,7 @@ class SCADE_Builder:
         size.setHeight(height)
         GE.setSize(size)
         self.Operator_Diagram.getPresentationElements().add(GE)
-        #self.lx_to_ge[self.current_full_dir][varName] = GE
+        #self.get_ge_index()[varName] = GE
         return GE
 
 
@@ -745,14 +1744,24 @@ class SCADE_Builder:
         size.setHeight(height)
         GE.setSize(size)
         self.Operator_Diagram.getPresentationElements().add(GE)
-        #self.lx_to_ge[self.current_full_dir][varName] = GE
+        #self.get_ge_index()[varName] = GE
         return GE
 
 
-    def create_TransitionGE(self, Transition, varName: str, x1: int = 1000, y1: int = 1000, x2: int = 1000, y2: int = 1000):
+    def create_TransitionGE(self, Transition, varName: str, x1: int = 1000, y1: int = 1000, x2: int = 1000, y2: int = 1000,
+                            route=None):
         GE = self.theEditorPragmasFactory.createTransitionGE()
         GE.setPolyline(True)
         GE.setTransition(Transition)
+        # 给出折线点列表时直接使用
+        if route is not None:
+            for x, y in route:
+                point = self.theEditorPragmasFactory.createPoint()
+                point.setX(x)
+                point.setY(y)
+                GE.getPositions().add(point)
+            self.Operator_Diagram.getPresentationElements().add(GE)
+            return GE
         pt1 = self.theEditorPragmasFactory.createPoint()
         pt1.setX(x1)
         pt1.setY(y1)
@@ -770,7 +1779,7 @@ class SCADE_Builder:
         GE.getPositions().add(pt3)
         GE.getPositions().add(pt4)
         self.Operator_Diagram.getPresentationElements().add(GE)
-        #self.lx_to_ge[self.current_full_dir][varName] = GE
+        #self.get_ge_index()[varName] = GE
         return GE
 
         
@@ -784,11 +1793,11 @@ class SCADE_Builder:
 
             # 正常情况：Input1 = _L1
             if var_kind_o == "Local":
-                print(f"🟡 {var_o.getName()}这是一个局部变量")
+                log.debug("🟡 %s这是一个局部变量", output)
                 _L1 = var_o
             # Input1 = _L1 但是 _L1未定义
             else:
-                print(f"🟡 未找到变量{output}, 开始创建")
+                log.debug("🟡 未找到变量%s, 开始创建", output)
                 _L1 = self.create_local_E(var_i.getType(), output)
 
             Equation = self.create_input_equation_E(var_i, _L1)
@@ -796,7 +1805,7 @@ class SCADE_Builder:
 
         # Input1未定义
         else:
-            print(f"⚠️ 未找到输出{var_i.getName()}")
+            log.warning("⚠️ 未找到输出%s", input)
 
 
     def create_output_equation(self, input: str, output: str):
@@ -806,16 +1815,16 @@ class SCADE_Builder:
         # 输出直连输入的情况：Output1 = Input1
         # 此时调用get_input_local_equation增加_L2为中间变量并建立_L2 = Input1的等式
         if var_kind == "Input":
-            print(f"⚠️ {var.getName()}这是一个输入变量，不能直接用于输出")
+            log.warning("⚠️ %s这是一个输入变量，不能直接用于输出", input)
 
         # 正常情况：Output1 = _L2
         elif var_kind == "Local":
-            print(f"🟡 {var.getName()}这是一个局部变量")
+            log.debug("🟡 %s这是一个局部变量", input)
             _L2 = var
 
         # Output1 = _L2 但是 _L2未定义
         else:
-            print(f"⚠️ 未找到变量{var.getName()}")
+            log.warning("⚠️ 未找到变量%s", input)
 
         var_kind, var = self.determine_var_kind(output)
         # 建立等式：Output1 = _L2
@@ -828,14 +1837,14 @@ class SCADE_Builder:
             self.current_canvas.getData().add(Equation)
             self.EditorPragmasUtil.setOid(Equation, self.generate_oid())
 
-            GE1 = self.lx_to_ge[self.current_full_dir][input] 
+            GE1 = self.get_ge_index()[input] 
             GE2 = self.create_EquationGE(Equation, output, 10000, 1000, 500, 500)
             # Edge
             self.create_Edge(GE1, GE2, 1, 1)
 
         # Output1未定义
         else:
-            print(f"⚠️ 未找到输出{var.getName()}")
+            log.warning("⚠️ 未找到输出%s", output)
 
     def create_numeric_cast_op(self, input_var_name: str, output_var_name: str, target_type: str):
         """
@@ -882,10 +1891,10 @@ class SCADE_Builder:
         self.EditorPragmasUtil.setOid(Equation, self.generate_oid())
 
         # 输入的连线
-        GE1 = self.lx_to_ge[self.current_full_dir][input_var_name]
+        GE1 = self.get_ge_index()[input_var_name]
         self.create_Edge(GE1, GE2, 1, 1)
         
-        print(f"✅ 已创建 NumericCastOp: {input_var_name} -> {output_var_name} (type: {target_type})")
+        log.info("✅ 已创建 NumericCastOp: %s -> %s (type: %s)", input_var_name, output_var_name, target_type)
         return Equation
 
     def create_pre_equation(self, input_var_name: str, output_var_name: str):
@@ -896,7 +1905,7 @@ class SCADE_Builder:
         - output_var_name: 输出变量名称
         """
         if self.current_canvas is None:
-            print("❌ 当前未选择 Operator/Canvas")
+            log.error("❌ 当前未选择 Operator/Canvas")
             return None
 
         # 创建等式
@@ -911,7 +1920,7 @@ class SCADE_Builder:
         # 创建 IdExpression，指向输入变量
         var_kind, input_var = self.determine_var_kind(input_var_name)
         if var_kind is None or input_var is None:
-            print(f"❌ 未找到输入变量: {input_var_name}")
+            log.error("❌ 未找到输入变量: %s", input_var_name)
             return None
 
         id_expr = self.theScadeFactory.createIdExpression()
@@ -939,10 +1948,10 @@ class SCADE_Builder:
         self.EditorPragmasUtil.setOid(Equation, self.generate_oid())
 
         # 输入的连线
-        GE1 = self.lx_to_ge[self.current_full_dir][input_var_name]
+        GE1 = self.get_ge_index()[input_var_name]
         self.create_Edge(GE1, GE2, 1, 1)
 
-        print(f"✅ 已创建 pre 等式: {output_var_name} = pre {input_var_name};")
+        log.info("✅ 已创建 pre 等式: %s = pre %s;", output_var_name, input_var_name)
         return Equation
 
     def create_fby_equation(self, input_var_name: str, delay_value: str, default_var_name: str, output_var_name: str):
@@ -955,7 +1964,7 @@ class SCADE_Builder:
         - output_var_name: 输出变量名称
         """
         if self.current_canvas is None:
-            print("❌ 当前未选择 Operator/Canvas")
+            log.error("❌ 当前未选择 Operator/Canvas")
             return None
 
         # 创建等式
@@ -967,7 +1976,7 @@ class SCADE_Builder:
         # flows：初始值
         var_kind, input_var = self.determine_var_kind(input_var_name)
         if var_kind is None or input_var is None:
-            print(f"❌ 未找到初始值变量: {input_var_name}")
+            log.error("❌ 未找到初始值变量: %s", input_var_name)
             return None
         id_expr_input = self.theScadeFactory.createIdExpression()
         id_expr_input.setPath(input_var)
@@ -982,7 +1991,7 @@ class SCADE_Builder:
         if default_var_name.startswith("_L"):
             var_kind, default_var = self.determine_var_kind(default_var_name)
             if var_kind is None or default_var is None:
-                print(f"❌ 未找到下一个值变量: {default_var_name}")
+                log.error("❌ 未找到下一个值变量: %s", default_var_name)
                 return None
             id_expr_default = self.theScadeFactory.createIdExpression()
             id_expr_default.setPath(default_var)
@@ -1010,23 +2019,23 @@ class SCADE_Builder:
         self.EditorPragmasUtil.setOid(Equation, self.generate_oid())
 
         # 输入的连线
-        GE1 = self.lx_to_ge[self.current_full_dir][input_var_name]
+        GE1 = self.get_ge_index()[input_var_name]
         self.create_Edge(GE1, GE2, 1, 1)
         if default_var_name.startswith("_L"):
-            GE1 = self.lx_to_ge[self.current_full_dir][default_var_name]
+            GE1 = self.get_ge_index()[default_var_name]
             self.create_Edge(GE1, GE2, 1, 2)
 
-        print(f"✅ 已创建 fby 等式: {output_var_name} = fby({input_var_name}; {delay_value}; {default_var_name});")
+        log.info("✅ 已创建 fby 等式: %s = fby(%s; %s; %s);", output_var_name, input_var_name, delay_value, default_var_name)
         return Equation
 
     def create_buildInOperator_equation(self, expr):
-        operator = expr['operator']
-        print(f"🔵 Processing Build-in Operator: {operator}")
+        operator = expr.operator
+        log.debug("🔵 Processing Build-in Operator: %s", operator)
         Equation = self.theScadeFactory.createEquation()
         opObj = None
         outType = None # 类型推理
         GE2 = None
-        input_number = len(expr['inputs'])
+        input_number = len(expr.inputs)
 
         operator = self.OPERATOR_MAPPING.get(operator, operator)
         if operator in {"+", "*", "and", "or", "xor", "land", "lor"}:
@@ -1045,75 +2054,93 @@ class SCADE_Builder:
             if input_number != 1:
                 raise ValueError("⚠️ pre 操作符只接受一个输入")
 
-            input_name = expr['inputs'][0]
+            input_name = expr.inputs[0]
             var_kind, var = self.determine_var_kind(input_name)
             if var_kind != "Local":
                 raise ValueError(f"⚠️ pre 操作的输入必须是局部变量，而不是: {var_kind}")
-            output_name = expr['outputs'][0]
+            output_name = expr.outputs[0]
             self.create_pre_equation(input_name, output_name)
             return
         elif operator in {"fby"}:
-            input_name = expr['inputs'][0]
+            input_name = expr.inputs[0]
             var_kind, var = self.determine_var_kind(input_name)
             if var_kind != "Local":
                 raise ValueError(f"⚠️ cast 操作的输入必须是局部变量，而不是: {var_kind}")
-            delay_value = expr['inputs'][1]
-            default_value = expr['inputs'][2]
-            output_name = expr['outputs'][0]
+            delay_value = expr.inputs[1]
+            default_value = expr.inputs[2]
+            output_name = expr.outputs[0]
             self.create_fby_equation(input_name, delay_value, default_value, output_name)
             return
         elif operator in {"cast"}:
             # cast 操作：用 NumericCastOp
-            # 确保只有一个输入
-            if input_number != 1:
-                raise ValueError("⚠️ cast 操作符只接受一个输入")
+            # 确保只有一个输入（第二个参数是目标类型）
+            if input_number != 2:
+                raise ValueError("⚠️ cast 操作符只接受一个输入和一个目标类型")
 
             # 提取目标类型（expr 里应有 target_type 字段）
-            target_type = expr['inputs'][1]
+            target_type = expr.inputs[1]
             if not target_type:
                 raise ValueError("⚠️ cast 操作缺少目标类型信息！")
 
-            input_name = expr['inputs'][0]
+            input_name = expr.inputs[0]
             var_kind, var = self.determine_var_kind(input_name)
             if var_kind != "Local":
                 raise ValueError(f"⚠️ cast 操作的输入必须是局部变量，而不是: {var_kind}")
 
-            output_name = expr['outputs'][0]
+            output_name = expr.outputs[0]
 
             self.create_numeric_cast_op(input_name, output_name, target_type)
             return
         else:
             raise ValueError(f"未知操作符: {expr}")
             
-        for input in expr['inputs']:
+        links = []
+        forward_links = []
+        for index, operand in enumerate(expr.operands):
+            input = operand.text
+            # 常量操作数，例如 << (_L4, 1)
+            if operand.kind == "number":
+                const_val = self.theScadeFactory.createConstValue()
+                const_val.setValue(input)
+                opObj.getOperands().add(const_val)
+                continue
+
+            # pre/fby 反馈环中尚未创建的变量，整个块生成完后再补引用和连线
+            if input in self.forward_refs:
+                rightExpr = self.theScadeFactory.createIdExpression()
+                opObj.getOperands().add(rightExpr)
+                forward_links.append((input, rightExpr, index + 1))
+                continue
+
             var_kind, var = self.determine_var_kind(input)
             if var_kind == "Input":
-                print(f"⚠️ {var.getName()}是一个输入变量，buildInOperator不能直接读取，发生错误！")
+                log.warning("⚠️ %s是一个输入变量，buildInOperator不能直接读取，发生错误！", input)
 
             elif var_kind == "Local":
-                print(f"🟡 {var.getName()}是一个用于读取的局部变量")
+                log.debug("🟡 %s是一个用于读取的局部变量", input)
                 _L1 = var
                 outType = _L1.getType()
                 rightExpr = self.theScadeFactory.createIdExpression()
                 rightExpr.setPath(_L1)
                 opObj.getOperands().add(rightExpr)
+                links.append((input, index + 1))
 
             else:
-                print(f"⚠️ 未找到输入变量{var.getName()}，发生错误！")
+                log.warning("⚠️ 未找到输入变量%s，发生错误！", input)
 
-        for output in expr['outputs']:
+        for output in expr.outputs:
             var_kind, var = self.determine_var_kind(output)
             if var_kind == "Output":
-                print(f"⚠️ 对输出{output}计算后赋值，发生错误！")
+                log.warning("⚠️ 对输出%s计算后赋值，发生错误！", output)
                 # TODO 例如：Output_01 = / (_L2, _L3)的情况处理
                 #_L2 = self.create_local_E(outType, out)
                 #self.create_output_equation("_L2", output)
 
             elif var_kind == "Local":
-                print(f"⚠️ 局部变量{output}被再次写入，发生错误！")
+                log.warning("⚠️ 局部变量%s被再次写入，发生错误！", output)
 
             else:
-                print(f"🟡 未找到变量{output}, 开始创建")
+                log.debug("🟡 未找到变量%s, 开始创建", output)
                 _L2 = self.create_local_E(outType, output)
                 Equation.getLefts().add(_L2)
                 # GE2 Buildin的operator一般只有一个输出
@@ -1123,14 +2150,16 @@ class SCADE_Builder:
         self.current_canvas.getData().add(Equation)
         self.EditorPragmasUtil.setOid(Equation, self.generate_oid())
 
-        for index, input in enumerate(expr['inputs']):
-            GE1 = self.lx_to_ge[self.current_full_dir][input]
-            self.create_Edge(GE1, GE2, 1, index + 1)
+        for input, index in links:
+            GE1 = self.get_ge_index()[input]
+            self.create_Edge(GE1, GE2, 1, index)
+        for input, id_expr, index in forward_links:
+            self.pending_links.append((input, id_expr, GE2, index))
 
 
     def create_operator_equation(self, expr):
-        operator = expr['operator']
-        print(f"🔵 Processing Operator: {operator}")
+        operator = expr.operator
+        log.debug("🔵 Processing Operator: %s", operator)
         GE2 = None
 
         Equation = self.theScadeFactory.createEquation()
@@ -1141,60 +2170,79 @@ class SCADE_Builder:
         rightExpr = self.theScadeFactory.createCallExpression()
         rightExpr.setOperator(opObj)
 
-        for input in expr['inputs']:
+        links = []
+        forward_links = []
+        for index, operand in enumerate(expr.operands):
+            input = operand.text
+            if operand.kind == "number":
+                const_val = self.theScadeFactory.createConstValue()
+                const_val.setValue(input)
+                rightExpr.getCallParameters().add(const_val)
+                continue
+
+            # pre/fby 反馈环中尚未创建的变量，整个块生成完后再补引用和连线
+            if input in self.forward_refs:
+                idExpr = self.theScadeFactory.createIdExpression()
+                rightExpr.getCallParameters().add(idExpr)
+                forward_links.append((input, idExpr, index + 1))
+                continue
+
             var_kind, var = self.determine_var_kind(input)
             if var_kind == "Input":
-                print(f"⚠️ {var.getName()}是一个输入变量，buildInOperator不能直接读取，发生错误！")
+                log.warning("⚠️ %s是一个输入变量，buildInOperator不能直接读取，发生错误！", input)
 
             elif var_kind == "Local":
-                print(f"🟡 {var.getName()}是一个用于读取的局部变量")
+                log.debug("🟡 %s是一个用于读取的局部变量", input)
                 idExpr = self.theScadeFactory.createIdExpression()
                 idExpr.setPath(var)
                 rightExpr.getCallParameters().add(idExpr)
+                links.append((input, index + 1))
 
             else:
-                print(f"⚠️ 未找到输入变量{var.getName()}，发生错误！")
+                log.warning("⚠️ 未找到输入变量%s，发生错误！", input)
 
-        for index, output in enumerate(expr['outputs']):
+        for index, output in enumerate(expr.outputs):
             var_kind, var = self.determine_var_kind(output)
             if var_kind == "Output":
-                print(f"⚠️ 对输出{output}计算后赋值，发生错误！")
+                log.warning("⚠️ 对输出%s计算后赋值，发生错误！", output)
                 # TODO 例如：Output_01 = / (_L2, _L3)的情况处理
                 # _L2 = self.create_local_E(outType, out)
                 # self.create_output_equation("_L2", output)
 
             elif var_kind == "Local":
-                print(f"⚠️ 局部变量{output}被再次写入，发生错误！")
+                log.warning("⚠️ 局部变量%s被再次写入，发生错误！", output)
 
             else:
-                print(f"🟡 未找到变量{output}, 开始创建")
+                log.debug("🟡 未找到变量%s, 开始创建", output)
                 outType = self.get_output_port_data_type(calledOp, index)
                 _L2 = self.create_local_E(outType, output)
                 Equation.getLefts().add(_L2)
 
-        for index, output in enumerate(expr['outputs']):
+        for index, output in enumerate(expr.outputs):
             # GE2
             if index == 0:
                 GE2 = self.create_EquationGE(Equation, output, 5000, 1000, 1500, 2600)
             else:
-                self.lx_to_ge[self.current_full_dir][output] = GE2
+                self.get_ge_index()[output] = GE2
 
         Equation.setRight(rightExpr)
         self.current_canvas.getData().add(Equation)
         self.EditorPragmasUtil.setOid(Equation, self.generate_oid())
 
-        for index, input in enumerate(expr['inputs']):
-            GE1 = self.lx_to_ge[self.current_full_dir][input]
-            self.create_Edge(GE1, GE2, 1, index + 1)
+        for input, index in links:
+            GE1 = self.get_ge_index()[input]
+            self.create_Edge(GE1, GE2, 1, index)
+        for input, id_expr, index in forward_links:
+            self.pending_links.append((input, id_expr, GE2, index))
 
 
     def create_mapfoldwi_equation(self, expr):
-        operator = expr['operator']
-        subOperator = expr['subOperator']
-        accumulators = expr['accumulators']
-        size = expr['size']
-        cond = expr['condition']
-        print(f"🔵 Processing Operator: {operator} and {subOperator}")
+        operator = expr.operator
+        subOperator = expr.iterator.operator
+        accumulators = expr.iterator.accumulators
+        size = expr.iterator.size
+        cond = expr.iterator.condition
+        log.debug("🔵 Processing Operator: %s and %s", operator, subOperator)
         GE2 = None
 
         Equation = self.theScadeFactory.createEquation()
@@ -1202,13 +2250,13 @@ class SCADE_Builder:
 
         input_count = len(calledOp.getInputs())
         output_count = len(calledOp.getOutputs())
-        if input_count != len(expr['inputs']) + 1 or output_count != len(expr['outputs']) + 1:
-            print(f"⚠️ 输入数量不一致或输出数量不一致！")
-            print(f"    subOperator 输入数: {input_count}")
-            print(f"    表达式输入数: {len(expr['inputs'])}")
-            print(f"    subOperator 输出数: {output_count}")
-            print(f"    表达式输出数: {len(expr['outputs'])}")
-            print(f"⚠️ 是一个输入变量，buildInOperator不能直接读取，发生错误！")
+        if input_count != len(expr.inputs) + 1 or output_count != len(expr.outputs) + 1:
+            log.warning("⚠️ 输入数量不一致或输出数量不一致！")
+            log.warning("    subOperator 输入数: %s", input_count)
+            log.warning("    表达式输入数: %s", len(expr.inputs))
+            log.warning("    subOperator 输出数: %s", output_count)
+            log.warning("    表达式输出数: %s", len(expr.outputs))
+            log.warning("⚠️ 是一个输入变量，buildInOperator不能直接读取，发生错误！")
             return
 
         opObj = self.theScadeFactory.createOpCall()
@@ -1237,62 +2285,62 @@ class SCADE_Builder:
         # if条件设定
         var_kind, var = self.determine_var_kind(cond)
         if var_kind == "Input":
-            print(f"⚠️ {var.getName()}是一个输入变量，buildInOperator不能直接读取，发生错误！")
+            log.warning("⚠️ %s是一个输入变量，buildInOperator不能直接读取，发生错误！", cond)
             return
         elif var_kind == "Local":
-            print(f"🟡 {var.getName()}是一个用于读取的局部变量")
+            log.debug("🟡 %s是一个用于读取的局部变量", cond)
             idExpr = self.theScadeFactory.createIdExpression()
             idExpr.setPath(var)
             iteratorOp.setIf(idExpr)
         else:
-            print(f"⚠️ 未找到输入变量{var.getName()}，发生错误！")
+            log.warning("⚠️ 未找到输入变量%s，发生错误！", cond)
             return
 
         callExpression = self.theScadeFactory.createCallExpression()
         callExpression.setOperator(iteratorOp)
 
-        for input in expr['inputs']:
+        for input in expr.inputs:
             var_kind, var = self.determine_var_kind(input)
             if var_kind == "Input":
-                print(f"⚠️ {var.getName()}是一个输入变量，buildInOperator不能直接读取，发生错误！")
+                log.warning("⚠️ %s是一个输入变量，buildInOperator不能直接读取，发生错误！", input)
                 return
 
             elif var_kind == "Local":
-                print(f"🟡 {var.getName()}是一个用于读取的局部变量")
+                log.debug("🟡 %s是一个用于读取的局部变量", input)
                 idExpr = self.theScadeFactory.createIdExpression()
                 idExpr.setPath(var)
                 callExpression.getCallParameters().add(idExpr)
 
             else:
-                print(f"⚠️ 未找到输入变量{var.getName()}，发生错误！")
+                log.warning("⚠️ 未找到输入变量%s，发生错误！", input)
                 return
 
         # mapfoldwi第1个输出是index
-        _Lindex = builder.create_local(self.generate_suffix("_Lmapfoldwi"), "int32")
+        _Lindex = self.create_local(self.generate_suffix("_Lmapfoldwi"), "int32")
         Equation.getLefts().add(_Lindex)
 
         # mapfoldwi第2个输出是enable
-        _Lenable = builder.create_local(self.generate_suffix("_Lmapfoldwi"), "bool")
+        _Lenable = self.create_local(self.generate_suffix("_Lmapfoldwi"), "bool")
         Equation.getLefts().add(_Lenable)
 
         # mapfoldwi第3个之后的输出才是有意义的
-        for index, output in enumerate(expr['outputs']):
+        for index, output in enumerate(expr.outputs):
             var_kind, var = self.determine_var_kind(output)
             # 参与acc迭代的输出类型不变
             if index < int(accumulators):
                 if var_kind == "Output":
-                    print(f"⚠️ 对输出{output}计算后赋值，发生错误！")
+                    log.warning("⚠️ 对输出%s计算后赋值，发生错误！", output)
                     # TODO 例如：Output_01 = / (_L2, _L3)的情况处理
                     # _L2 = self.create_local_E(outType, out)
                     # self.create_output_equation("_L2", output)
                     return
 
                 elif var_kind == "Local":
-                    print(f"⚠️ 局部变量{output}被再次写入，发生错误！")
+                    log.warning("⚠️ 局部变量%s被再次写入，发生错误！", output)
                     return
 
                 else:
-                    print(f"🟡 未找到变量{output}, 开始创建")
+                    log.debug("🟡 未找到变量%s, 开始创建", output)
                     outType = self.get_output_port_data_type(calledOp, index)
                     _L2 = self.create_local_E(outType, output)
                     Equation.getLefts().add(_L2)
@@ -1300,18 +2348,18 @@ class SCADE_Builder:
             # 不参与acc的为数组，需要升高维度，用table
             else:
                 if var_kind == "Output":
-                    print(f"⚠️ 对输出{output}计算后赋值，发生错误！")
+                    log.warning("⚠️ 对输出%s计算后赋值，发生错误！", output)
                     # TODO 例如：Output_01 = / (_L2, _L3)的情况处理
                     # _L2 = self.create_local_E(outType, out)
                     # self.create_output_equation("_L2", output)
                     return
 
                 elif var_kind == "Local":
-                    print(f"⚠️ 局部变量{output}被再次写入，发生错误！")
+                    log.warning("⚠️ 局部变量%s被再次写入，发生错误！", output)
                     return
 
                 else:
-                    print(f"🟡 未找到变量{output}, 开始创建")
+                    log.debug("🟡 未找到变量%s, 开始创建", output)
                     outType = self.get_output_port_data_type(calledOp, index)
                     baseType = outType.getType().getName()
                     type_name = baseType + "^" + size
@@ -1319,24 +2367,24 @@ class SCADE_Builder:
                     _L2 = self.create_local_E(type_obj, output)
                     Equation.getLefts().add(_L2)
 
-        for index, output in enumerate(expr['outputs']):
+        for index, output in enumerate(expr.outputs):
             # GE2
             if index == 0:
                 GE2 = self.create_EquationGE(Equation, output, 5000, 1000, 2000, 3000)
             else:
-                self.lx_to_ge[self.current_full_dir][output] = GE2
+                self.get_ge_index()[output] = GE2
 
         Equation.setRight(callExpression)
         self.current_canvas.getData().add(Equation)
         self.EditorPragmasUtil.setOid(Equation, self.generate_oid())
 
         # if条件的连线
-        GE1 = self.lx_to_ge[self.current_full_dir][cond]
+        GE1 = self.get_ge_index()[cond]
         self.create_Edge(GE1, GE2, 1, 1)
 
         # 输入的连线
-        for index, input in enumerate(expr['inputs']):
-            GE1 = self.lx_to_ge[self.current_full_dir][input]
+        for index, input in enumerate(expr.inputs):
+            GE1 = self.get_ge_index()[input]
             self.create_Edge(GE1, GE2, 1, index + 2)
 
 
@@ -1352,25 +2400,33 @@ class SCADE_Builder:
         """
         outputs = operator.getOutputs()
         if index < 0 or index >= len(outputs):
-            print(f"⚠️ 输出端口下标 {index} 超出范围 (0 ~ {len(outputs) - 1})")
+            log.warning("⚠️ 输出端口下标 %s 超出范围 (0 ~ %s)", index, len(outputs) - 1)
             return None
 
-        port = outputs[JInt(index)]  # 这里强制用 Java int
+        port = outputs[self.backend.to_int(index)]  # jpype 后端需要 Java int
         data_type = port.getType()
-        print(f"✅ 输出端口 index={index} 的数据类型: {data_type}")
+        log.info("✅ 输出端口 index=%s 的数据类型: %s", index, data_type)
         return data_type
 
 
-    def create_diagram(self, diagramName: str):
+    def create_diagram(self, diagramName: str, pragma=None):
+        """
+        新建 NetDiagram；pragma 为空时同时新建一个图形 pragma 挂到当前 canvas，否则加入给定的 pragma（同一块数据流的分页）。
+        """
         self.Operator_Diagram = self.theEditorPragmasFactory.createNetDiagram()
         self.Operator_Diagram.setName(diagramName)
         self.Operator_Diagram.setFormat("A4 (210 297)")
         self.Operator_Diagram.setLandscape(True)
         self.Operator_Diagram.setOid(self.generate_oid())
+        if pragma is not None:
+            pragma.getDiagrams().add(self.Operator_Diagram)
+            self.mark_dirty(self.current_canvas)
+            return
         self.Operator_Pragma = self.theEditorPragmasFactory.createOperator()
         self.Operator_Pragma.setNodeKind("graphical")
         self.Operator_Pragma.getDiagrams().add(self.Operator_Diagram)
         self.current_canvas.getPragmas().add(self.Operator_Pragma)
+        self.mark_dirty(self.current_canvas)
 
 
     def create_stateMachine(self, sm_name: str, states: list[str], transitions: list[tuple[str, str, str]]):
@@ -1379,11 +2435,37 @@ class SCADE_Builder:
         - sm_name: 状态机名称
         - states: 状态名称列表，例如 ["S1", "S2", "S3"]
         - transitions: 迁移列表，每个元素是 (source_name, target_name, condition_expr)
+        状态按网格排列（从初始状态广度优先编号，相互迁移的状态相邻），迁移沿网格通道正交走线，
+        状态机 GE 的大小随网格伸缩；状态名和条件变量都通过索引查找，每个条件只解析一次。
         """
         if self.current_operator is None:
-            print("❌ 当前未选择 Operator")
+            log.error("❌ 当前未选择 Operator")
             return None
 
+        # 状态名 -> 下标，重名的状态只保留第一个
+        state_index = {}
+        for state_name in states:
+            if state_name in state_index:
+                log.warning("⚠️ 状态名重复，跳过: %s", state_name)
+                continue
+            state_index[state_name] = len(state_index)
+        valid_transitions = []
+        for source_name, target_name, condition_expr in transitions:
+            if source_name not in state_index or target_name not in state_index:
+                log.warning("⚠️ Transition 跳过：找不到 %s 或 %s", source_name, target_name)
+                continue
+            valid_transitions.append((source_name, target_name, condition_expr))
+
+        # 布局：状态机 GE 四周留出 margin，状态网格从 (sm_x + margin, sm_y + margin) 开始
+        sm_x, sm_y, margin = 1000, 1000, 3000
+        state_size = (2000, 2000)
+        links = [(state_index[source], state_index[target]) for source, target, _ in valid_transitions]
+        with tracer.span("layout:state_machine", states=len(state_index), transitions=len(links)):
+            positions, columns = grid_layout(len(state_index), links, state_size, origin=(sm_x + margin, sm_y + margin))
+            routes = route_transitions(positions, links, state_size)
+        right = max((x for x, _ in positions), default=sm_x + margin) + state_size[0]
+        bottom = max((y for _, y in positions), default=sm_y + margin) + state_size[1]
+
         self.create_diagram(self.generate_suffix("SM_diagram"))
 
         # 创建状态机
@@ -1392,38 +2474,33 @@ class SCADE_Builder:
         sm_oid = self.generate_oid(f"SM{sm_name}Oid")
         self.EditorPragmasUtil.setOid(sm, sm_oid)
         self.current_canvas.getData().add(sm)
-        self.create_StateMachineGE(sm, "sm_name")
-        print(f"✅ 创建状态机: {sm_name}")
+        self.invalidate_path_cache(sm)
+        self.create_StateMachineGE(sm, "sm_name", sm_x, sm_y, max(20000, right + margin - sm_x), max(20000, bottom + margin - sm_y))
+        log.info("✅ 创建状态机: %s", sm_name)
 
         # 创建状态
         state_objs = {}
-        x = 4000
-        y = 4000
-        for idx, state_name in enumerate(states):
+        for state_name, idx in state_index.items():
             state = self.theScadeFactory.createState()
             state.setName(state_name)
             state_oid = self.generate_oid(f"SM_{sm_name}{state_name}_Oid")
             self.EditorPragmasUtil.setOid(state, state_oid)
-            self.create_StateGE(state, state_name, x, y)
+            x, y = positions[idx]
+            self.create_StateGE(state, state_name, x, y, *state_size)
             # 第一个状态设为初始态
             if idx == 0:
                 state.setInitial(True)
-                print(f"🟢 设置初始状态: {state_name}")
+                log.info("🟢 设置初始状态: %s", state_name)
 
             sm.getStates().add(state)
             state_objs[state_name] = state
-            print(f"✅ 创建状态: {state_name}")
-            x = x + 4000
-            y = y + 4000
+            log.debug("✅ 创建状态: %s", state_name)
 
         # 创建 transitions
-        for source_name, target_name, condition_expr in transitions:
-            source_state = state_objs.get(source_name)
-            target_state = state_objs.get(target_name)
-
-            if source_state is None or target_state is None:
-                print(f"⚠️ Transition 跳过：找不到 {source_name} 或 {target_name}")
-                continue
+        conditions = {}
+        for (source_name, target_name, condition_expr), route in zip(valid_transitions, routes):
+            source_state = state_objs[source_name]
+            target_state = state_objs[target_name]
 
             transition = self.theScadeFactory.createTransition()
             transition.setTarget(target_state)
@@ -1432,139 +2509,582 @@ class SCADE_Builder:
 
             # 设置条件表达式（如果给了）
             if condition_expr:
-                var_kind_i, var_i = self.determine_var_kind(condition_expr)
+                if condition_expr not in conditions:
+                    var_kind_i, var_i = self.determine_var_kind(condition_expr)
+                    if var_kind_i == "NotFound":
+                        log.warning("⚠️ 未找到转换条件变量: %s", condition_expr)
+                    conditions[condition_expr] = var_i
                 rightExpr = self.theScadeFactory.createIdExpression()
-                rightExpr.setPath(var_i)
+                rightExpr.setPath(conditions[condition_expr])
                 transition.setCondition(rightExpr)
-                print(f"🔵 为 {source_name}->{target_name} 设置条件: {condition_expr}")
+                log.debug("🔵 为 %s->%s 设置条件: %s", source_name, target_name, condition_expr)
 
             # 将 transition 添加到 source_state 的 unless 中
             source_state.getUnless().add(transition)
-            self.create_TransitionGE(transition, condition_expr)
-            print(f"✅ 创建 Transition: {source_name} -> {target_name}")
+            self.create_TransitionGE(transition, condition_expr, route=route)
+            log.debug("✅ 创建 Transition: %s -> %s", source_name, target_name)
 
-        print("✅ 状态机及所有 Transition 创建完成")
+        log.info("✅ 状态机 %s 创建完成: %s 个状态，%s 个 Transition，%s 列网格",
+                 sm_name, len(state_objs), len(valid_transitions), columns)
         return sm
 
 
-    def parse_expression_line(self, line):
-        line = line.strip()
-        # 1. 先匹配带括号的复杂运算
-        complex_match = re.match(r"([\w,\s]+)=\s*([^\s(]+)\s*\((.*)\)", line)
-        if complex_match:
-            outputs = [o.strip() for o in complex_match.group(1).split(',')]
-            operator = complex_match.group(2)
-            inputs = [i.strip() for i in complex_match.group(3).split(',')]
-            return {"outputs": outputs, "operator": operator, "inputs": inputs}
-
-        # 2. 匹配简单赋值（无括号）
-        simple_match = re.match(r"([\w,\s]+)=\s*(\S+)", line)
-        if simple_match:
-            outputs = [o.strip() for o in simple_match.group(1).split(',')]
-            #operator = "assign"   # 直接赋值操作
-            inputs = [simple_match.group(2)]
-            return {"outputs": outputs[0], "inputs": inputs[0]}
-        return None
+    def schedule_dataFlow(self, expressions):
+        """
+        按依赖关系排好生成顺序，返回 [(equation, forward_names), ...]。
+        块外引用的变量必须是当前 Operator/canvas 中已存在的输入、输出或局部变量。
+        """
+        def is_known(name):
+            return self.determine_var_kind(name)[0] != "NotFound"
+        schedule = schedule_equations(expressions, is_known)
+        self.check_external_reads(expressions)
+        return schedule
 
-    def parse_mapfoldwi_expression(self, expr_line: str) -> dict:
-        """
-        解析形如:
-        _L4, _L5, _L6, _L7 = (mapfoldwi 2 Operator2 <<5>> if _L1)(_L2, _L3)
-        返回一个 dict:
-        {
-            'outputs': ['_L4', '_L5', '_L6', '_L7'],
-            'operator': 'mapfoldwi',
-            'suboperator': 'Operator2',
-            'accumulators': '2',
-            'size': '5',
-            'condition': '_L1',
-            'inputs': ['_L2', '_L3']
-        }
+
+    def check_external_reads(self, expressions):
         """
-        # 提取 = 左侧
-        left_right = expr_line.split('=')
-        if len(left_right) != 2:
-            raise ValueError(f"无效的 mapfoldwi 表达式: {expr_line}")
-
-        left_part = left_right[0].strip()
-        right_part = left_right[1].strip()
-        outputs = [o.strip() for o in left_part.split(',')]
-
-        # operator 部分: (mapfoldwi 2 Operator2 <<5>> if _L1)
-        op_pattern = r"\((mapfoldwi)\s+(\d+)\s+([a-zA-Z0-9_]+)\s+<<\s*(\d+)\s*>>\s+if\s+([a-zA-Z0-9_]+)\)"
-        op_match = re.search(op_pattern, right_part)
-        if not op_match:
-            raise ValueError(f"无法解析 operator 部分: {expr_line}")
-
-        operator = op_match.group(1)
-        accumulators = op_match.group(2)
-        suboperator = op_match.group(3)
-        size = op_match.group(4)
-        condition = op_match.group(5)
-
-        # inputs 部分: (...) 在 operator 部分之后
-        input_pattern = r"\)\s*\((.*?)\)"
-        input_match = re.search(input_pattern, right_part)
-        if not input_match:
-            raise ValueError(f"无法解析 inputs 部分: {expr_line}")
-
-        inputs_str = input_match.group(1)
-        inputs = [i.strip() for i in inputs_str.split(',')]
-
-        return {
-            'outputs': outputs,
-            'operator': operator,
-            'subOperator': suboperator,
-            'accumulators': accumulators,
-            'size': size,
-            'condition': condition,
-            'inputs': inputs
-        }
+        生成前检查整个块，不能生成的等式在修改模型之前抛出 DataflowScheduleError：
+        - 块外读取的局部变量要从它的 GE 连线，没有 GE（例如只声明、没有等式生成）时不能读取；输入变量不连线，不需要 GE
+        - 运算、调用、迭代器等式的左侧不能是输出变量（不会为它生成 GE），输出只能由赋值 Output = _Lx 写入
+        """
+        produced = {name for expr in expressions for name in expr.outputs}
+        ge_index = self.get_ge_index()
+        for expr in expressions:
+            if not expr.is_assignment:
+                for name in expr.outputs:
+                    if self.determine_var_kind(name)[0] == "Output":
+                        raise DataflowScheduleError(f"输出 {name} 不能直接作为运算结果，请先写入局部变量再赋值: {name} = _Lx", expr.line)
+            for name in equation_reads(expr):
+                if name in produced or name in ge_index:
+                    continue
+                if self.determine_var_kind(name)[0] == "Local":
+                    raise DataflowScheduleError(f"局部变量 {name} 没有生成它的等式（图中没有对应的 GE），不能被读取", expr.line)
+
+
+    def resolve_pending_links(self):
+        """
+        为反馈环中的前向引用补上变量和连线（此时被引用的 pre/fby 等式都已生成）。
+        """
+        for name, id_expr, GE2, index in self.pending_links:
+            var_kind, var = self.determine_var_kind(name)
+            id_expr.setPath(var)
+            GE1 = self.get_ge_index()[name]
+            self.create_Edge(GE1, GE2, 1, index)
+            log.debug("🟡 补全前向引用: %s", name)
+        self.pending_links = []
 
 
-    def create_dataFlow(self, text):
-        expressions = []
-        for line in text.strip().splitlines():
-            # 判断是否是 mapfoldwi 语句
-            if "mapfoldwi" in line:
-                parsed = self.parse_mapfoldwi_expression(line)
-            else:
-                parsed = self.parse_expression_line(line)
+    def create_dataFlow(self, text, patch: bool = False, max_diagram_size: int = None):
+        """
+        解析数据流块并生成等式、局部变量、GE 和连线。
+        patch 为 True 时把块视为当前 canvas 数据流的完整新版本，只增删有变化的等式，返回差异报告（见 patch_dataFlow）。
+        max_diagram_size 给出且等式数超过它时，把等式图划分为至多 max_diagram_size 条等式的簇（SCADELayout.partition_graph，
+        簇不保证连通，见其说明），每簇生成到单独的一张图（同一个图形 pragma 下的多页），跨页的连线不画。
+        """
+        if self.current_operator is None:
+            log.error("❌ 当前未选择 Operator")
+            return None
 
-            if parsed:
-                expressions.append(parsed)
+        # 解析为 SCADEParser.Equation 列表，语法错误在修改模型之前抛出 DataflowSyntaxError
+        with tracer.span("parse"):
+            expressions = parse_dataflow(text)
+        if patch:
+            return self.patch_dataFlow(expressions)
+
+        # 新的 Dataflow_diagram 中的等式不在已有索引中，下次 patch 时重新建立
+        self.dataflow_index.pop(self.current_full_dir, None)
+        # 依赖排序，未定义变量/重复定义/瞬时环在修改模型之前抛出 DataflowScheduleError
+        with tracer.span("resolve", equations=len(expressions)):
+            schedule = self.schedule_dataFlow(expressions)
 
         self.expressions = expressions  # 保存到对象属性
-        self.create_diagram(self.generate_suffix("Dataflow_diagram"))
+        clusters = [0] * len(schedule)
+        if max_diagram_size and len(schedule) > max_diagram_size:
+            with tracer.span("layout:partition", equations=len(schedule)):
+                clusters = self.partition_dataFlow(schedule, max_diagram_size)
+        with tracer.span("layout:diagram"):
+            self.create_diagram(self.generate_suffix("Dataflow_diagram"))
+        diagrams = {0: self.Operator_Diagram}
+        pragma = self.Operator_Pragma
+
+        self.pending_links = []
+        with tracer.span("emit", equations=len(schedule)):
+            for (expr, forward_names), cluster in zip(schedule, clusters):
+                diagram = diagrams.get(cluster)
+                if diagram is None:
+                    self.create_diagram(self.generate_suffix("Dataflow_diagram"), pragma)
+                    diagram = diagrams[cluster] = self.Operator_Diagram
+                self.Operator_Diagram = diagram
+                self.forward_refs = forward_names
+                with tracer.span("emit:equation", operator=expr.operator, line=expr.line):
+                    self.emit_equation(expr)
+
+        self.forward_refs = frozenset()
+        with tracer.span("layout:links", links=len(self.pending_links)):
+            self.resolve_pending_links()
+        with tracer.span("layout:graph", diagrams=len(diagrams)):
+            for diagram in diagrams.values():
+                self.layout_diagram(diagram)
+        return schedule
+
+
+    def partition_dataFlow(self, schedule, max_size: int):
+        """
+        按块内的变量依赖把已排好序的等式划分为簇（SCADELayout.partition_graph），返回每条等式的簇编号。
+        """
+        producer = {}
+        for index, (expr, _) in enumerate(schedule):
+            for name in expr.outputs:
+                producer[name] = index
+        edges = [(producer[name], index) for index, (expr, _) in enumerate(schedule)
+                 for name in equation_reads(expr) if name in producer]
+        clusters = partition_graph(len(schedule), edges, max_size)
+        cut = sum(1 for src, dst in edges if clusters[src] != clusters[dst])
+        log.info("✅ 数据流分为 %s 页，跨页连线 %s / %s 条", max(clusters) + 1, cut, len(edges))
+        return clusters
+
+
+    def patch_dataFlow(self, expressions):
+        """
+        比较新块与 canvas 上已有的等式（按左侧变量名匹配，按运算符和操作数比较），只处理差异：
+        - 新增：按依赖顺序生成到最近一张 Dataflow_diagram
+        - 删除：删除等式、GE、相连的 Edge 和左侧的局部变量
+        - 修改：删除旧等式后重新生成，左侧局部变量沿用原对象，原来从它引出的 Edge 改接到新 GE
+        已有等式的索引按路径缓存，之后的开销与变化量成正比。
+        返回 {"added": [...], "removed": [...], "changed": [...], "unchanged": n}，列表元素为左侧变量名（多个时以 ", " 连接）。
+        """
+        index = self.get_dataflow_index()
+        existing = index["equations"]
+
+        with tracer.span("patch:diff", equations=len(expressions)):
+            added, changed, new_keys = [], [], set()
+            unchanged = 0
+            for expr in expressions:
+                key, signature = self.expression_signature(expr)
+                new_keys.add(key)
+                entry = existing.get(key)
+                if entry is None:
+                    added.append(expr)
+                elif entry[1] != signature:
+                    changed.append(expr)
+                else:
+                    unchanged += 1
+            removed = [key for key in existing if key not in new_keys]
+
+        # 被删除的等式定义的局部变量不能再被块外引用；校验整个块，失败时模型保持不变
+        table = self.get_symbol_table()
+        doomed = {name for key in removed for name in key if name in table["Local"]}
+        def is_known(name):
+            return name not in doomed and self.determine_var_kind(name)[0] != "NotFound"
+        with tracer.span("resolve", equations=len(expressions)):
+            schedule = schedule_equations(expressions, is_known)
+            self.check_external_reads(expressions)
+
+        self.expressions = expressions
+        with tracer.span("patch:delete", equations=len(removed) + len(changed) + len(index["duplicates"])):
+            for key in removed:
+                self.delete_equation(existing.pop(key)[0])
+            # 同一输出被多次生成时留下的重复等式，新块中只保留一个
+            for equation in index["duplicates"]:
+                self.delete_equation(equation, drop_locals=False)
+            index["duplicates"] = []
+            outgoing = {}
+            for expr in changed:
+                key = tuple(expr.outputs)
+                outgoing[key] = self.delete_equation(existing.pop(key)[0], reuse_names=key)
+
+        diagram = index["diagram"]
+        if diagram is None:
+            self.create_diagram(self.generate_suffix("Dataflow_diagram"))
+            index["diagram"] = self.Operator_Diagram
+        else:
+            self.Operator_Diagram = diagram
+            self.Operator_Pragma = diagram.eContainer()
+
+        emit_ids = {id(expr) for expr in added + changed}
+        data = self.current_canvas.getData()
+        first_new = data.size()
+        self.pending_links = []
+        with tracer.span("emit", equations=len(emit_ids)):
+            for expr, forward_names in schedule:
+                if id(expr) not in emit_ids:
+                    continue
+                self.forward_refs = forward_names
+                with tracer.span("emit:equation", operator=expr.operator, line=expr.line):
+                    self.emit_equation(expr)
+        self.forward_refs = frozenset()
+
+        with tracer.span("layout:links", links=len(self.pending_links)):
+            self.resolve_pending_links()
+            ge_index = self.get_ge_index()
+            for key, edges in outgoing.items():
+                GE = ge_index.get(key[0]) if key else None
+                for edge in edges:
+                    if edge.eContainer() is None:
+                        continue  # 目标等式也被删除时连线已随之删除
+                    if GE is not None and GE.eContainer() == edge.eContainer():
+                        edge.setSrcEquation(GE)
+                        index["edges"].setdefault(GE, []).append(edge)
+                    else:
+                        self.delete_edge(edge)
 
-        for expr in expressions:
-            # mapfoldwi 需要特殊处理
-            if expr.get('operator') == "mapfoldwi":
-                self.create_mapfoldwi_equation(expr)  # 你自己实现它
+        with tracer.span("layout:graph", equations=len(emit_ids)):
+            self.place_equations(first_new)
+
+        # 没有被重新生成沿用的局部变量（生成失败时）一并删除
+        for var in self.reusable_locals.values():
+            self.EcoreUtil.remove(var)
+        self.reusable_locals = {}
+
+        for position in range(first_new, data.size()):
+            item = data.get(self.backend.to_int(position))
+            if item.eClass().getName() != "Equation":
                 continue
+            key, signature = self.equation_signature(item)
+            if key in existing:
+                index["duplicates"].append(item)
+            else:
+                existing[key] = (item, signature)
+        self.mark_dirty(self.current_canvas)
+
+        delta = {
+            "added": [", ".join(expr.outputs) for expr in added],
+            "removed": [", ".join(key) for key in removed],
+            "changed": [", ".join(expr.outputs) for expr in changed],
+            "unchanged": unchanged,
+        }
+        log.info("✅ 数据流增量更新: 新增 %s，删除 %s，修改 %s，未变 %s",
+                 len(delta["added"]), len(delta["removed"]), len(delta["changed"]), unchanged)
+        return delta
 
-            # 其他操作符的情况
-            if 'operator' in expr and expr['operator']:
-                operator_key = expr['operator']
-                if operator_key in self.OPERATOR_MAPPING:
-                    self.create_buildInOperator_equation(expr)
-                else:
-                    self.create_operator_equation(expr)
+
+    def layout_diagram(self, diagram=None):
+        """
+        对 NetDiagram 做分层布局（SCADELayout.layered_layout），重设所有 EquationGE 的位置和 Edge 的折线。
+        diagram 为空时使用当前 canvas 最近一张 Dataflow_diagram。返回布局的 GE 数量。
+        """
+        if diagram is None:
+            diagram = self.get_dataflow_index()["diagram"]
+        if diagram is None:
+            log.warning("⚠️ 当前 canvas 没有数据流图")
+            return None
+
+        ges, edges, nodes = [], [], {}
+        for element in diagram.getPresentationElements():
+            kind = element.eClass().getName()
+            if kind == "EquationGE":
+                nodes[element] = len(ges)
+                ges.append(element)
+            elif kind == "Edge":
+                edges.append(element)
+        links, routed = [], []
+        for edge in edges:
+            src = nodes.get(edge.getSrcEquation())
+            dst = nodes.get(edge.getDstEquation())
+            if src is None or dst is None:
+                continue
+            links.append((src, dst, int(edge.getLeftVarIndex()), int(edge.getRightExprIndex())))
+            routed.append(edge)
+
+        sizes = [(int(GE.getSize().getWidth()), int(GE.getSize().getHeight())) for GE in ges]
+        layout = layered_layout(sizes, links)
+        for GE, (x, y) in zip(ges, layout.positions):
+            position = GE.getPosition()
+            position.setX(x)
+            position.setY(y)
+        for edge, route in zip(routed, layout.routes):
+            self.set_edge_route(edge, route)
+
+        # 按内容范围选择幅面（坐标原点外侧留出同样的边距）
+        right = max((x + width for (x, _), (width, _) in zip(layout.positions, sizes)), default=0)
+        bottom = max((y + height for (_, y), (_, height) in zip(layout.positions, sizes)), default=0)
+        for route in layout.routes:
+            for x, y in route:
+                right, bottom = max(right, x), max(bottom, y)
+        page, landscape = page_format(right + 1000, bottom + 1000)
+        diagram.setFormat(page)
+        diagram.setLandscape(landscape)
+        self.mark_dirty(diagram)
+        log.debug("🟡 布局完成: %s 个等式，%s 层，%s 条连线", len(ges), max(layout.layers, default=-1) + 1, len(routed))
+        return len(ges)
+
+
+    def get_dataflow_diagrams(self, canvas=None):
+        """
+        返回 canvas 上所有的 Dataflow_diagram（NetDiagram），按创建顺序；create_dataFlow 分页时一个块对应多张。
+        """
+        canvas = canvas if canvas is not None else self.current_canvas
+        diagrams = []
+        if canvas is None:
+            return diagrams
+        for pragma in canvas.getPragmas():
+            if not hasattr(pragma, "getDiagrams"):
+                continue
+            for diagram in pragma.getDiagrams():
+                if diagram.eClass().getName() == "NetDiagram" and str(diagram.getName()).startswith("Dataflow_diagram"):
+                    diagrams.append(diagram)
+        return diagrams
+
+
+    def layout_dataflow_diagrams(self, diagram_name: str = None):
+        """
+        对当前 canvas 的每张 Dataflow_diagram 做 layout_diagram；给出 diagram_name 时只布局同名的那一张。
+        返回 (布局的图数, 布局的 GE 总数)，没有符合条件的图时返回 None。
+        """
+        diagrams = self.get_dataflow_diagrams()
+        if diagram_name:
+            diagrams = [diagram for diagram in diagrams if str(diagram.getName()) == diagram_name]
+        if not diagrams:
+            log.warning("⚠️ 当前 canvas 没有数据流图%s", f" {diagram_name}" if diagram_name else "")
+            return None
+        count = sum(self.layout_diagram(diagram) for diagram in diagrams)
+        return len(diagrams), count
+
+
+    def place_equations(self, first_new: int):
+        """
+        patch 模式只放置新生成的等式：放在前驱 GE 右侧一个层间距、前驱的平均高度处，并重画与之相连的连线；
+        其余 GE 的位置不变。需要整体整理时调用 layout_diagram。
+        """
+        index = self.get_dataflow_index()
+        data = self.current_canvas.getData()
+        placed = []
+        for position in range(first_new, data.size()):
+            GE = index["ges"].get(data.get(self.backend.to_int(position)))
+            if GE is None:
+                continue
+            sources = [edge.getSrcEquation() for edge in index["edges"].get(GE, []) if edge.getDstEquation() == GE]
+            sources = [source for source in sources if source != GE]
+            if sources:
+                point = GE.getPosition()
+                point.setX(max(source.getPosition().getX() + source.getSize().getWidth() for source in sources) + LAYER_GAP)
+                point.setY(sum(source.getPosition().getY() for source in sources) // len(sources))
+            placed.append(GE)
+
+        rerouted = set()
+        for GE in placed:
+            for edge in index["edges"].get(GE, []):
+                if edge in rerouted:
+                    continue
+                rerouted.add(edge)
+                src, dst = edge.getSrcEquation(), edge.getDstEquation()
+                start = (src.getPosition().getX() + src.getSize().getWidth(),
+                         src.getPosition().getY() + src.getSize().getHeight() // 2)
+                end = (dst.getPosition().getX(), dst.getPosition().getY() + dst.getSize().getHeight() // 2)
+                self.set_edge_route(edge, orthogonal_route(start, end))
+        return len(placed)
+
+
+    def set_edge_route(self, edge, route):
+        """
+        用折线点列表 [(x, y), ...] 替换 Edge 的 positions。
+        """
+        points = edge.getPositions()
+        points.clear()
+        for x, y in route:
+            point = self.theEditorPragmasFactory.createPoint()
+            point.setX(x)
+            point.setY(y)
+            points.add(point)
+
+
+    def get_dataflow_index(self):
+        """
+        返回当前路径已有数据流的索引，首次访问时由 build_dataflow_index 建立并按路径缓存。
+        """
+        index = self.dataflow_index.get(self.current_full_dir)
+        if index is None:
+            index = self.dataflow_index[self.current_full_dir] = self.build_dataflow_index()
+        return index
+
+
+    def build_dataflow_index(self, canvas=None):
+        """
+        遍历 canvas 的等式和 NetDiagram 建立索引：
+        - equations: 左侧变量名元组 -> (Equation, 签名)
+        - duplicates: 左侧变量名与前面的等式重复的 Equation
+        - ges: Equation -> EquationGE
+        - edges: EquationGE -> 以其为端点的 Edge 列表
+        - diagram: 最近一张 Dataflow_diagram（没有时为 None）
+        """
+        canvas = canvas if canvas is not None else self.current_canvas
+        index = {"equations": {}, "duplicates": [], "ges": {}, "edges": {}, "diagram": None}
+        if canvas is None:
+            return index
+        for item in canvas.getData():
+            if item.eClass().getName() != "Equation":
+                continue
+            key, signature = self.equation_signature(item)
+            if key in index["equations"]:
+                index["duplicates"].append(item)
+            else:
+                index["equations"][key] = (item, signature)
+        for pragma in canvas.getPragmas():
+            if not hasattr(pragma, "getDiagrams"):
+                continue
+            for diagram in pragma.getDiagrams():
+                if diagram.eClass().getName() != "NetDiagram":
+                    continue
+                if str(diagram.getName()).startswith("Dataflow_diagram"):
+                    index["diagram"] = diagram
+                for element in diagram.getPresentationElements():
+                    kind = element.eClass().getName()
+                    if kind == "EquationGE" and element.getEquation() is not None:
+                        index["ges"].setdefault(element.getEquation(), element)
+                    elif kind == "Edge":
+                        for GE in (element.getSrcEquation(), element.getDstEquation()):
+                            if GE is not None:
+                                index["edges"].setdefault(GE, []).append(element)
+        log.debug("🟡 已建立数据流索引: %s 条等式", len(index["equations"]))
+        return index
+
+
+    def operand_text(self, expr):
+        """
+        等式操作数的文本：IdExpression 为变量名，ConstValue 为值，其他返回类名。
+        """
+        if expr is None:
+            return None
+        kind = expr.eClass().getName()
+        if kind == "IdExpression":
+            path = expr.getPath()
+            return str(path.getName()) if path is not None else None
+        if kind == "ConstValue":
+            return str(expr.getValue())
+        return kind
+
+
+    def expression_signature(self, expr):
+        """
+        解析得到的等式 -> (左侧变量名元组, 签名)，签名与 equation_signature 对已有等式的结果可直接比较。
+        """
+        key = tuple(expr.outputs)
+        if expr.iterator is not None:
+            iterator = expr.iterator
+            return key, (iterator.iterator, str(iterator.accumulators), iterator.operator, str(iterator.size),
+                         iterator.condition, tuple(expr.inputs))
+        if not expr.operator:
+            return key, ("=", tuple(expr.inputs))
+        return key, (self.OPERATOR_MAPPING.get(expr.operator, expr.operator), tuple(expr.inputs))
+
+
+    def equation_signature(self, equation):
+        """
+        已有的 Equation -> (左侧变量名元组, 签名)。
+        mapfoldwi 等式的前两个左侧变量是生成的 index/enable 局部变量，不计入变量名。
+        """
+        names = [str(var.getName()) for var in equation.getLefts()]
+        right = equation.getRight()
+        kind = right.eClass().getName() if right is not None else None
+        text = self.operand_text
+        if kind == "IdExpression":
+            signature = ("=", (text(right),))
+        elif kind in ("NAryOp", "BinaryOp", "UnaryOp"):
+            signature = (str(right.getOperator()), tuple(text(operand) for operand in right.getOperands()))
+        elif kind == "PreOp":
+            signature = ("pre", tuple(text(item) for item in right.getFlow().getItems()))
+        elif kind == "FbyOp":
+            operands = [text(flow) for flow in right.getFlows()] + [text(right.getDelay())]
+            operands += [text(value) for value in right.getValues()]
+            signature = ("fby", tuple(operands))
+        elif kind == "NumericCastOp":
+            signature = ("cast", (text(right.getFlow()), str(right.getType().getName())))
+        elif kind == "CallExpression":
+            opObj = right.getOperator()
+            params = tuple(text(param) for param in right.getCallParameters())
+            if opObj.eClass().getName() == "PartialIteratorOp":
+                names = names[2:]
+                signature = (str(opObj.getIterator()), str(opObj.getAccumulatorCount()),
+                             str(opObj.getOperator().getOperator().getName()), text(opObj.getSize()),
+                             text(opObj.getIf()), params)
             else:
-                # 赋值类
-                left = expr.get('outputs')
-                right = expr.get('inputs')
-                # 判断右侧是否为输入变量
-                right_kind, _ = self.determine_var_kind(right)
-                # 判断左侧是否为输出变量
-                left_kind, _ = self.determine_var_kind(left)
-
-                if right_kind == "Input":
-                    self.create_input_equation(right, left)
-                elif left_kind == "Output":
-                    self.create_output_equation(right, left)
+                signature = (str(opObj.getOperator().getName()), params)
+        else:
+            signature = (kind, ())
+        return tuple(names), signature
+
+
+    def delete_equation(self, equation, reuse_names=(), drop_locals: bool = True):
+        """
+        删除等式及其 EquationGE 和相连的 Edge，并维护 GE 索引、数据流索引和符号表。
+        drop_locals 时处理左侧的 canvas 局部变量：名称在 reuse_names 中的保留在 canvas 上并登记到 reusable_locals，
+        由重新生成的等式沿用；其余的删除。
+        返回以该等式为源、指向其他等式的 Edge（reuse_names 非空时保留，用于改接到新的 GE）。
+        """
+        index = self.get_dataflow_index()
+        ge_index = self.get_ge_index()
+        table = self.get_symbol_table()
+        outgoing = []
+
+        GE = index["ges"].pop(equation, None)
+        if GE is not None:
+            for edge in list(index["edges"].get(GE, [])):
+                if reuse_names and edge.getSrcEquation() == GE and edge.getDstEquation() != GE:
+                    outgoing.append(edge)
                 else:
-                    print(f"⚠️ 无法识别赋值类型: {right} = {left}")
+                    self.delete_edge(edge)
+            index["edges"].pop(GE, None)
+            self.EcoreUtil.remove(GE)
+
+        for var in list(equation.getLefts()):
+            name = str(var.getName())
+            if GE is not None and ge_index.get(name) == GE:
+                del ge_index[name]
+            if not drop_locals or table["Local"].get(name) != var:
+                continue
+            del table["Local"][name]
+            if name in reuse_names:
+                self.reusable_locals[name] = var
+            else:
+                self.EcoreUtil.remove(var)
+
+        self.EcoreUtil.remove(equation)
+        return outgoing
+
+
+    def delete_edge(self, edge):
+        """
+        删除 Edge，并从数据流索引中两个端点的列表里移除。
+        """
+        edges = self.get_dataflow_index()["edges"]
+        for GE in (edge.getSrcEquation(), edge.getDstEquation()):
+            connected = edges.get(GE)
+            if connected is not None and edge in connected:
+                connected.remove(edge)
+        self.EcoreUtil.remove(edge)
+
+
+    def emit_equation(self, expr):
+        """
+        按等式类型分派到对应的生成函数。
+        """
+        # mapfoldwi 需要特殊处理
+        if expr.iterator is not None:
+            self.create_mapfoldwi_equation(expr)
+            return
+
+        # 其他操作符的情况
+        if expr.operator:
+            operator_key = expr.operator
+            if operator_key in self.OPERATOR_MAPPING:
+                self.create_buildInOperator_equation(expr)
+            else:
+                self.create_operator_equation(expr)
+        else:
+            # 赋值类
+            left = expr.outputs[0]
+            right = expr.inputs[0]
+            # 判断右侧是否为输入变量
+            right_kind, _ = self.determine_var_kind(right)
+            # 判断左侧是否为输出变量
+            left_kind, _ = self.determine_var_kind(left)
+
+            if right_kind == "Input":
+                self.create_input_equation(right, left)
+            elif left_kind == "Output":
+                self.create_output_equation(right, left)
+            else:
+                log.warning("⚠️ 无法识别赋值类型: %s = %s", right, left)
 
 
 
@@ -0,0 +1,149 @@
+# SCADEBackend.py
+# SCADE_Builder 使用的后端：提供 theScadeFactory、theEditorPragmasFactory、EditorPragmasUtil、EcoreUtil、
+# ScadeModelReader/Writer 等对象。
+#   - "jpype":  通过 JPype 调用 ANSYS SCADE 的 Java API（默认）
+#   - "memory": SCADEMemory 中的纯 Python 内存实现，不需要 JVM，用于无界面试运行、CI 和性能分析
+# 可通过 SCADE_Builder(backend=...) 或环境变量 SCADE_BACKEND 选择
+import contextlib, os
+from SCADETrace import log
+
+try:
+    import jpype
+    from jpype.types import JInt
+except ImportError:  # 只使用 memory 后端时可以不安装 jpype
+    jpype = None
+    JInt = None
+
+# jpype 后端调用计数时包装的对象：工厂和工具类。模型对象本身的 getX/setX（实际上占 JPype 调用的大部分）
+# 返回的是原始 Java 对象，无法计入，因此这一口径的计数名为 factory_calls，只能用于比较工厂/工具类的调用量
+COUNTED_ATTRIBUTES = [
+    "theScadeFactory", "theCodegenPragmasFactory", "theEditorPragmasFactory",
+    "EditorPragmasUtil", "EcoreUtil", "ScadeModelReader", "ScadeModelWriter",
+]
+
+# init_scade_classes 时由后端提供、设置到 SCADE_Builder 上的属性
+BACKEND_ATTRIBUTES = [
+    "URI", "ResourceSetImpl",
+    "ScadeModelReader", "ScadeModelWriter",
+    "OperatorKind",
+    "ScadePackage", "theScadeFactory",
+    "CodegenPragmasPackage", "theCodegenPragmasFactory",
+    "EditorPragmasPackage", "theEditorPragmasFactory",
+    "EditorPragmasUtil", "EcoreUtil",
+]
+
+
+class CountingProxy:
+    """
+    包装 Java 工厂/工具类：count_calls 期间每次方法调用计入 backend.counter["名称.方法"]。
+    返回值不包装，模型对象仍是原始的 Java 对象。
+    """
+    def __init__(self, backend, name: str, target):
+        self._backend = backend
+        self._name = name
+        self._target = target
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if not callable(value):
+            return value
+        key = f"{self._name}.{attr}"
+        backend = self._backend
+
+        def counted(*args, **kwargs):
+            counter = backend.counter
+            if counter is not None:
+                counter[key] += 1
+            return value(*args, **kwargs)
+        self.__dict__[attr] = counted
+        return counted
+
+
+class JPypeBackend:
+    name = "jpype"
+    # 追踪/基准中调用次数的口径：只含工厂和工具类的调用
+    call_metric = "factory_calls"
+
+    def __init__(self):
+        self.counter = None
+
+    def is_started(self):
+        return jpype is not None and jpype.isJVMStarted()
+
+    def start(self, jvm_path=None, scade_lib_path=None, current_dir=None):
+        """
+        启动 JVM，并设置 classpath。
+        可传入参数自定义路径，也可使用默认路径。
+        """
+        if jpype is None:
+            raise ImportError("❌ 未安装 jpype，无法使用 jpype 后端")
+        if jpype.isJVMStarted():
+            log.warning("⚠️ JVM 已启动，跳过")
+            return False
+
+        # 默认值（可改为类属性或读取配置）
+        jvm_path = jvm_path or r"C:\Program Files\Java\jdk-11.0.2\bin\server\jvm.dll"
+        scade_lib_path = scade_lib_path or r"C:\Program Files\ANSYS Inc\v202\SCADE\contrib\lib\*"
+        current_dir = current_dir or os.getcwd()
+
+        jpype.startJVM(jvm_path, classpath=[scade_lib_path, current_dir])
+        log.info("✅ JVM 启动成功")
+        return True
+
+    def shutdown(self):
+        jpype.shutdownJVM()
+        log.info("✅ JVM 已关闭")
+
+    def load_classes(self):
+        classes = {}
+        classes["URI"] = jpype.JClass("org.eclipse.emf.common.util.URI")
+        classes["ResourceSetImpl"] = jpype.JClass("org.eclipse.emf.ecore.resource.impl.ResourceSetImpl")
+
+        classes["ScadeModelReader"] = jpype.JClass("com.esterel.scade.api.util.ScadeModelReader")
+        classes["ScadeModelWriter"] = jpype.JClass("com.esterel.scade.api.util.ScadeModelWriter")
+
+        classes["OperatorKind"] = jpype.JClass("com.esterel.scade.api.OperatorKind")
+
+        classes["ScadePackage"] = jpype.JClass("com.esterel.scade.api.ScadePackage")
+        classes["theScadeFactory"] = classes["ScadePackage"].eINSTANCE.getScadeFactory()
+
+        classes["CodegenPragmasPackage"] = jpype.JClass("com.esterel.scade.api.pragmas.codegen.CodegenPragmasPackage")
+        classes["theCodegenPragmasFactory"] = classes["CodegenPragmasPackage"].eINSTANCE.getCodegenPragmasFactory()
+
+        classes["EditorPragmasPackage"] = jpype.JClass("com.esterel.scade.api.pragmas.editor.EditorPragmasPackage")
+        classes["theEditorPragmasFactory"] = classes["EditorPragmasPackage"].eINSTANCE.getEditorPragmasFactory()
+
+        classes["EditorPragmasUtil"] = jpype.JClass("com.esterel.scade.api.pragmas.editor.util.EditorPragmasUtil")
+        classes["EcoreUtil"] = jpype.JClass("org.eclipse.emf.ecore.util.EcoreUtil")
+
+        for name in COUNTED_ATTRIBUTES:
+            classes[name] = CountingProxy(self, name, classes[name])
+        return classes
+
+    def to_int(self, value: int):
+        # EList.get 需要 Java int
+        return JInt(value)
+
+    @contextlib.contextmanager
+    def count_calls(self, counter):
+        """
+        with 块内统计工厂和工具类的调用次数（JPype 没有通用的调用钩子，模型对象的 getX/setX 不计入）。
+        """
+        previous, self.counter = self.counter, counter
+        try:
+            yield counter
+        finally:
+            self.counter = previous
+
+
+def get_backend(name: str = None):
+    """
+    按名称返回后端实例，name 为空时读取环境变量 SCADE_BACKEND（默认 "jpype"）。
+    """
+    name = name or os.environ.get("SCADE_BACKEND", "jpype")
+    if name == "jpype":
+        return JPypeBackend()
+    if name == "memory":
+        from SCADEMemory import MemoryBackend
+        return MemoryBackend()
+    raise ValueError(f"❌ 未知的后端: {name}")
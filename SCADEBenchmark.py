@@ -0,0 +1,261 @@
+# SCADEBenchmark.py
+# SCADE_Builder 热点路径的基准测试：生成给定规模的合成项目和数据流块，
+# 对各 builder 入口以及 SCADETools.registry 分发计时，统计每个操作的后端调用次数，结果写成 JSON 便于前后对比。
+#
+#   python SCADEBenchmark.py                                   # 默认规模，memory 后端，无需 JVM
+#   python SCADEBenchmark.py --equations 500 --repeat 5 --output after.json
+#   python SCADEBenchmark.py --output after.json --compare before.json
+#
+# 结果格式:
+#   {"meta": {...参数和环境，call_metric 为调用次数的口径（jpype: factory_calls，memory: model_calls）...},
+#    "results": {"create_dataFlow": {"runs": [...], "min": s, "median": s, "mean": s,
+#                                    "calls": {方法名: 次数} 或 null, "total_calls": n 或 null}, ...}}
+import argparse, collections, contextlib, io, json, os, platform, statistics, sys, tempfile, time
+
+# 默认规模
+DEFAULT_PARAMS = {
+    "packages": 2,
+    "operators": 5,
+    "locals": 50,
+    "equations": 200,
+    "states": 10,
+    "transitions": 20,
+    "constants": 20,
+    "array_size": 16,
+    "repeat": 3,
+}
+
+
+def generate_dataflow(equations: int, inputs: int = 4) -> str:
+    """
+    生成 equations 行的数据流块：前 inputs 行读取输入 In_1..In_n，之后轮流使用 + - * << pre，
+    最后一行赋值给输出 Out_1。
+    """
+    lines = [f"_L{index} = In_{index}" for index in range(1, inputs + 1)]
+    operators = ["+", "-", "*", "<<", "pre"]
+    for index in range(inputs + 1, equations + 1):
+        operator = operators[index % len(operators)]
+        first = f"_L{index - 1}"
+        second = f"_L{index - inputs}"
+        if operator == "pre":
+            lines.append(f"_L{index} = pre ({first})")
+        elif operator == "<<":
+            lines.append(f"_L{index} = << ({first}, 1)")
+        else:
+            lines.append(f"_L{index} = {operator} ({first}, {second})")
+    lines.append(f"Out_1 = _L{max(equations, inputs)}")
+    return "\n".join(lines)
+
+
+def generate_state_machine(states: int, transitions: int):
+    """
+    生成状态名列表和迁移列表：前 states 条迁移连成环，其余迁移跳过一个状态；条件依次使用 Cond_1..Cond_n。
+    """
+    names = [f"S{index}" for index in range(1, states + 1)]
+    edges = []
+    for index in range(transitions):
+        source = names[index % states]
+        step = 1 if index < states else 2
+        target = names[(index + step) % states]
+        edges.append((source, target, f"Cond_{index % 4 + 1}"))
+    return names, edges
+
+
+class Benchmark:
+    def __init__(self, builder, registry, params: dict, quiet: bool = True):
+        self.builder = builder
+        self.registry = registry
+        self.params = params
+        self.quiet = quiet
+        self.results = {}
+        self.operator_paths = []
+        self.serial = 0
+
+    def silenced(self):
+        # builder 的 print 输出不计入终端开销
+        if self.quiet:
+            return contextlib.redirect_stdout(io.StringIO())
+        return contextlib.nullcontext()
+
+    def next_name(self, prefix: str) -> str:
+        self.serial += 1
+        return f"{prefix}{self.serial}"
+
+    def measure(self, name: str, func, setup=None):
+        """
+        执行 repeat 次 func(state)，setup 不计时；记录每次耗时和后端调用次数（取最后一次）。
+        """
+        runs = []
+        calls = None
+        for _ in range(self.params["repeat"]):
+            with self.silenced():
+                state = setup() if setup is not None else None
+                counter = collections.Counter()
+                with self.builder.backend.count_calls(counter) as counted:
+                    start = time.perf_counter()
+                    func(state)
+                    runs.append(time.perf_counter() - start)
+            calls = dict(counter.most_common()) if counted is not None else None
+        self.results[name] = {
+            "runs": runs,
+            "min": min(runs),
+            "median": statistics.median(runs),
+            "mean": statistics.mean(runs),
+            "calls": calls,
+            "total_calls": sum(calls.values()) if calls is not None else None,
+        }
+        print(f"🔵 {name}: 中位数 {self.results[name]['median'] * 1000:.2f} ms"
+              + (f", {self.builder.backend.call_metric} {self.results[name]['total_calls']} 次" if calls is not None else ""))
+        return self.results[name]
+
+    def build_operator(self, name: str, locals_count: int):
+        """
+        在当前 Package 中新建带 4 个输入、1 个输出、locals_count 个局部变量的 Operator。
+        """
+        builder = self.builder
+        builder.create_operator(name)
+        for index in range(1, 5):
+            builder.create_input(f"In_{index}", "int32")
+            builder.create_input(f"Cond_{index}", "bool")
+        builder.create_output("Out_1", "int32")
+        for index in range(1, locals_count + 1):
+            builder.create_local(f"Var_{index}", "int32")
+
+    def build_project(self, project_dir: str):
+        """
+        合成项目：packages 个 Package，每个包含 operators 个 Operator。
+        """
+        builder = self.builder
+        builder.init_project_and_model(project_dir, "Benchmark")
+        for package_index in range(1, self.params["packages"] + 1):
+            builder.create_package(f"Package{package_index}")
+            for operator_index in range(1, self.params["operators"] + 1):
+                operator_name = f"Operator{operator_index}"
+                self.build_operator(operator_name, self.params["locals"])
+                self.operator_paths.append(f"Package{package_index}::{operator_name}/")
+        builder.save_project()
+
+    def fresh_operator(self):
+        builder = self.builder
+        builder.switch_to_operator_by_path("Package1::")
+        self.build_operator(self.next_name("BenchOperator"), 0)
+
+    def run(self, project_dir: str):
+        builder = self.builder
+        params = self.params
+
+        def build(state):
+            self.operator_paths = []
+            self.build_project(project_dir)
+        self.measure("build_project", build)
+
+        text = generate_dataflow(params["equations"])
+        self.measure("create_dataFlow", lambda state: builder.create_dataFlow(text), self.fresh_operator)
+
+        def switch_all(state):
+            for path in self.operator_paths:
+                builder.switch_to_operator_by_path(path)
+        self.measure("switch_to_operator_by_path", switch_all)
+
+        type_names = ["bool", "int32", "uint8", "float64", "Missing_Type"] * 20
+        def find_types(state):
+            for type_name in type_names:
+                builder.find_typeObject(type_name)
+        self.measure("find_typeObject", find_types)
+
+        array_value = json.dumps(list(range(params["array_size"])))
+        def create_constants(state):
+            for _ in range(params["constants"]):
+                builder.create_constant(self.next_name("Const_"), f"int32^{params['array_size']}", array_value)
+        self.measure("create_constant", create_constants, lambda: builder.switch_to_operator_by_path("Package1::"))
+
+        states, transitions = generate_state_machine(params["states"], params["transitions"])
+        self.measure("create_stateMachine",
+                     lambda state: builder.create_stateMachine(self.next_name("SM"), states, transitions),
+                     self.fresh_operator)
+
+        self.measure("save_project", lambda state: builder.save_project(), self.fresh_operator)
+        self.measure("save_project_full", lambda state: builder.save_project(full=True), self.fresh_operator)
+
+        # registry 分发与直接调用 builder 的对比，差值即工具层的开销
+        def direct_inputs(state):
+            for index in range(params["locals"]):
+                builder.create_input(f"Direct_{index}", "int32")
+        self.measure("create_input_direct", direct_inputs, self.fresh_operator)
+
+        create_input = self.registry["create_input"]
+        def dispatched_inputs(state):
+            for index in range(params["locals"]):
+                create_input({"input_name": f"Tool_{index}", "type": "int32"})
+        self.measure("create_input_registry", dispatched_inputs, self.fresh_operator)
+
+        switch = self.registry["switch_to_operator_by_path"]
+        def dispatched_switch(state):
+            for path in self.operator_paths:
+                switch({"path_str": path})
+        self.measure("switch_to_operator_by_path_registry", dispatched_switch)
+        return self.results
+
+
+def compare_results(old: dict, new: dict):
+    """
+    打印两次结果的中位数和调用次数对比。
+    """
+    print(f"{'操作':<40}{'之前(ms)':>12}{'之后(ms)':>12}{'比值':>8}{'调用之前':>12}{'调用之后':>12}")
+    for name, result in new["results"].items():
+        before = old["results"].get(name)
+        if before is None:
+            continue
+        ratio = result["median"] / before["median"] if before["median"] else float("inf")
+        print(f"{name:<40}{before['median'] * 1000:>12.2f}{result['median'] * 1000:>12.2f}{ratio:>8.2f}"
+              f"{str(before.get('total_calls')):>12}{str(result.get('total_calls')):>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SCADE builder 基准测试")
+    parser.add_argument("--backend", default="memory", help="后端：memory（默认，无需 JVM）或 jpype")
+    for name, value in DEFAULT_PARAMS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value, dest=name)
+    parser.add_argument("--project-dir", help="合成项目的目录，默认使用临时目录")
+    parser.add_argument("--output", help="结果 JSON 文件路径")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    parser.add_argument("--verbose", action="store_true", help="保留 builder 的输出")
+    args = parser.parse_args(argv)
+
+    # SCADETools 在导入时创建 builder，需先设置后端
+    os.environ["SCADE_BACKEND"] = args.backend
+    import SCADETools
+
+    params = {name: getattr(args, name) for name in DEFAULT_PARAMS}
+    builder = SCADETools.builder
+    with contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext():
+        builder.start_jvm()
+        builder.init_scade_classes()
+
+    project_dir = args.project_dir or tempfile.mkdtemp(prefix="scade_benchmark_")
+    benchmark = Benchmark(builder, SCADETools.registry, params, quiet=not args.verbose)
+    results = benchmark.run(project_dir)
+
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "call_metric": builder.backend.call_metric,
+            "params": params,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✅ 结果已写入 {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare_results(json.load(f), report)
+    return report
+
+
+if __name__ == "__main__":
+    main()
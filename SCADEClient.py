@@ -0,0 +1,114 @@
+# SCADEClient.py
+# SCADEDaemon 的轻量客户端：registry / tools 与 SCADETools 中的名称和参数定义完全一致，
+# 可直接替换 `from SCADETools import registry, tools`，工具调用转发给常驻的守护进程执行。
+# 工具定义在首次访问 registry / tools 时通过守护进程的 list_tools 获取，客户端本身不导入 SCADETools / SCADEAPI。
+#
+# 守护进程地址由环境变量 SCADE_DAEMON_ADDRESS 指定：
+#   - Unix socket 路径，例如 /tmp/scade_daemon.sock（默认）
+#   - host:port，例如 127.0.0.1:8765
+import itertools, json, os, socket, subprocess, sys, time
+
+DEFAULT_ADDRESS = os.environ.get("SCADE_DAEMON_ADDRESS", "/tmp/scade_daemon.sock")
+
+
+class DaemonClient:
+    def __init__(self, address: str = DEFAULT_ADDRESS, autostart: bool = True, timeout: float = None):
+        self.address = address
+        self.autostart = autostart
+        self.timeout = timeout
+        self.sock = None
+        self.reader = None
+        self.ids = itertools.count(1)
+
+    def is_tcp(self):
+        host, sep, port = self.address.rpartition(":")
+        return bool(sep) and port.isdigit() and os.sep not in host
+
+    def open_socket(self):
+        if self.is_tcp():
+            host, port = self.address.rsplit(":", 1)
+            return socket.create_connection((host, int(port)), timeout=self.timeout)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.address)
+        return sock
+
+    def start_daemon(self):
+        """
+        在后台启动守护进程，并等待其开始监听。
+        """
+        daemon_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "SCADEDaemon.py")
+        option = "--tcp" if self.is_tcp() else "--socket"
+        subprocess.Popen([sys.executable, daemon_script, option, self.address],
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                         start_new_session=True)
+        for _ in range(100):
+            time.sleep(0.1)
+            try:
+                return self.open_socket()
+            except OSError:
+                continue
+        raise ConnectionError(f"❌ 守护进程未能启动: {self.address}")
+
+    def connect(self):
+        if self.sock is not None:
+            return
+        try:
+            self.sock = self.open_socket()
+        except OSError:
+            if not self.autostart:
+                raise
+            self.sock = self.start_daemon()
+        self.reader = self.sock.makefile("r", encoding="utf-8")
+
+    def close(self):
+        if self.sock is not None:
+            self.reader.close()
+            self.sock.close()
+            self.sock = None
+            self.reader = None
+
+    def call(self, method: str, params=None):
+        """
+        发送一条 JSON-RPC 请求并等待结果；守护进程端的异常以 RuntimeError 抛出。
+        """
+        self.connect()
+        request = {"jsonrpc": "2.0", "id": next(self.ids), "method": method, "params": params or {}}
+        self.sock.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+        line = self.reader.readline()
+        if not line:
+            self.close()
+            raise ConnectionError("❌ 守护进程已断开连接")
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"]["message"])
+        return response["result"]
+
+
+def make_registry(client: DaemonClient, tools):
+    """
+    为 tools 中的每个工具生成转发函数，签名与 SCADETools.registry 相同：func(arguments) -> str
+    """
+    def make_forwarder(name):
+        def forward(arguments) -> str:
+            return client.call(name, arguments)
+        forward.__name__ = name
+        return forward
+
+    return {tool["function"]["name"]: make_forwarder(tool["function"]["name"]) for tool in tools}
+
+
+client = DaemonClient()
+
+
+def __getattr__(name):
+    """
+    延迟获取 tools / registry：第一次访问时向守护进程请求 list_tools，之后缓存在模块中。
+    """
+    if name not in ("tools", "registry"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = sys.modules[__name__]
+    tools = client.call("list_tools")
+    module.tools = tools
+    module.registry = make_registry(client, tools)
+    return getattr(module, name)
@@ -0,0 +1,178 @@
+# SCADEDaemon.py
+# 常驻进程：持有 JVM 和已加载的项目，通过 JSON-RPC（每行一个 JSON）对外提供 SCADETools.registry 中的工具
+#
+#   python SCADEDaemon.py --stdio
+#   python SCADEDaemon.py --socket /tmp/scade_daemon.sock
+#   python SCADEDaemon.py --tcp 127.0.0.1:8765
+#
+# 请求:  {"jsonrpc": "2.0", "id": 1, "method": "create_input", "params": {"input_name": "Input_01", "type": "bool"}}
+# 响应:  {"jsonrpc": "2.0", "id": 1, "result": "✅ Input Input_01 创建完成"}
+# 额外方法: list_tools（返回 tools 定义）、ping、shutdown
+import argparse, ipaddress, json, os, socket, stat, sys, threading, traceback
+import socketserver
+
+import SCADETools
+
+# 所有请求共用一个 builder，串行执行
+dispatch_lock = threading.Lock()
+shutdown_event = threading.Event()
+
+# JSON-RPC 错误码
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+TOOL_ERROR = -32000
+
+
+def make_error(request_id, code: int, message: str, data=None):
+    error = {"code": code, "message": message}
+    if data is not None:
+        error["data"] = data
+    return {"jsonrpc": "2.0", "id": request_id, "error": error}
+
+
+def handle_request(request):
+    """
+    执行一条 JSON-RPC 请求，返回响应 dict。
+    """
+    if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+        return make_error(None, INVALID_REQUEST, "无效的请求")
+
+    request_id = request.get("id")
+    method = request["method"]
+    params = request.get("params") or {}
+
+    if method == "ping":
+        return {"jsonrpc": "2.0", "id": request_id, "result": "pong"}
+    if method == "list_tools":
+        return {"jsonrpc": "2.0", "id": request_id, "result": SCADETools.tools}
+    if method == "shutdown":
+        shutdown_event.set()
+        return {"jsonrpc": "2.0", "id": request_id, "result": "✅ 守护进程即将退出"}
+
+    func = SCADETools.registry.get(method)
+    if func is None:
+        return make_error(request_id, METHOD_NOT_FOUND, f"未知工具: {method}")
+    if not isinstance(params, dict):
+        return make_error(request_id, INVALID_REQUEST, "params 必须是对象")
+
+    with dispatch_lock:
+        try:
+            result = func(params)
+        except Exception as exc:
+            return make_error(request_id, TOOL_ERROR, f"{type(exc).__name__}: {exc}", traceback.format_exc())
+    return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+
+def handle_line(line: str):
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as exc:
+        return make_error(None, PARSE_ERROR, str(exc))
+    return handle_request(request)
+
+
+def serve_stdio():
+    """
+    通过 stdin/stdout 提供服务。builder 的 print 输出被重定向到 stderr，stdout 只用于协议。
+    """
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        response = handle_line(line)
+        protocol_out.write(json.dumps(response, ensure_ascii=False) + "\n")
+        protocol_out.flush()
+        if shutdown_event.is_set():
+            break
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            line = raw.decode("utf-8")
+            if not line.strip():
+                continue
+            response = handle_line(line)
+            self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            if shutdown_event.is_set():
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+
+def serve_socket(socket_path: str):
+    """
+    通过 Unix socket 提供服务（仅 POSIX）。
+    """
+    if os.path.exists(socket_path):
+        if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            raise SystemExit(f"❌ {socket_path} 已存在且不是 socket，拒绝覆盖")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            # 无人监听：上次异常退出遗留的 socket 文件
+            os.remove(socket_path)
+        else:
+            raise SystemExit(f"❌ 已有守护进程在 {socket_path} 上监听，拒绝启动")
+        finally:
+            probe.close()
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    with Server(socket_path, RequestHandler) as server:
+        print(f"✅ SCADE 守护进程已启动: {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        return False
+
+
+def serve_tcp(host: str, port: int):
+    """
+    通过本机 TCP 提供服务（Windows 上没有 Unix socket 时使用）。
+    协议没有认证，只允许绑定回环地址。
+    """
+    if not is_loopback(host):
+        raise SystemExit(f"❌ TCP 模式只允许绑定回环地址（127.0.0.1 / ::1 / localhost），拒绝绑定 {host}")
+    class Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+    with Server((host, port), RequestHandler) as server:
+        print(f"✅ SCADE 守护进程已启动: {host}:{port}", file=sys.stderr)
+        server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SCADE builder 守护进程")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--stdio", action="store_true", help="通过 stdin/stdout 通信")
+    group.add_argument("--socket", help="Unix socket 路径")
+    group.add_argument("--tcp", help="本机地址，例如 127.0.0.1:8765")
+    args = parser.parse_args(argv)
+
+    if args.stdio:
+        serve_stdio()
+    elif args.socket:
+        serve_socket(args.socket)
+    else:
+        host, port = args.tcp.rsplit(":", 1)
+        serve_tcp(host, int(port))
+
+
+if __name__ == "__main__":
+    main()
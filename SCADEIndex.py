@@ -0,0 +1,647 @@
+# SCADEIndex.py
+# 只读的项目索引：不启动 JVM、不加载 EMF 模型，直接流式解析 .etp 和各 .xscade，
+# 回答“有哪些 Operator、端口和类型是什么”之类的问题。
+#   - index_file:   用增量 XML 解析器（iterparse）扫描一个 .xscade，得到该文件的部分索引（普通 dict，可序列化）；
+#                   处理完的元素立即从树上摘掉，内存占用只与嵌套深度和索引本身有关，与文件大小无关
+#   - merge_indexes: 按 .etp 中 FileRef 的顺序合并各文件的部分索引（同名声明先出现者优先）
+#   - ProjectIndex: 合并后的索引，按限定名查找 Package / Operator / Constant / Sensor / Type / OID
+#   - index_project: 读取 .etp，索引全部 .xscade；传入上一次的 ProjectIndex 时只重新解析 mtime/大小变化的文件
+#   - 需要重新解析的文件较多时按文件分发到进程池（ProcessPoolExecutor）并行解析，合并只依赖 .etp 中的顺序，
+#     因此结果与进程数和完成顺序无关；进程数由 workers 参数或环境变量 SCADE_INDEX_WORKERS 指定（默认 CPU 数）
+#   - 校验：解析时逐文件检查（重复声明、重复赋值、未声明/未赋值的变量），合并后由 ProjectIndex.validate
+#     再做跨文件检查（跨文件重复定义、无法解析的类型和被调用的 Operator）
+#   - IndexCache:   各文件的部分索引持久化到 .etp 旁边的 SQLite 文件（<项目名>.index.sqlite），
+#                   按 (mtime, 大小) 判断是否变化，只有 mtime 变了时再比较内容哈希，进程重启后只重新解析变化的文件
+# 部分索引的内容：
+#   packages   [限定名]
+#   operators  限定名 -> {"kind", "oid", "inputs"/"outputs"/"locals": [[名称, 类型]], "state_machines": [...]}
+#   constants  限定名 -> {"type", "value"}；sensors 限定名 -> {"type"}；types 限定名 -> 定义文本
+#   oids       oid -> [类名, canvas 路径, 名称]，canvas 路径与 switch_to_operator_by_path 的写法一致
+#   issues     [[严重程度 "error"/"warning", 路径, 说明]]
+#   unreadable 仅在 XML 解析失败时出现（True）：内容只到出错位置为止，不能用于否定查找
+import concurrent.futures, hashlib, json, multiprocessing, os
+from concurrent.futures.process import BrokenProcessPool
+import xml.etree.ElementTree as ET
+from SCADETrace import log, tracer
+from SCADEMemory import PREDEFINED_TYPES
+
+try:
+    import sqlite3
+except ImportError:  # 没有 sqlite3 时不做持久化，每个进程重新建立索引
+    sqlite3 = None
+
+# 缓存格式版本：部分索引的结构变化时加一，旧缓存整体作废
+CACHE_VERSION = 2
+HASH_CHUNK = 1 << 20
+
+# 需要解析的文件少于这个数时不启动进程池（启动子进程的开销大于收益）
+PARALLEL_MIN_FILES = 4
+
+SCADE_NAMESPACE = "http://www.esterel-technologies.com/ns/scade/6"
+
+# 索引中记录的声明种类：元素名 -> 部分索引中的键
+DECLARATION_KEYS = {"Constant": "constants", "Sensor": "sensors", "Type": "types"}
+VARIABLE_ROLES = ("inputs", "outputs", "locals")
+
+# 需要保留子树、在元素结束时整体处理的元素（子树都很小）
+KEPT_ELEMENTS = {"Variable", "Constant", "Sensor", "Type"}
+
+
+def local_name(tag: str):
+    """
+    "{uri}Name" -> (uri, Name)。
+    """
+    if tag[0] == "{":
+        uri, _, name = tag[1:].partition("}")
+        return uri, name
+    return "", tag
+
+
+def expression_text(element) -> str:
+    """
+    常量值、数组大小等简单表达式的文本形式，复杂表达式只给出元素名。
+    """
+    if element is None:
+        return ""
+    _, name = local_name(element.tag)
+    if name == "ConstValue":
+        return element.get("value", "")
+    if name == "IdExpression" or name.endswith("Ref"):
+        ref = element if name.endswith("Ref") else next(element.iter("{%s}ConstVarRef" % SCADE_NAMESPACE), None)
+        return ref.get("name", "") if ref is not None else ""
+    if name == "DataArrayOp":
+        data = first_child(element, "data")
+        items = [expression_text(item) for item in data] if data is not None else []
+        return "[" + ", ".join(items) + "]"
+    if name == "DataStructOp":
+        data = first_child(element, "data")
+        labels = [f"{item.get('label')}: {expression_text(first_item(item, 'flow'))}" for item in data] if data is not None else []
+        return "{" + ", ".join(labels) + "}"
+    return name
+
+
+def first_child(element, name: str):
+    for child in element:
+        if local_name(child.tag)[1] == name:
+            return child
+    return None
+
+
+def first_item(element, wrapper: str):
+    """
+    包装元素 wrapper 中的第一个元素，例如 <type><NamedType/></type> 中的 NamedType。
+    """
+    child = first_child(element, wrapper)
+    if child is None or len(child) == 0:
+        return None
+    return child[0]
+
+
+def type_text(element) -> str:
+    """
+    类型表达式的文本形式，与 create_input 等接受的写法一致，例如 "int32"、"P1::T^10^20"。
+    """
+    if element is None:
+        return ""
+    _, name = local_name(element.tag)
+    if name == "NamedType":
+        ref = first_item(element, "type")
+        return ref.get("name", "") if ref is not None else ""
+    if name == "Table":
+        inner = type_text(first_item(element, "type"))
+        return f"{inner}^{expression_text(first_item(element, 'size'))}"
+    if name.endswith("Ref"):
+        return element.get("name", "")
+    return name
+
+
+def new_partial(name: str) -> dict:
+    return {"file": name, "hash": None, "packages": [], "operators": {}, "constants": {}, "sensors": {}, "types": {},
+            "oids": {}, "issues": []}
+
+
+class HashingReader:
+    """
+    包装文件对象，解析器读取的同时计算内容哈希，文件只读一遍。
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.digest = hashlib.sha1()
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.digest.update(data)
+        return data
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as stream:
+        for chunk in iter(lambda: stream.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def index_file(path: str, name: str = None) -> dict:
+    """
+    流式解析一个 .xscade，返回它的部分索引。name 为索引中记录的文件名（通常是 .etp 中的 persistAs）。
+    XML 格式错误不抛出：记为该文件的 "error" 问题并标记 unreadable，其他文件照常索引和校验。
+    """
+    partial = new_partial(name or path)
+    stream = open(path, "rb")
+    reader = HashingReader(stream)
+    try:
+        events = ET.iterparse(reader, events=("start", "end"))
+        index_events(events, partial)
+    except ET.ParseError as exc:
+        partial["unreadable"] = True
+        partial["issues"].append(["error", "", f"XML 解析失败: {exc}"])
+    finally:
+        stream.close()
+    # 解析失败时解析器没有读完文件，哈希另外计算
+    partial["hash"] = file_hash(path) if partial.get("unreadable") else reader.digest.hexdigest()
+    return partial
+
+
+def index_events(events, partial: dict):
+    """
+    index_file 的主体：消费 iterparse 的 start/end 事件，把结果写入 partial。
+    """
+    # 模型对象栈：{"kind", "name", "qualified"/"canvas", ...}，只记录索引关心的对象
+    objects = []
+    # 与 XML 嵌套一致的元素栈，用于摘掉处理完的元素；kept 为位于需保留子树的元素内的层数
+    elements = []
+    kept = 0
+
+    def package_prefix():
+        names = [obj["name"] for obj in objects if obj["kind"] == "Package"]
+        return "::".join(names) + "::" if names else ""
+
+    def current(kind):
+        for obj in reversed(objects):
+            if obj["kind"] == kind:
+                return obj
+        return None
+
+    def current_canvas():
+        for obj in reversed(objects):
+            if "canvas" in obj:
+                return obj["canvas"]
+        return ""
+
+    for event, element in events:
+        uri, name = local_name(element.tag)
+        if event == "start":
+            elements.append(element)
+            if kept:
+                kept += 1
+                continue
+            if name in KEPT_ELEMENTS and uri == SCADE_NAMESPACE:
+                kept = 1
+                continue
+            wrapper = local_name(elements[-2].tag)[1] if len(elements) > 1 else None
+            if uri != SCADE_NAMESPACE:
+                oid = element.get("oid")
+                if oid is None or not objects:
+                    continue
+                owner = objects[-1]
+                if wrapper == "pragmas":
+                    # 模型对象自身的 editor pragma
+                    canvas = owner.get("canvas") or owner.get("qualified") or current_canvas()
+                    partial["oids"][oid] = [owner["kind"], canvas, owner["name"]]
+                    if owner["kind"] == "Operator":
+                        owner["record"]["oid"] = oid
+                else:
+                    # 图形元素（如 NetDiagram）自己的 oid
+                    partial["oids"][oid] = [name, current_canvas(), element.get("name", "")]
+                continue
+            if name == "Package":
+                qualified = package_prefix() + element.get("name", "")
+                partial["packages"].append(qualified)
+                objects.append({"kind": "Package", "name": element.get("name", ""), "qualified": qualified})
+            elif name == "Operator":
+                qualified = package_prefix() + element.get("name", "")
+                record = {"kind": element.get("kind", ""), "oid": None, "inputs": [], "outputs": [], "locals": [],
+                          "state_machines": [], "calls": []}
+                if qualified in partial["operators"]:
+                    partial["issues"].append(["error", qualified, "Operator 重复定义"])
+                partial["operators"].setdefault(qualified, record)
+                # declared / assigned: 变量名 -> [canvas]，Operator 结束时据此检查
+                objects.append({"kind": "Operator", "name": qualified, "canvas": qualified + "/", "record": record,
+                                "declared": {}, "assigned": {}})
+            elif name == "StateMachine":
+                operator = current("Operator")
+                state_machine = {"name": element.get("name", ""), "canvas": current_canvas(), "states": []}
+                if operator is not None:
+                    operator["record"]["state_machines"].append(state_machine)
+                objects.append({"kind": "StateMachine", "name": state_machine["name"], "record": state_machine})
+            elif name == "State":
+                state_machine = current("StateMachine")
+                state_name = element.get("name", "")
+                canvas = current_canvas()
+                if state_machine is not None:
+                    state_machine["record"]["states"].append(state_name)
+                    canvas = f"{state_machine['record']['canvas']}{state_machine['name']}:{state_name}:"
+                objects.append({"kind": "State", "name": state_name, "canvas": canvas})
+            elif name == "Equation":
+                objects.append({"kind": "Equation", "name": "", "lefts": []})
+            elif name == "Transition":
+                source = current("State")
+                objects.append({"kind": "Transition", "name": (source["name"] if source else "") + "->"})
+            elif name == "StateRef" and wrapper == "target" and objects and objects[-1]["kind"] == "Transition":
+                objects[-1]["name"] += element.get("name", "")
+            elif name == "VariableRef" and wrapper == "lefts" and objects and objects[-1]["kind"] == "Equation":
+                objects[-1]["lefts"].append(element.get("name", ""))
+                objects[-1]["name"] = ", ".join(objects[-1]["lefts"])
+            elif name == "OperatorRef":
+                operator = current("Operator")
+                called = element.get("name", "")
+                if operator is not None and called not in operator["record"]["calls"]:
+                    operator["record"]["calls"].append(called)
+            continue
+
+        # end：需保留子树内的元素只出栈，不摘除；子树的根结束时整体处理后再摘除
+        if kept:
+            kept -= 1
+            if kept:
+                elements.pop()
+                continue
+            wrapper = local_name(elements[-2].tag)[1] if len(elements) > 1 else None
+            if name == "Variable":
+                operator = current("Operator")
+                role = wrapper if wrapper in VARIABLE_ROLES else "locals"
+                if operator is not None:
+                    variable_name = element.get("name", "")
+                    operator["record"][role].append([variable_name, type_text(first_item(element, "type"))])
+                    canvases = operator["declared"].setdefault(variable_name, [])
+                    if current_canvas() in canvases:
+                        partial["issues"].append(["error", current_canvas(), f"变量 {variable_name} 重复声明"])
+                    canvases.append(current_canvas())
+                for pragma in element.iter():
+                    if pragma.get("oid") is not None:
+                        partial["oids"][pragma.get("oid")] = ["Variable", current_canvas(), element.get("name", "")]
+            else:
+                qualified = package_prefix() + element.get("name", "")
+                if name == "Type":
+                    partial["types"].setdefault(qualified, type_text(first_item(element, "definition")))
+                else:
+                    entry = {"type": type_text(first_item(element, "type"))}
+                    if name == "Constant":
+                        entry["value"] = expression_text(first_item(element, "value"))
+                    partial[DECLARATION_KEYS[name]].setdefault(qualified, entry)
+        elif uri == SCADE_NAMESPACE and objects and objects[-1]["kind"] == name:
+            obj = objects.pop()
+            if name == "Equation":
+                check_equation(obj, current("Operator"), current_canvas(), partial["issues"])
+            elif name == "Operator":
+                check_operator(obj, partial["issues"])
+        elements.pop()
+        if elements:
+            del elements[-1][-1]
+
+
+def check_equation(equation: dict, operator: dict, canvas: str, issues: list):
+    """
+    记录等式左侧变量的赋值位置；同一 canvas 中对同一变量赋值两次为错误。
+    """
+    if operator is None:
+        return
+    for left in equation["lefts"]:
+        if left == "_":
+            continue
+        canvases = operator["assigned"].setdefault(left, [])
+        if canvas in canvases:
+            issues.append(["error", canvas, f"变量 {left} 被多个等式赋值"])
+        canvases.append(canvas)
+
+
+def check_operator(operator: dict, issues: list):
+    """
+    Operator 结束时的检查：赋值给未声明的变量为错误，从未被赋值的输出和局部变量为警告。
+    """
+    record = operator["record"]
+    declared, assigned = operator["declared"], operator["assigned"]
+    for name, canvases in assigned.items():
+        if name not in declared:
+            issues.append(["error", canvases[0], f"等式左侧的变量 {name} 未声明"])
+    for role in ("outputs", "locals"):
+        for name, _ in record[role]:
+            if name not in assigned:
+                issues.append(["warning", operator["canvas"], f"变量 {name} 没有等式赋值"])
+
+
+def read_project_files(project_file: str):
+    """
+    .etp 中登记的模型文件：[(persistAs, 绝对路径)]，按 FileRef 出现的顺序，只保留 .xscade。
+    """
+    project_dir = os.path.dirname(os.path.abspath(project_file))
+    files = []
+    for _, element in ET.iterparse(project_file):
+        if local_name(element.tag)[1] == "FileRef":
+            persist_as = element.get("persistAs") or ""
+            if persist_as.endswith(".xscade"):
+                files.append((persist_as, os.path.normpath(os.path.join(project_dir, persist_as))))
+    return files
+
+
+def file_signature(path: str):
+    """
+    判断文件是否变化所用的 (mtime_ns, 大小)；文件不存在时返回 None。
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ProjectIndex:
+    """
+    合并后的项目索引。partials 保存每个文件的部分索引（persistAs -> dict），signatures 为索引时的文件签名，
+    其余字典为合并结果：限定名 -> 记录，记录中 "file" 为所在文件。
+    """
+    def __init__(self, project_file: str):
+        self.project_file = os.path.abspath(project_file)
+        self.files = []
+        self.partials = {}
+        self.signatures = {}
+        self.packages = {}
+        self.operators = {}
+        self.constants = {}
+        self.sensors = {}
+        self.types = {}
+        self.oids = {}
+        # 合并时发现的跨文件重复定义：[[严重程度, 文件, 限定名, 说明]]
+        self.duplicates = []
+        # contains 使用的短名集合：表名 -> {短名}，首次使用时建立
+        self.short_names = {}
+        # XML 解析失败的文件（persistAs），其内容不完整
+        self.unreadable = set()
+
+    def merge(self):
+        """
+        按 self.files 的顺序合并部分索引，同名声明先出现者优先（与 SCADE 加载顺序一致），结果与文件解析顺序无关。
+        """
+        self.packages, self.operators, self.constants, self.sensors, self.types, self.oids = {}, {}, {}, {}, {}, {}
+        self.short_names = {}
+        self.duplicates = []
+        self.unreadable = set()
+        for persist_as, _ in self.files:
+            partial = self.partials.get(persist_as)
+            if partial is None:
+                continue
+            if partial.get("unreadable"):
+                self.unreadable.add(persist_as)
+            for qualified in partial["packages"]:
+                self.packages.setdefault(qualified, persist_as)
+            for key in ("operators", "constants", "sensors"):
+                merged = getattr(self, key)
+                for qualified, record in partial[key].items():
+                    if qualified in merged:
+                        self.duplicates.append(["error", persist_as, qualified,
+                                                f"重复定义，已在 {merged[qualified]['file']} 中定义"])
+                        continue
+                    merged[qualified] = dict(record, file=persist_as)
+            for qualified, definition in partial["types"].items():
+                self.types.setdefault(qualified, {"definition": definition, "file": persist_as})
+            for oid, entry in partial["oids"].items():
+                self.oids.setdefault(oid, entry)
+        return self
+
+    def resolve_scoped(self, table: dict, name: str, scope: str) -> bool:
+        """
+        在 scope（限定名）所在的各级包中由内到外查找 name，与 SCADE 的名称解析顺序一致。
+        """
+        packages = scope.split("::")[:-1]
+        for count in range(len(packages), -1, -1):
+            prefix = "::".join(packages[:count])
+            if (f"{prefix}::{name}" if prefix else name) in table:
+                return True
+        return False
+
+    def validate(self):
+        """
+        返回全部校验问题 [(严重程度, 文件, 路径, 说明)]：先按文件顺序列出各文件自身的问题，
+        再列出跨文件问题（重复定义、无法解析的变量类型和被调用的 Operator）。
+        """
+        issues = []
+        for persist_as, _ in self.files:
+            partial = self.partials.get(persist_as)
+            if partial is not None:
+                issues.extend((severity, persist_as, path, message) for severity, path, message in partial.get("issues", []))
+        issues.extend(tuple(duplicate) for duplicate in self.duplicates)
+        for qualified, operator in self.operators.items():
+            for role in VARIABLE_ROLES:
+                for name, type_name in operator[role]:
+                    base = type_name.split("^", 1)[0]
+                    if base and base not in PREDEFINED_TYPES and not self.resolve_scoped(self.types, base, qualified):
+                        issues.append(("error", operator["file"], qualified + "/", f"变量 {name} 的类型 {base} 未定义"))
+            for called in operator.get("calls", []):
+                if not self.resolve_scoped(self.operators, called, qualified):
+                    issues.append(("warning", operator["file"], qualified + "/", f"调用的 Operator {called} 不在项目中"))
+        return issues
+
+    def resolve(self, table: dict, name: str):
+        """
+        按限定名查找；不带包名时，名称唯一则按短名匹配。
+        """
+        record = table.get(name)
+        if record is not None or "::" in name:
+            return record
+        matches = [qualified for qualified in table if qualified.rsplit("::", 1)[-1] == name]
+        return table[matches[0]] if len(matches) == 1 else None
+
+    def contains(self, key: str, name: str) -> bool:
+        """
+        key 表（"operators"、"types" 等）中是否有限定名或短名为 name 的声明（短名可以不唯一）。
+        类型表同时包含预定义类型。
+        """
+        table = getattr(self, key)
+        if name in table or (key == "types" and name in PREDEFINED_TYPES):
+            return True
+        if "::" in name:
+            return False
+        names = self.short_names.get(key)
+        if names is None:
+            names = self.short_names[key] = {qualified.rsplit("::", 1)[-1] for qualified in table}
+        return name in names
+
+    def find_operator(self, name: str):
+        return self.resolve(self.operators, name)
+
+    def find_type(self, name: str):
+        return self.resolve(self.types, name)
+
+    def find_oid(self, oid: str):
+        return self.oids.get(oid)
+
+    def operator_names(self, package: str = None):
+        """
+        Operator 限定名列表（按合并顺序），package 不为空时只列该包（含子包）中的。
+        """
+        if not package:
+            return list(self.operators)
+        prefix = package.rstrip(":") + "::"
+        return [name for name in self.operators if name.startswith(prefix)]
+
+    def summary(self):
+        return {"files": len(self.files), "packages": len(self.packages), "operators": len(self.operators),
+                "constants": len(self.constants), "sensors": len(self.sensors), "types": len(self.types),
+                "oids": len(self.oids)}
+
+
+def cache_path_for(project_file: str) -> str:
+    """
+    项目索引缓存文件：.etp 旁边的 <项目名>.index.sqlite。
+    """
+    return os.path.splitext(os.path.abspath(project_file))[0] + ".index.sqlite"
+
+
+class IndexCache:
+    """
+    SQLite 中的部分索引缓存，每个 .xscade 一行：persistAs、mtime_ns、大小、内容哈希、部分索引（JSON）。
+    缓存版本与 CACHE_VERSION 不一致时清空重建。缓存文件损坏或不可写时只记录警告，索引照常建立。
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS files (persist_as TEXT PRIMARY KEY, mtime_ns INTEGER, "
+                                    "size INTEGER, hash TEXT, data TEXT)")
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != str(CACHE_VERSION):
+                self.connection.execute("DELETE FROM files")
+                self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(CACHE_VERSION),))
+
+    def load(self):
+        """
+        读取全部行：persistAs -> (签名, 哈希, 部分索引的 JSON 文本)；JSON 在用到时才解析。
+        """
+        rows = self.connection.execute("SELECT persist_as, mtime_ns, size, hash, data FROM files")
+        return {persist_as: ((mtime_ns, size), digest, data) for persist_as, mtime_ns, size, digest, data in rows}
+
+    def store(self, updates: dict, touched: dict, keep):
+        """
+        一个事务内写入新解析的部分索引（persistAs -> (签名, 部分索引)）、
+        只更新签名的行（persistAs -> 签名），并删除不在 keep 中的文件。
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                [(persist_as, signature[0], signature[1], partial["hash"], json.dumps(partial, ensure_ascii=False))
+                 for persist_as, (signature, partial) in updates.items()])
+            self.connection.executemany(
+                "UPDATE files SET mtime_ns = ?, size = ? WHERE persist_as = ?",
+                [(signature[0], signature[1], persist_as) for persist_as, signature in touched.items()])
+            keep = set(keep)
+            stale = [(persist_as,) for (persist_as,) in self.connection.execute("SELECT persist_as FROM files")
+                     if persist_as not in keep]
+            self.connection.executemany("DELETE FROM files WHERE persist_as = ?", stale)
+
+    def close(self):
+        self.connection.close()
+
+
+def open_cache(project_file: str):
+    if sqlite3 is None:
+        return None
+    path = cache_path_for(project_file)
+    try:
+        return IndexCache(path)
+    except sqlite3.Error as exc:
+        log.warning("⚠️ 无法打开索引缓存 %s: %s", path, exc)
+        return None
+
+
+def default_workers() -> int:
+    """
+    默认进程数：环境变量 SCADE_INDEX_WORKERS，未设置时为 CPU 数。
+    """
+    value = os.environ.get("SCADE_INDEX_WORKERS")
+    if value:
+        return max(1, int(value))
+    return os.cpu_count() or 1
+
+
+def parse_files(files, workers: int = None):
+    """
+    解析 files（[(persistAs, 路径)]），返回 persistAs -> 部分索引。
+    文件数达到 PARALLEL_MIN_FILES 且 workers > 1 时分发到进程池，大文件先提交以均衡负载；
+    进程池不可用时退回串行解析。
+    """
+    workers = default_workers() if workers is None else max(1, workers)
+    workers = min(workers, len(files))
+    if workers <= 1 or len(files) < PARALLEL_MIN_FILES:
+        partials = {}
+        for persist_as, path in files:
+            with tracer.span("index:file", file=persist_as):
+                partials[persist_as] = index_file(path, persist_as)
+        return partials
+
+    # 使用 spawn：父进程中可能已启动 JVM，fork 一个带 JVM 线程的进程并不安全
+    ordered = sorted(files, key=lambda item: os.path.getsize(item[1]), reverse=True)
+    try:
+        with tracer.span("index:parallel", files=len(files), workers=workers):
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                        mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = {persist_as: executor.submit(index_file, path, persist_as) for persist_as, path in ordered}
+                return {persist_as: futures[persist_as].result() for persist_as, _ in files}
+    except (OSError, RuntimeError, BrokenProcessPool) as exc:
+        # RuntimeError：spawn 子进程重新导入未加 __main__ 保护的调用脚本时，进程池无法启动
+        log.warning("⚠️ 并行索引失败，改为串行解析: %s", exc)
+        return parse_files(files, 1)
+
+
+def index_project(project_file: str, previous: ProjectIndex = None, use_cache: bool = True, workers: int = None):
+    """
+    索引 .etp 中登记的全部 .xscade，返回 ProjectIndex。每个文件依次尝试：
+      1. previous（同一项目上一次的索引）中签名相同的部分索引
+      2. SQLite 缓存中签名相同的行；签名不同但大小相同时比较内容哈希，一致则沿用并更新签名
+      3. 重新解析（由 parse_files 按 workers 并行），并写回缓存
+    """
+    index = ProjectIndex(project_file)
+    cache = open_cache(project_file) if use_cache else None
+    with tracer.span("index:project", project=os.path.basename(project_file)):
+        index.files = read_project_files(project_file)
+        cached = cache.load() if cache is not None else {}
+        updates, touched = {}, {}
+        to_parse = []
+        hits = 0
+        for persist_as, path in index.files:
+            signature = file_signature(path)
+            if signature is None:
+                log.warning("⚠️ 模型文件不存在: %s", path)
+                continue
+            index.signatures[persist_as] = signature
+            if previous is not None and previous.signatures.get(persist_as) == signature:
+                index.partials[persist_as] = previous.partials[persist_as]
+                continue
+
+            row = cached.get(persist_as)
+            if row is not None:
+                cached_signature, digest, data = row
+                if cached_signature == signature or (cached_signature[1] == signature[1] and file_hash(path) == digest):
+                    index.partials[persist_as] = json.loads(data)
+                    if cached_signature != signature:
+                        touched[persist_as] = signature
+                    hits += 1
+                    continue
+
+            to_parse.append((persist_as, path))
+
+        for persist_as, partial in parse_files(to_parse, workers).items():
+            index.partials[persist_as] = partial
+            updates[persist_as] = (index.signatures[persist_as], partial)
+        index.merge()
+
+        if cache is not None:
+            try:
+                cache.store(updates, touched, index.signatures)
+            except sqlite3.Error as exc:
+                log.warning("⚠️ 写入索引缓存失败: %s", exc)
+            finally:
+                cache.close()
+    log.debug("🟡 项目索引: %s 个文件（缓存命中 %s 个，重新解析 %s 个）, %s",
+              len(index.files), hits, len(updates), index.summary())
+    return index
@@ -0,0 +1,540 @@
+# SCADELayout.py
+# 数据流图的分层（Sugiyama）布局，create_dataFlow 生成等式之后调用：
+#   1. 去环：DFS 找出反馈边（pre/fby 环），分层时忽略，连线从图的下方绕回
+#   2. 分层：最长路径分层，数据流从左到右
+#   3. 跨层的边插入虚拟节点，做若干轮重心法（barycenter）扫描减少交叉；
+#      每轮所有层同时按上一轮的位置计算重心（Jacobi 方式），整轮可以向量化
+#   4. 坐标：层的 x 由各层最大宽度累加，层内按顺序堆叠并在各层之间居中对齐
+#   5. 连线：正交折线，折点位于层间空隙的中线，经过的虚拟节点即折点；
+#      反馈边和跨越层数超过 MAX_SPAN 的长边不插入虚拟节点（避免虚拟节点数随层数平方增长），从图的下方绕行
+# 状态机使用网格布局（grid_layout）和沿网格通道的正交走线（route_transitions）。
+# 很大的数据流块可以先用 partition_graph 划分成有大小上限、簇内连线尽量多的簇，每簇一张图，幅面由 page_format 按内容选择。
+# 安装了 NumPy 时第 3、4 步和网格坐标向量化，否则使用纯 Python 实现，两者结果相同。
+# 本模块只处理抽象的图（节点尺寸 + 边），不依赖 SCADE 后端。
+import collections
+
+try:
+    import numpy as np
+except ImportError:  # 没有 NumPy 时使用纯 Python 实现
+    np = None
+
+# positions: 每个节点左上角 (x, y)；routes: 每条边的折线点列表；layers: 每个节点所在层
+Layout = collections.namedtuple("Layout", ["positions", "routes", "layers"])
+
+LAYER_GAP = 1500
+NODE_GAP = 500
+SWEEPS = 8
+MAX_SPAN = 8
+# partition_graph 合并后逐节点细化的最多轮数
+REFINE_SWEEPS = 2
+
+
+def find_back_edges(count: int, edges):
+    """
+    迭代 DFS，返回构成环的边（指向 DFS 栈上节点的边，含自环）的下标集合。
+    """
+    successors = [[] for _ in range(count)]
+    for index, (src, dst) in enumerate(edges):
+        successors[src].append((dst, index))
+
+    state = [0] * count  # 0 未访问，1 在栈上，2 已完成
+    back = set()
+    for root in range(count):
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, iter(successors[root]))]
+        while stack:
+            node, children = stack[-1]
+            for dst, index in children:
+                if state[dst] == 1:
+                    back.add(index)
+                elif state[dst] == 0:
+                    state[dst] = 1
+                    stack.append((dst, iter(successors[dst])))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return back
+
+
+def assign_layers(count: int, edges, back):
+    """
+    最长路径分层（忽略反馈边）：没有前驱的节点在第 0 层，其余节点在所有前驱的下一层之后。
+    """
+    successors = [[] for _ in range(count)]
+    indegree = [0] * count
+    for index, (src, dst) in enumerate(edges):
+        if index in back:
+            continue
+        successors[src].append(dst)
+        indegree[dst] += 1
+
+    layer = [0] * count
+    queue = [node for node in range(count) if indegree[node] == 0]
+    for node in queue:
+        next_layer = layer[node] + 1
+        for dst in successors[node]:
+            if layer[dst] < next_layer:
+                layer[dst] = next_layer
+            indegree[dst] -= 1
+            if indegree[dst] == 0:
+                queue.append(dst)
+    return layer
+
+
+def insert_dummies(count: int, edges, detours, layer):
+    """
+    把跨越多层的边拆成相邻层之间的线段，detours 中的边（绕行的边）跳过。
+    返回 (node_layer, key, segments, chains)：
+    - node_layer: 真实节点和虚拟节点所在层
+    - key: 初始排序键，虚拟节点排在其源节点之后
+    - segments: 相邻层之间的 (上层节点, 下层节点)
+    - chains: 边下标 -> 途经的虚拟节点列表
+    """
+    node_layer = list(layer)
+    key = [float(node) for node in range(count)]
+    segments = []
+    chains = {}
+    for index, (src, dst) in enumerate(edges):
+        if index in detours:
+            continue
+        chain = []
+        previous = src
+        for dummy_layer in range(layer[src] + 1, layer[dst]):
+            dummy = len(node_layer)
+            node_layer.append(dummy_layer)
+            key.append(src + 0.5)
+            segments.append((previous, dummy))
+            chain.append(dummy)
+            previous = dummy
+        segments.append((previous, dst))
+        if chain:
+            chains[index] = chain
+    return node_layer, key, segments, chains
+
+
+# 交叉消减
+
+def order_python(node_layer, key, segments, sweeps: int):
+    """
+    返回每个节点在层内的位置。偶数轮按前驱的平均位置排序，奇数轮按后继。
+    """
+    count = len(node_layer)
+    predecessors = [[] for _ in range(count)]
+    successors = [[] for _ in range(count)]
+    for upper, lower in segments:
+        predecessors[lower].append(upper)
+        successors[upper].append(lower)
+
+    def ranks(sort_key):
+        order = sorted(range(count), key=sort_key)
+        pos = [0] * count
+        current_layer, rank = None, 0
+        for node in order:
+            if node_layer[node] != current_layer:
+                current_layer, rank = node_layer[node], 0
+            pos[node] = rank
+            rank += 1
+        return pos
+
+    pos = ranks(lambda node: (node_layer[node], key[node]))
+    for sweep in range(sweeps):
+        adjacent = predecessors if sweep % 2 == 0 else successors
+        bary = [sum(pos[other] for other in adjacent[node]) / len(adjacent[node]) if adjacent[node] else pos[node]
+                for node in range(count)]
+        pos = ranks(lambda node: (node_layer[node], bary[node], pos[node]))
+    return pos
+
+
+def order_numpy(node_layer, key, segments, sweeps: int):
+    count = len(node_layer)
+    layer = np.asarray(node_layer, dtype=np.int64)
+    layer_start = np.concatenate(([0], np.cumsum(np.bincount(layer))[:-1]))
+    upper = np.fromiter((segment[0] for segment in segments), dtype=np.int64, count=len(segments))
+    lower = np.fromiter((segment[1] for segment in segments), dtype=np.int64, count=len(segments))
+
+    def ranks(order):
+        pos = np.empty(count, dtype=np.int64)
+        pos[order] = np.arange(count) - layer_start[layer[order]]
+        return pos
+
+    pos = ranks(np.lexsort((np.asarray(key), layer)))
+    for sweep in range(sweeps):
+        source, target = (upper, lower) if sweep % 2 == 0 else (lower, upper)
+        sums = np.bincount(target, weights=pos[source], minlength=count)
+        counts = np.bincount(target, minlength=count)
+        bary = np.where(counts > 0, sums / np.maximum(counts, 1), pos)
+        pos = ranks(np.lexsort((pos, bary, layer)))
+    return pos.tolist()
+
+
+# 坐标
+
+def place_python(node_layer, pos, widths, heights, origin, layer_gap: int, node_gap: int):
+    """
+    返回 (x, y, layer_x)：层内按 pos 自上而下堆叠，每层整体在最高的层中居中。
+    """
+    layer_count = max(node_layer) + 1
+    layer_width = [0] * layer_count
+    layer_height = [0] * layer_count
+    for node, layer in enumerate(node_layer):
+        layer_width[layer] = max(layer_width[layer], widths[node])
+        layer_height[layer] += heights[node] + node_gap
+
+    layer_x = []
+    x = origin[0]
+    for width in layer_width:
+        layer_x.append(x)
+        x += width + layer_gap
+    tallest = max(layer_height)
+
+    order = sorted(range(len(node_layer)), key=lambda node: (node_layer[node], pos[node]))
+    ys = [0.0] * len(node_layer)
+    current_layer, offset = None, 0.0
+    for node in order:
+        layer = node_layer[node]
+        if layer != current_layer:
+            current_layer = layer
+            offset = origin[1] + (tallest - layer_height[layer]) / 2
+        ys[node] = offset
+        offset += heights[node] + node_gap
+    xs = [layer_x[layer] for layer in node_layer]
+    return xs, ys, layer_x
+
+
+def place_numpy(node_layer, pos, widths, heights, origin, layer_gap: int, node_gap: int):
+    layer = np.asarray(node_layer, dtype=np.int64)
+    width = np.asarray(widths, dtype=np.float64)
+    height = np.asarray(heights, dtype=np.float64) + node_gap
+    layer_count = int(layer.max()) + 1
+
+    layer_width = np.zeros(layer_count)
+    np.maximum.at(layer_width, layer, width)
+    layer_x = origin[0] + np.concatenate(([0.0], np.cumsum(layer_width + layer_gap)[:-1]))
+    layer_height = np.bincount(layer, weights=height, minlength=layer_count)
+    layer_top = origin[1] + (layer_height.max() - layer_height) / 2
+
+    order = np.lexsort((np.asarray(pos), layer))
+    stacked = np.cumsum(height[order]) - height[order]
+    first = np.concatenate(([0], np.cumsum(np.bincount(layer, minlength=layer_count))[:-1]))
+    ys = np.empty(len(node_layer))
+    ys[order] = layer_top[layer[order]] + stacked - stacked[first][layer[order]]
+    return layer_x[layer].tolist(), ys.tolist(), layer_x.tolist()
+
+
+# 连线
+
+def port_y(y: float, height: float, port: int, ports: int) -> float:
+    return y + height * port / (ports + 1)
+
+
+def layered_layout(sizes, edges, origin=(1000, 1000), layer_gap: int = LAYER_GAP, node_gap: int = NODE_GAP,
+                   sweeps: int = SWEEPS, max_span: int = MAX_SPAN, use_numpy: bool = None):
+    """
+    sizes: 每个节点的 (width, height)
+    edges: (src, dst) 或 (src, dst, src_port, dst_port)，端口从 1 开始，用于在节点左右两侧均分连接点
+    use_numpy: None 时有 NumPy 就使用
+    返回 Layout，坐标均为整数。
+    """
+    count = len(sizes)
+    if count == 0:
+        return Layout([], [[] for _ in edges], [])
+    use_numpy = np is not None if use_numpy is None else use_numpy
+    if use_numpy and np is None:
+        raise ImportError("❌ 未安装 NumPy")
+
+    links = [(edge[0], edge[1]) for edge in edges]
+    ports = [(edge[2], edge[3]) if len(edge) > 2 else (1, 1) for edge in edges]
+    back = find_back_edges(count, links)
+    layer = assign_layers(count, links, back)
+    detours = back | {index for index, (src, dst) in enumerate(links) if layer[dst] - layer[src] > max_span}
+    node_layer, key, segments, chains = insert_dummies(count, links, detours, layer)
+
+    dummies = len(node_layer) - count
+    widths = [size[0] for size in sizes] + [0] * dummies
+    heights = [size[1] for size in sizes] + [0] * dummies
+    if use_numpy:
+        pos = order_numpy(node_layer, key, segments, sweeps)
+        xs, ys, layer_x = place_numpy(node_layer, pos, widths, heights, origin, layer_gap, node_gap)
+    else:
+        pos = order_python(node_layer, key, segments, sweeps)
+        xs, ys, layer_x = place_python(node_layer, pos, widths, heights, origin, layer_gap, node_gap)
+
+    out_ports = [1] * count
+    in_ports = [1] * count
+    for (src, dst), (src_port, dst_port) in zip(links, ports):
+        out_ports[src] = max(out_ports[src], src_port)
+        in_ports[dst] = max(in_ports[dst], dst_port)
+
+    # 绕行的边在所有节点下方逐条错开的通道中走线
+    channel = max(ys[node] + heights[node] for node in range(count)) + node_gap
+    half_gap = layer_gap / 2
+    routes = []
+    for index, ((src, dst), (src_port, dst_port)) in enumerate(zip(links, ports)):
+        start_x, start_y = xs[src] + widths[src], port_y(ys[src], heights[src], src_port, out_ports[src])
+        end_x, end_y = xs[dst], port_y(ys[dst], heights[dst], dst_port, in_ports[dst])
+        if index in detours:
+            route = [(start_x, start_y), (start_x + half_gap, start_y), (start_x + half_gap, channel),
+                     (end_x - half_gap, channel), (end_x - half_gap, end_y), (end_x, end_y)]
+            channel += node_gap / 2
+        else:
+            route = [(start_x, start_y)]
+            current_y = start_y
+            for node in chains.get(index, []) + [dst]:
+                next_y = ys[node] if node >= count else end_y
+                if next_y != current_y:
+                    middle = layer_x[node_layer[node]] - half_gap
+                    route.append((middle, current_y))
+                    route.append((middle, next_y))
+                    current_y = next_y
+            route.append((end_x, end_y))
+        routes.append([(round(x), round(y)) for x, y in route])
+
+    positions = [(round(xs[node]), round(ys[node])) for node in range(count)]
+    return Layout(positions, routes, layer)
+
+
+def orthogonal_route(start, end, layer_gap: int = LAYER_GAP):
+    """
+    两点之间的正交折线：目标在右侧时在中线处折一次，否则从两侧各伸出半个层间距后绕行。
+    """
+    (start_x, start_y), (end_x, end_y) = start, end
+    if start_y == end_y and end_x > start_x:
+        return [start, end]
+    if end_x > start_x:
+        middle = (start_x + end_x) // 2
+        return [start, (middle, start_y), (middle, end_y), end]
+    half_gap = layer_gap // 2
+    return [start, (start_x + half_gap, start_y), (start_x + half_gap, end_y + half_gap),
+            (end_x - half_gap, end_y + half_gap), (end_x - half_gap, end_y), end]
+
+
+# 状态机：状态按网格排列，迁移沿网格之间的通道正交走线
+
+STATE_GAP = 2000
+LANES = 7
+
+
+def bfs_order(count: int, edges):
+    """
+    从第 0 个节点（初始状态）开始广度优先编号，相互迁移的状态排得相近；不可达的节点按下标接在后面。
+    """
+    successors = [[] for _ in range(count)]
+    for src, dst in edges:
+        successors[src].append(dst)
+    seen = [False] * count
+    order = []
+    for root in range(count):
+        if seen[root]:
+            continue
+        seen[root] = True
+        queue = [root]
+        for node in queue:
+            for dst in successors[node]:
+                if not seen[dst]:
+                    seen[dst] = True
+                    queue.append(dst)
+        order.extend(queue)
+    return order
+
+
+def grid_layout(count: int, edges, size=(2000, 2000), gap: int = STATE_GAP, origin=(0, 0), columns: int = None,
+                use_numpy: bool = None):
+    """
+    把 count 个同样大小的节点按 bfs_order 的顺序逐行放入 columns 列（默认约为平方根）的网格。
+    返回 (positions, columns)，positions 为每个节点左上角 (x, y)。
+    """
+    if count == 0:
+        return [], 0
+    use_numpy = np is not None if use_numpy is None else use_numpy
+    columns = columns or max(1, int(count ** 0.5 + 0.999999))
+    order = bfs_order(count, edges)
+    pitch_x, pitch_y = size[0] + gap, size[1] + gap
+    if use_numpy:
+        slot = np.empty(count, dtype=np.int64)
+        slot[np.asarray(order, dtype=np.int64)] = np.arange(count)
+        row, column = np.divmod(slot, columns)
+        xs = (origin[0] + column * pitch_x).tolist()
+        ys = (origin[1] + row * pitch_y).tolist()
+        return list(zip(xs, ys)), columns
+    positions = [None] * count
+    for slot, node in enumerate(order):
+        row, column = divmod(slot, columns)
+        positions[node] = (origin[0] + column * pitch_x, origin[1] + row * pitch_y)
+    return positions, columns
+
+
+def route_transitions(positions, edges, size=(2000, 2000), gap: int = STATE_GAP):
+    """
+    按 grid_layout 的网格为每条迁移生成正交折线：
+    - 自环：从右侧伸出再绕回右侧
+    - 左右或上下相邻：直线
+    - 其他：从朝向目标的上/下边进入源所在行旁边的水平通道，沿通道走到目标左侧的竖直通道，再从左侧进入目标
+    同一通道中的迁移按下标错开到 LANES 条车道上，避免重叠。
+    """
+    width, height = size
+    pitch_x, pitch_y = width + gap, height + gap
+    lane_step = gap // (LANES + 1)
+    routes = []
+    for index, (src, dst) in enumerate(edges):
+        (sx, sy), (dx, dy) = positions[src], positions[dst]
+        lane = (index % LANES - LANES // 2) * lane_step
+        if src == dst:
+            right = sx + width
+            loop = right + gap // 3 + lane // 2
+            routes.append([(right, sy + height // 3), (loop, sy + height // 3),
+                           (loop, sy + height * 2 // 3), (right, sy + height * 2 // 3)])
+            continue
+        columns_apart = (dx - sx) // pitch_x
+        rows_apart = (dy - sy) // pitch_y
+        if rows_apart == 0 and abs(columns_apart) == 1:
+            y = sy + height // 2 + lane // 4
+            if columns_apart > 0:
+                routes.append([(sx + width, y), (dx, y)])
+            else:
+                routes.append([(sx, y), (dx + width, y)])
+            continue
+        if columns_apart == 0 and abs(rows_apart) == 1:
+            x = sx + width // 2 + lane // 4
+            if rows_apart > 0:
+                routes.append([(x, sy + height), (x, dy)])
+            else:
+                routes.append([(x, sy), (x, dy + height)])
+            continue
+        x = sx + width // 2 + lane // 4
+        if dy >= sy:
+            start, corridor_y = (x, sy + height), sy + height + gap // 2 + lane
+        else:
+            start, corridor_y = (x, sy), sy - gap // 2 + lane
+        corridor_x = dx - gap // 2 + lane
+        end_y = dy + height // 2 + lane // 4
+        routes.append([start, (x, corridor_y), (corridor_x, corridor_y), (corridor_x, end_y), (dx, end_y)])
+    return routes
+
+
+# 分页：大图按有大小上限、簇内连线尽量多的簇拆到多张图上，每张图按内容选幅面
+
+# 图纸幅面：(名称, 长边, 短边)，单位与坐标相同（0.01 mm）
+PAGE_FORMATS = [
+    ("A4 (210 297)", 29700, 21000),
+    ("A3 (297 420)", 42000, 29700),
+    ("A2 (420 594)", 59400, 42000),
+    ("A1 (594 841)", 84100, 59400),
+    ("A0 (841 1189)", 118900, 84100),
+]
+
+
+def partition_graph(count: int, edges, max_size: int, refine_sweeps: int = REFINE_SWEEPS):
+    """
+    把按拓扑顺序编号的节点划分为至多 max_size 个节点的簇，返回每个节点的簇编号（按首个节点的顺序从 0 编号）。
+    1. 生长：有前驱的节点按顺序加入其前驱最多的、尚未满的簇；尚未分配的、没有前驱的前驱（如读取输入的等式）
+       随它一起加入；都满时加入最近新开的、尚未满的簇，再不行才新开一个簇。剩下没有前驱的节点同样处理（按后继投票）；
+    2. 合并：从小到大，把每个簇并入与它连线最多、合并后不超过 max_size 的簇；与任何簇都不相连的小簇依次装箱，
+       避免扇入/扇出和大量独立的小连通分量产生一页一个等式的图；
+    3. 细化：若干轮逐节点扫描，把节点移到与它连线最多、尚未满的簇（严格减少跨簇连线时才移动）。
+    取舍：簇不保证连通。坚持连通时，扇入/扇出和互不相连的小分量只能各占一页（例如扇入 1000、上限 100 时 902 页），
+    因此第 2 步允许把互不相连的小簇装到同一页；页数接近 ceil(count / max_size)，大部分边仍留在簇内。
+    每一步都是线性时间（合并按簇的邻接扫描，总量与边数成正比）。
+    """
+    predecessors = [[] for _ in range(count)]
+    successors = [[] for _ in range(count)]
+    for src, dst in edges:
+        if src != dst:
+            predecessors[dst].append(src)
+            successors[src].append(dst)
+
+    cluster = [-1] * count
+    sizes = []
+    open_cluster = [-1]
+
+    def join(nodes, neighbours):
+        votes = collections.Counter(cluster[other] for other in neighbours if cluster[other] >= 0)
+        target = next((candidate for candidate, _ in votes.most_common()
+                       if sizes[candidate] + len(nodes) <= max_size), None)
+        if target is None:
+            target = open_cluster[0]
+            if target < 0 or sizes[target] + len(nodes) > max_size:
+                target = open_cluster[0] = len(sizes)
+                sizes.append(0)
+        for member in nodes:
+            cluster[member] = target
+        sizes[target] += len(nodes)
+
+    # 1. 生长
+    for node in range(count):
+        if predecessors[node]:
+            sources = [other for other in predecessors[node] if cluster[other] < 0 and not predecessors[other]]
+            join([node] + list(dict.fromkeys(sources))[:max_size - 1], predecessors[node])
+    for node in range(count):
+        if cluster[node] < 0:
+            join([node], successors[node])
+
+    # 2. 合并
+    members = [[] for _ in sizes]
+    for node in range(count):
+        members[cluster[node]].append(node)
+    packing = -1
+    for source in sorted(range(len(sizes)), key=sizes.__getitem__):
+        size = sizes[source]
+        if size == 0 or size == max_size:
+            continue
+        votes = collections.Counter(cluster[other] for node in members[source]
+                                    for other in predecessors[node] + successors[node])
+        votes.pop(source, None)
+        target = next((candidate for candidate, _ in votes.most_common()
+                       if sizes[candidate] + size <= max_size), None)
+        if target is None:
+            if votes:
+                continue  # 相连的簇都放不下，保持原样
+            if packing < 0 or packing == source or sizes[packing] == 0 or sizes[packing] + size > max_size:
+                packing = source
+                continue
+            target = packing
+        for node in members[source]:
+            cluster[node] = target
+        members[target].extend(members[source])
+        members[source] = []
+        sizes[target] += size
+        sizes[source] = 0
+
+    # 3. 细化
+    for _ in range(refine_sweeps):
+        moved = 0
+        for node in range(count):
+            current = cluster[node]
+            votes = collections.Counter(cluster[other] for other in predecessors[node] + successors[node])
+            if not votes:
+                continue
+            stay = votes.get(current, 0)
+            target, best = current, stay
+            for candidate, weight in votes.most_common():
+                if weight <= best:
+                    break
+                if candidate != current and sizes[candidate] < max_size:
+                    target, best = candidate, weight
+                    break
+            if target != current:
+                cluster[node] = target
+                sizes[current] -= 1
+                sizes[target] += 1
+                moved += 1
+        if not moved:
+            break
+
+    # 按首个节点的顺序重新编号，第一个节点所在的簇为 0
+    numbering = {}
+    return [numbering.setdefault(number, len(numbering)) for number in cluster]
+
+
+def page_format(width: int, height: int):
+    """
+    返回能容纳 width x height 的最小幅面 (名称, 是否横向)；超过 A0 时使用 A0。
+    """
+    landscape = width >= height
+    long_side, short_side = max(width, height), min(width, height)
+    for name, long_limit, short_limit in PAGE_FORMATS:
+        if long_side <= long_limit and short_side <= short_limit:
+            return name, landscape
+    return PAGE_FORMATS[-1][0], landscape
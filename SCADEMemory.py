@@ -0,0 +1,832 @@
+# SCADEMemory.py
+# SCADE/EMF 对象模型的纯 Python 内存实现（"memory" 后端），不需要 JVM 和 SCADE jar。
+# 只覆盖 SCADE_Builder 实际用到的类与特性：
+#   - scade:   Model / Package / Operator / Variable / Equation / 各类表达式 / StateMachine ...
+#   - editor:  图形 pragma（NetDiagram、EquationGE、Edge ...）
+#   - codegen: KCG pragma
+#   - project: .etp 项目（Project、FileRef）
+# 每个类由 SCHEMA 生成，带 getX/setX/isX 访问方法，因此 hasattr(obj, "getData") 之类的判断与 Java API 一致。
+#
+# 内存后端没有真实的磁盘格式：保存项目文件时把整个模型做一次快照存入 MEMORY_DISK，
+# loadModel 从快照恢复；Resource.save 另外调用 set_resource_writer 设置的写出函数（默认不写文件）。
+# 用 set_model_reader 设置读取函数后（例如 SCADEXscade 的 XSCADE 读写），磁盘文件即是模型本身：
+# loadModel 改为调用读取函数，保存时也不再做快照。
+import contextlib, copy, os
+from SCADETrace import log
+
+# 特性种类：
+#   attr     单值属性            getX / setX（bool 属性另有 isX）
+#   attrs    属性列表            getX -> EList
+#   ref      单值非包含引用      getX / setX
+#   refs     非包含引用列表      getX -> EList
+#   contains 单值包含            getX / setX，设置时从原容器移出
+#   many     包含列表            getX -> EList，add 时从原容器移出
+#   view     包含列表的按类过滤视图，例如 Package.getOperators()
+NAMED = ("name", "attr")
+PRAGMAS = ("pragmas", "many")
+DECLARATION_VIEWS = [
+    ("packages", "view", ("declarations", "Package")),
+    ("operators", "view", ("declarations", "Operator")),
+    ("constants", "view", ("declarations", "Constant")),
+    ("sensors", "view", ("declarations", "Sensor")),
+    ("types", "view", ("declarations", "Type")),
+]
+POSITIONED = [("position", "contains"), ("size", "contains")]
+
+SCHEMA = {
+    "scade": {
+        # 模型与声明
+        "Model": [("declarations", "many"), ("predefinedTypes", "many")] + DECLARATION_VIEWS,
+        "Package": [NAMED, ("declarations", "many"), PRAGMAS] + DECLARATION_VIEWS,
+        "Type": [NAMED, ("definition", "contains"), PRAGMAS],
+        "Constant": [NAMED, ("type", "contains"), ("value", "contains"), PRAGMAS],
+        "Sensor": [NAMED, ("type", "contains"), PRAGMAS],
+        "Operator": [NAMED, ("kind", "attr"), ("inputs", "many"), ("outputs", "many"),
+                     ("locals", "many"), ("data", "many"), PRAGMAS],
+        "Variable": [NAMED, ("type", "contains"), PRAGMAS],
+        # 类型表达式
+        "NamedType": [("type", "ref")],
+        "Table": [("type", "contains"), ("size", "contains"), ("definedType", "ref")],
+        # 数据流
+        "Equation": [("lefts", "refs"), ("right", "contains"), PRAGMAS],
+        "StateMachine": [NAMED, ("states", "many"), PRAGMAS],
+        "State": [NAMED, ("initial", "attr", False), ("final", "attr", False), ("locals", "many"),
+                  ("data", "many"), ("unless", "many"), ("until", "many"), PRAGMAS],
+        "Transition": [("target", "ref"), ("condition", "contains"), PRAGMAS],
+        "WhenBlock": [NAMED, ("whenBranches", "many"), PRAGMAS],
+        "WhenBranch": [("pattern", "contains"), ("action", "contains")],
+        "IfBlock": [NAMED, ("ifNode", "contains"), PRAGMAS],
+        "IfNode": [("expression", "contains"), ("then", "contains"), ("else", "contains")],
+        "IfBranch": [("action", "contains")],
+        "Action": [("locals", "many"), ("data", "many"), PRAGMAS],
+        # 表达式
+        "IdExpression": [("path", "ref")],
+        "ConstValue": [("value", "attr")],
+        "NAryOp": [("operator", "attr"), ("operands", "many")],
+        "BinaryOp": [("operator", "attr"), ("operands", "many")],
+        "UnaryOp": [("operator", "attr"), ("operands", "many")],
+        "PreOp": [("flow", "contains")],
+        "FbyOp": [("flows", "many"), ("delay", "contains"), ("values", "many")],
+        "NumericCastOp": [("type", "ref"), ("flow", "contains")],
+        "ListExpression": [("items", "many")],
+        "CallExpression": [("operator", "contains"), ("callParameters", "many")],
+        "OpCall": [NAMED, ("operator", "ref")],
+        "PartialIteratorOp": [NAMED, ("iterator", "attr"), ("accumulatorCount", "attr"), ("operator", "contains"),
+                              ("size", "contains"), ("default", "contains"), ("if", "contains")],
+        "DataStructOp": [("data", "many")],
+        "LabelledExpression": [("label", "attr"), ("flow", "contains")],
+        "DataArrayOp": [("table", "contains"), ("data", "many")],
+    },
+    "codegen": {
+        "Pragma": [("data", "attr")],
+    },
+    "editor": {
+        "Package": [("oid", "attr"), ("comments", "attrs")],
+        "Operator": [("oid", "attr"), ("nodeKind", "attr"), ("diagrams", "many")],
+        "NetDiagram": [NAMED, ("format", "attr"), ("landscape", "attr", False), ("oid", "attr"),
+                       ("presentationElements", "many")],
+        "EquationGE": [("equation", "ref")] + POSITIONED,
+        "StateMachineGE": [("stateMachine", "ref")] + POSITIONED,
+        "StateGE": [("state", "ref")] + POSITIONED,
+        "TransitionGE": [("polyline", "attr", False), ("transition", "ref"), ("positions", "many")],
+        "Edge": [("srcEquation", "ref"), ("dstEquation", "ref"), ("leftVarIndex", "attr"),
+                 ("rightExprIndex", "attr"), ("positions", "many")],
+        "Point": [("x", "attr", 0), ("y", "attr", 0)],
+        "Size": [("width", "attr", 0), ("height", "attr", 0)],
+        # EditorPragmasUtil.setOid 为模型对象挂上的 oid pragma
+        "Equation": [("oid", "attr")],
+        "StateMachine": [("oid", "attr")],
+        "State": [("oid", "attr")],
+        "Transition": [("oid", "attr")],
+        "Variable": [("oid", "attr")],
+    },
+    "project": {
+        "Project": [("fileRefs", "many")],
+        "FileRef": [("persistAs", "attr")],
+    },
+}
+
+# SCADE 预定义类型，放在 Model.predefinedTypes 中，find_typeObject 可以像 Java 版一样找到
+PREDEFINED_TYPES = ["bool", "char", "int8", "int16", "int32", "int64", "uint8", "uint16", "uint32", "uint64",
+                    "float32", "float64"]
+
+# 内存中的“磁盘”：.etp 绝对路径 -> 最近一次保存时的 (model, resources) 快照
+MEMORY_DISK = {}
+
+# Resource.save 的写出函数：writer(resource)，默认不写文件
+RESOURCE_WRITER = None
+
+# loadModel 的读取函数：reader(project_uri, resource_set) -> Model 或 None，默认从 MEMORY_DISK 快照恢复
+MODEL_READER = None
+
+
+def set_resource_writer(writer):
+    """
+    设置 Resource.save 时调用的写出函数，传 None 恢复为不写文件。
+    """
+    global RESOURCE_WRITER
+    RESOURCE_WRITER = writer
+
+
+def set_model_reader(reader):
+    """
+    设置 loadModel 时调用的读取函数，传 None 恢复为从 MEMORY_DISK 快照恢复。
+    """
+    global MODEL_READER
+    MODEL_READER = reader
+
+
+def capitalize(name: str) -> str:
+    return name[0].upper() + name[1:]
+
+
+class EList:
+    """
+    EMF EList 的最小实现：支持迭代、len、下标、add(item) / add(index, item)。
+    containment 列表 add 时把元素从原容器移出（EMF 的移动语义）。
+    """
+    __slots__ = ("owner", "feature", "kind", "items")
+
+    def __init__(self, owner, feature: str, kind: str):
+        self.owner = owner
+        self.feature = feature
+        self.kind = kind
+        self.items = []
+
+    def __iter__(self):
+        return iter(list(self.items))
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[int(index)]
+
+    def __contains__(self, item):
+        return item in self.items
+
+    def __repr__(self):
+        return f"EList({self.items!r})"
+
+    def size(self):
+        return len(self.items)
+
+    def get(self, index):
+        return self.items[int(index)]
+
+    def isEmpty(self):
+        return not self.items
+
+    def contains(self, item):
+        return item in self.items
+
+    def indexOf(self, item):
+        return self.items.index(item) if item in self.items else -1
+
+    def add(self, *args):
+        if len(args) == 2:
+            index, item = int(args[0]), args[1]
+        else:
+            index, item = len(self.items), args[0]
+        if self.kind == "many":
+            detach(item)
+            item._container = self.owner
+            item._containing_feature = self.feature
+        elif self.kind == "resource":
+            item._resource = self.owner
+        self.items.insert(index, item)
+        self.owner._changed()
+        return True
+
+    def addAll(self, items):
+        for item in list(items):
+            self.add(item)
+        return True
+
+    def remove(self, item):
+        if item not in self.items:
+            return False
+        self.items.remove(item)
+        if self.kind == "many":
+            item._container = None
+            item._containing_feature = None
+        elif self.kind == "resource":
+            item._resource = None
+        self.owner._changed()
+        return True
+
+    def clear(self):
+        for item in list(self.items):
+            self.remove(item)
+
+
+class EListView:
+    """
+    包含列表的按类过滤视图，例如 Package.getOperators()；add 直接加到底层列表。
+    """
+    __slots__ = ("elist", "class_name")
+
+    def __init__(self, elist: EList, class_name: str):
+        self.elist = elist
+        self.class_name = class_name
+
+    def __iter__(self):
+        return iter([item for item in self.elist.items if item.eclass.name == self.class_name])
+
+    def __len__(self):
+        return sum(1 for item in self.elist.items if item.eclass.name == self.class_name)
+
+    def __getitem__(self, index):
+        return list(self)[int(index)]
+
+    def size(self):
+        return len(self)
+
+    def get(self, index):
+        return self[index]
+
+    def isEmpty(self):
+        return len(self) == 0
+
+    def add(self, *args):
+        return self.elist.add(*args)
+
+
+def detach(obj):
+    """
+    把 obj 从当前容器中移出（包含关系只能有一个容器）。
+    """
+    container = obj._container
+    if container is None:
+        return
+    feature = obj._containing_feature
+    value = container._values[feature]
+    if isinstance(value, EList):
+        value.items.remove(obj)
+    else:
+        container._values[feature] = None
+    obj._container = None
+    obj._containing_feature = None
+    container._changed()
+
+
+class EClass:
+    __slots__ = ("name", "namespace", "features", "containments", "python_class")
+
+    def __init__(self, name: str, namespace: str, features):
+        self.name = name
+        self.namespace = namespace
+        self.features = features
+        self.containments = [feature[0] for feature in features if feature[1] in ("contains", "many")]
+        self.python_class = None
+
+    def getName(self):
+        return self.name
+
+    def getEPackage(self):
+        return PACKAGES[self.namespace]
+
+    def __repr__(self):
+        return f"EClass({self.namespace}::{self.name})"
+
+
+class EObject:
+    eclass = None
+
+    def __init__(self):
+        self._container = None
+        self._containing_feature = None
+        self._resource = None
+        values = {}
+        for feature in self.eclass.features:
+            name, kind = feature[0], feature[1]
+            if kind in ("many", "refs", "attrs"):
+                values[name] = EList(self, name, kind)
+            elif kind != "view":
+                values[name] = feature[2] if len(feature) > 2 else None
+        self._values = values
+
+    def eClass(self):
+        return self.eclass
+
+    def eContainer(self):
+        return self._container
+
+    def eContainingFeature(self):
+        return self._containing_feature
+
+    def eResource(self):
+        obj = self
+        while obj is not None:
+            if obj._resource is not None:
+                return obj._resource
+            obj = obj._container
+        return None
+
+    def eContents(self):
+        contents = []
+        for name in self.eclass.containments:
+            value = self._values[name]
+            if isinstance(value, EList):
+                contents.extend(value.items)
+            elif value is not None:
+                contents.append(value)
+        return contents
+
+    def _changed(self):
+        resource = self.eResource()
+        if resource is not None and resource.tracking:
+            resource.modified = True
+
+    def __repr__(self):
+        name = self._values.get("name")
+        label = f" {name}" if name else ""
+        return f"<{self.eclass.namespace}::{self.eclass.name}{label}>"
+
+
+def make_accessors(feature):
+    """
+    为单个特性生成访问方法，返回 {方法名: 函数}。
+    """
+    name, kind = feature[0], feature[1]
+    suffix = capitalize(name)
+    methods = {}
+
+    if kind == "view":
+        list_name, class_name = feature[2]
+
+        def get_view(self):
+            return EListView(self._values[list_name], class_name)
+        methods["get" + suffix] = get_view
+        return methods
+
+    def getter(self):
+        return self._values[name]
+    methods["get" + suffix] = getter
+
+    if kind in ("attr", "ref"):
+        def setter(self, value):
+            self._values[name] = value
+            self._changed()
+        methods["set" + suffix] = setter
+        if kind == "attr" and isinstance(feature[2] if len(feature) > 2 else None, bool):
+            methods["is" + suffix] = getter
+    elif kind == "contains":
+        def set_contained(self, value):
+            old = self._values[name]
+            if old is not None and old is not value:
+                old._container = None
+                old._containing_feature = None
+            if value is not None:
+                detach(value)
+                value._container = self
+                value._containing_feature = name
+            self._values[name] = value
+            self._changed()
+        methods["set" + suffix] = set_contained
+    return methods
+
+
+def build_classes(namespace: str, schema: dict):
+    classes = {}
+    for class_name, features in schema.items():
+        eclass = EClass(class_name, namespace, features)
+        namespace_dict = {"eclass": eclass}
+        for feature in features:
+            namespace_dict.update(make_accessors(feature))
+        cls = type(f"{namespace.capitalize()}{class_name}", (EObject,), namespace_dict)
+        eclass.python_class = cls
+        classes[class_name] = cls
+    return classes
+
+
+class EFactory:
+    """
+    工厂：createX() 创建本命名空间中类 X 的实例。
+    """
+    def __init__(self, namespace: str, classes: dict):
+        self.namespace = namespace
+        self.classes = classes
+
+    def create(self, class_name: str):
+        return self.classes[class_name]()
+
+    def __getattr__(self, attr):
+        if attr.startswith("create") and attr[6:] in self.classes:
+            cls = self.classes[attr[6:]]
+            setattr(self, attr, cls)
+            return cls
+        raise AttributeError(attr)
+
+
+class EPackage:
+    """
+    对应 ScadePackage / EditorPragmasPackage 等：eINSTANCE 指向自身，getXxxFactory() 返回工厂。
+    """
+    def __init__(self, name: str, factory: EFactory, factory_getter: str):
+        self.name = name
+        self.factory = factory
+        self.eINSTANCE = self
+        setattr(self, factory_getter, lambda: factory)
+
+    def getName(self):
+        return self.name
+
+    def getEFactoryInstance(self):
+        return self.factory
+
+
+CLASSES = {namespace: build_classes(namespace, schema) for namespace, schema in SCHEMA.items()}
+theScadeFactory = EFactory("scade", CLASSES["scade"])
+theCodegenPragmasFactory = EFactory("codegen", CLASSES["codegen"])
+theEditorPragmasFactory = EFactory("editor", CLASSES["editor"])
+theProjectFactory = EFactory("project", CLASSES["project"])
+PACKAGES = {
+    "scade": EPackage("scade", theScadeFactory, "getScadeFactory"),
+    "codegen": EPackage("codegen", theCodegenPragmasFactory, "getCodegenPragmasFactory"),
+    "editor": EPackage("editor", theEditorPragmasFactory, "getEditorPragmasFactory"),
+    "project": EPackage("project", theProjectFactory, "getProjectFactory"),
+}
+
+
+class URI:
+    """
+    只支持本地文件 URI。
+    """
+    __slots__ = ("path",)
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @classmethod
+    def createFileURI(cls, path: str):
+        return cls(os.path.abspath(path))
+
+    def appendSegment(self, segment: str):
+        return URI(os.path.join(self.path, segment))
+
+    def isFile(self):
+        return True
+
+    def toFileString(self):
+        return self.path
+
+    def lastSegment(self):
+        return os.path.basename(self.path)
+
+    def __eq__(self, other):
+        return isinstance(other, URI) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def __str__(self):
+        return "file:" + self.path.replace(os.sep, "/")
+
+    def __repr__(self):
+        return f"URI({self.path!r})"
+
+
+class Resource:
+    def __init__(self, uri: URI, resource_set=None):
+        self.uri = uri
+        self.resource_set = resource_set
+        self.contents = EList(self, "contents", "resource")
+        self.tracking = False
+        self.modified = False
+        self.loaded = True
+
+    def getURI(self):
+        return self.uri
+
+    def getResourceSet(self):
+        return self.resource_set
+
+    def getContents(self):
+        return self.contents
+
+    def _changed(self):
+        if self.tracking:
+            self.modified = True
+
+    def isModified(self):
+        return self.modified
+
+    def setModified(self, modified: bool):
+        self.modified = modified
+
+    def isTrackingModification(self):
+        return self.tracking
+
+    def setTrackingModification(self, tracking: bool):
+        self.tracking = tracking
+
+    def isLoaded(self):
+        return self.loaded
+
+    def save(self, options):
+        if RESOURCE_WRITER is not None:
+            RESOURCE_WRITER(self)
+        self.modified = False
+        # 项目文件保存时把整个模型记入 MEMORY_DISK，供之后 loadModel 恢复
+        if MODEL_READER is None and self.resource_set is not None and any(obj.eclass.name == "Project" for obj in self.contents.items):
+            self.resource_set.snapshot(self.uri)
+
+    def unload(self):
+        self.contents.items = []
+        self.loaded = False
+        self.modified = False
+
+    def load(self, options):
+        # 内存后端按整个模型恢复：这里只标记，由随后的 loadModel 从快照重建
+        self.loaded = True
+
+    def __repr__(self):
+        return f"Resource({self.uri.path!r})"
+
+
+class ResourceSetImpl:
+    def __init__(self):
+        self.resources = []
+        self.model = None
+
+    def getResources(self):
+        return self.resources
+
+    def createResource(self, uri: URI):
+        resource = Resource(uri, self)
+        self.resources.append(resource)
+        return resource
+
+    def getResource(self, uri: URI, load_on_demand: bool = False):
+        for resource in self.resources:
+            if resource.uri == uri:
+                return resource
+        return None
+
+    def snapshot(self, project_uri: URI):
+        model, resources = copy.deepcopy((self.model, self.resources))
+        MEMORY_DISK[project_uri.path] = (model, resources)
+
+    def restore(self, project_uri: URI):
+        """
+        从 MEMORY_DISK 中的快照恢复整个模型，返回 Model；没有快照时返回 None。
+        """
+        stored = MEMORY_DISK.get(project_uri.path)
+        if stored is None:
+            return None
+        model, resources = copy.deepcopy(stored)
+        for resource in resources:
+            resource.resource_set = self
+            resource.modified = False
+            resource.loaded = True
+        self.resources = resources
+        self.model = model
+        return model
+
+
+def create_model():
+    model = theScadeFactory.createModel()
+    for name in PREDEFINED_TYPES:
+        type_obj = theScadeFactory.createType()
+        type_obj.setName(name)
+        model.getPredefinedTypes().add(type_obj)
+    return model
+
+
+class ScadeModelReader:
+    @staticmethod
+    def loadModel(project_uri: URI, resource_set: ResourceSetImpl):
+        # 已加载且没有被 unload 的资源直接复用，否则从最近一次保存的快照整体恢复
+        if resource_set.model is not None and all(resource.loaded for resource in resource_set.resources):
+            return resource_set.model
+        if MODEL_READER is not None:
+            return MODEL_READER(project_uri, resource_set)
+        return resource_set.restore(project_uri)
+
+    @staticmethod
+    def getProject(project_uri: URI, resource_set: ResourceSetImpl):
+        resource = resource_set.getResource(project_uri, False)
+        if resource is None:
+            return None
+        for obj in resource.getContents():
+            if obj.eclass.name == "Project":
+                return obj
+        return None
+
+
+class ScadeModelWriter:
+    @staticmethod
+    def createEmptyScadeProject(project_uri: URI, resource_set: ResourceSetImpl):
+        resource = resource_set.createResource(project_uri)
+        project = theProjectFactory.createProject()
+        resource.getContents().add(project)
+        return project
+
+    @staticmethod
+    def loadModel(project_uri: URI, resource_set: ResourceSetImpl):
+        model = ScadeModelReader.loadModel(project_uri, resource_set)
+        if model is None:
+            model = resource_set.model = create_model()
+        return model
+
+    @staticmethod
+    def updateProjectWithModelFiles(project):
+        """
+        为 resourceSet 中每个 .xscade 资源在项目里登记 FileRef（路径相对 .etp 所在目录）。
+        """
+        resource = project.eResource()
+        project_dir = os.path.dirname(resource.getURI().toFileString())
+        registered = {file_ref.getPersistAs() for file_ref in project.getFileRefs()}
+        for model_resource in resource.getResourceSet().getResources():
+            path = model_resource.getURI().toFileString()
+            if not path.endswith(".xscade"):
+                continue
+            persist_as = os.path.relpath(path, project_dir)
+            if persist_as not in registered:
+                file_ref = theProjectFactory.createFileRef()
+                file_ref.setPersistAs(persist_as)
+                project.getFileRefs().add(file_ref)
+                registered.add(persist_as)
+
+    @staticmethod
+    def saveAll(project, options):
+        project_resource = project.eResource()
+        for resource in list(project_resource.getResourceSet().getResources()):
+            if resource is not project_resource:
+                resource.save(options)
+        project_resource.save(options)
+
+
+class TreeIterator:
+    """
+    EcoreUtil.getAllContents 返回的先序遍历迭代器（不含根对象），同时支持 hasNext/next 和 Python 迭代。
+    """
+    def __init__(self, roots):
+        self.stack = [iter(roots)]
+        self.lookahead = None
+        self.has_lookahead = False
+
+    def advance(self):
+        while self.stack:
+            for obj in self.stack[-1]:
+                self.stack.append(iter(obj.eContents()))
+                return obj
+            self.stack.pop()
+        raise StopIteration
+
+    def hasNext(self):
+        if not self.has_lookahead:
+            try:
+                self.lookahead = self.advance()
+            except StopIteration:
+                return False
+            self.has_lookahead = True
+        return True
+
+    def next(self):
+        if not self.hasNext():
+            raise StopIteration
+        self.has_lookahead = False
+        return self.lookahead
+
+    __next__ = next
+
+    def __iter__(self):
+        return self
+
+
+class EcoreUtil:
+    @staticmethod
+    def getAllContents(obj, resolve: bool = True):
+        roots = obj.getContents() if isinstance(obj, Resource) else obj.eContents()
+        return TreeIterator(list(roots))
+
+    @staticmethod
+    def remove(obj):
+        if obj._container is not None:
+            detach(obj)
+        elif obj._resource is not None:
+            obj._resource.getContents().remove(obj)
+
+    @staticmethod
+    def delete(obj, recursive: bool = True):
+        EcoreUtil.remove(obj)
+
+
+class EditorPragmasUtil:
+    @staticmethod
+    def getOid(obj):
+        for pragma in obj.getPragmas():
+            if pragma.eclass.namespace == "editor" and hasattr(pragma, "getOid"):
+                return pragma.getOid()
+        return None
+
+    @staticmethod
+    def setOid(obj, oid: str):
+        """
+        把 oid 写入 obj 的 editor pragma，没有时按 obj 的类名新建一个。
+        """
+        for pragma in obj.getPragmas():
+            if pragma.eclass.namespace == "editor" and hasattr(pragma, "setOid"):
+                pragma.setOid(oid)
+                return
+        pragma = theEditorPragmasFactory.create(obj.eclass.name)
+        pragma.setOid(oid)
+        obj.getPragmas().add(pragma)
+
+
+class OperatorKind:
+    NODE_LITERAL = "node"
+    FUNCTION_LITERAL = "function"
+
+
+# 调用计数时统计的工具类方法（对应 jpype 后端中对 Java 静态方法/资源对象的调用）
+COUNTED_METHODS = [
+    (ScadeModelReader, ["loadModel", "getProject"], True),
+    (ScadeModelWriter, ["createEmptyScadeProject", "loadModel", "updateProjectWithModelFiles", "saveAll"], True),
+    (EcoreUtil, ["getAllContents", "remove", "delete"], True),
+    (EditorPragmasUtil, ["getOid", "setOid"], True),
+    (TreeIterator, ["hasNext", "next"], False),
+    (ResourceSetImpl, ["getResources", "createResource", "getResource"], False),
+    (Resource, ["getURI", "getContents", "isModified", "setTrackingModification", "save", "load", "unload"], False),
+    (EList, ["add", "remove", "get", "size", "__len__", "__iter__", "__getitem__"], False),
+    (EListView, ["add", "get", "size", "__len__", "__iter__", "__getitem__"], False),
+]
+
+
+@contextlib.contextmanager
+def count_calls(counter):
+    """
+    在 with 块内统计对象模型的每次方法调用（访问方法、对象创建、工具类方法），计入 counter[方法名]，
+    相当于 jpype 后端中 Python -> Java 的调用次数。
+    通过临时替换类上的方法实现，with 块外没有任何额外开销；不支持多线程同时计数。
+    """
+    originals = []
+
+    def patch(owner, name, key, static=False):
+        raw = owner.__dict__.get(name)
+        func = getattr(owner, name)
+
+        def wrapper(*args, **kwargs):
+            counter[key] += 1
+            return func(*args, **kwargs)
+        originals.append((owner, name, raw))
+        setattr(owner, name, staticmethod(wrapper) if static else wrapper)
+
+    try:
+        for namespace, classes in CLASSES.items():
+            for class_name, cls in classes.items():
+                prefix = f"{namespace}.{class_name}"
+                patch(cls, "__init__", f"{prefix}.create")
+                for name in [name for name in cls.__dict__ if name[:3] in ("get", "set") or name[:2] == "is"]:
+                    patch(cls, name, f"{prefix}.{name}")
+        for owner, names, static in COUNTED_METHODS:
+            for name in names:
+                patch(owner, name, f"{owner.__name__}.{name}", static)
+        yield counter
+    finally:
+        for owner, name, raw in reversed(originals):
+            if raw is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, raw)
+
+
+class MemoryBackend:
+    name = "memory"
+    # 追踪/基准中调用次数的口径：全部对象模型调用（访问方法、对象创建、工具类方法）
+    call_metric = "model_calls"
+
+    def is_started(self):
+        return True
+
+    def start(self, jvm_path=None, scade_lib_path=None, current_dir=None):
+        log.debug("🟡 内存后端无需启动 JVM，跳过")
+        return False
+
+    def shutdown(self):
+        log.debug("🟡 内存后端无需关闭 JVM，跳过")
+
+    def load_classes(self):
+        return {
+            "URI": URI,
+            "ResourceSetImpl": ResourceSetImpl,
+            "ScadeModelReader": ScadeModelReader,
+            "ScadeModelWriter": ScadeModelWriter,
+            "OperatorKind": OperatorKind,
+            "ScadePackage": PACKAGES["scade"],
+            "theScadeFactory": theScadeFactory,
+            "CodegenPragmasPackage": PACKAGES["codegen"],
+            "theCodegenPragmasFactory": theCodegenPragmasFactory,
+            "EditorPragmasPackage": PACKAGES["editor"],
+            "theEditorPragmasFactory": theEditorPragmasFactory,
+            "EditorPragmasUtil": EditorPragmasUtil,
+            "EcoreUtil": EcoreUtil,
+        }
+
+    def to_int(self, value: int):
+        return int(value)
+
+    def count_calls(self, counter):
+        return count_calls(counter)
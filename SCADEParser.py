@@ -0,0 +1,458 @@
+# SCADEParser.py
+# create_dataFlow 文本块的词法/语法分析，输出紧凑的中间表示（IR）
+#
+# 支持的行格式：
+#   _L1 = Input_01                                        # 赋值
+#   _L4 = + (_L1, _L2, _L3)                               # 内置运算符
+#   _L11, _L12 = Operator1 (_L8, _L9)                     # 调用其他 Operator
+#   _L6, _L7 = (mapfoldwi 1 Operator2 <<15>> if _L1)(_L2, _L8)   # 迭代器
+# '#' 之后为注释，空行忽略
+import gc, re
+from collections import deque
+
+# 词法表：按顺序尝试，多字符符号必须排在单字符符号之前
+TOKEN_SPEC = [
+    ("NUMBER", r"\d[\w.]*"),
+    ("NAME", r"[A-Za-z_][\w]*(?:::[A-Za-z_][\w]*)*"),
+    ("OP", r"<<|>>|<=|>=|<>|!=|==|[<>=+\-*/]"),
+    ("LPAREN", r"\("),
+    ("RPAREN", r"\)"),
+    ("COMMA", r","),
+    ("COMMENT", r"#.*"),
+    ("SKIP", r"[ \t\r]+"),
+    ("ERROR", r"."),
+]
+TOKEN_REGEX = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in TOKEN_SPEC))
+TOKEN_KINDS = {index: name for name, index in TOKEN_REGEX.groupindex.items()}
+
+# 迭代器关键字
+ITERATORS = {"mapfoldwi"}
+
+# 整行快速匹配：赋值和普通调用这两种最常见的行直接用一个预编译正则切分，
+# 匹配不上的行（迭代器、语法错误等）再交给逐 token 的分析器，由它给出准确的行列号
+NAME_PATTERN = r"[A-Za-z_]\w*(?:::[A-Za-z_]\w*)*"
+OPERAND_PATTERN = rf"(?:{NAME_PATTERN}|-?\d[\w.]*)"
+OUTPUTS_PATTERN = rf"{NAME_PATTERN}(?:[ \t]*,[ \t]*{NAME_PATTERN})*"
+TAIL_PATTERN = r"[ \t\r]*(?:#.*)?$"
+# 分组：1 左侧变量；2/3 调用的运算符与参数串；4 赋值的右侧
+LINE_REGEX = re.compile(
+    rf"[ \t]*({OUTPUTS_PATTERN})[ \t]*=[ \t]*"
+    rf"(?:({NAME_PATTERN}|<<|>>|<=|>=|<>|!=|==|[<>=+\-*/])[ \t]*"
+    rf"\([ \t]*({OPERAND_PATTERN}(?:[ \t]*,[ \t]*{OPERAND_PATTERN})*)?[ \t]*\)"
+    rf"|({OPERAND_PATTERN})){TAIL_PATTERN}"
+)
+
+
+class DataflowSyntaxError(ValueError):
+    def __init__(self, message: str, line: int, column: int, text: str = ""):
+        super().__init__(f"第 {line} 行第 {column} 列: {message}" + (f"\n    {text.strip()}" if text else ""))
+        self.line = line
+        self.column = column
+
+
+class Operand:
+    """
+    运算的一个输入：kind 为 'name'（变量名/类型名）或 'number'（常量）。
+    """
+    __slots__ = ("kind", "text", "column")
+
+    def __init__(self, kind: str, text: str, column: int):
+        self.kind = kind
+        self.text = text
+        self.column = column
+
+    def __repr__(self):
+        return f"Operand({self.kind}, {self.text!r})"
+
+
+class IteratorCall:
+    """
+    (mapfoldwi 1 Operator2 <<15>> if _L1) 中的迭代器部分。
+    """
+    __slots__ = ("iterator", "accumulators", "operator", "size", "condition")
+
+    def __init__(self, iterator: str, accumulators: str, operator: str, size: str, condition: str):
+        self.iterator = iterator
+        self.accumulators = accumulators
+        self.operator = operator
+        self.size = size
+        self.condition = condition
+
+    def __repr__(self):
+        return f"IteratorCall({self.iterator} {self.accumulators} {self.operator} <<{self.size}>> if {self.condition})"
+
+
+class Equation:
+    """
+    一行等式。
+    - outputs: 左侧变量名
+    - operator: 右侧的运算符/Operator 名；赋值为 None；迭代器时为迭代器名（如 'mapfoldwi'）
+    - operands: 右侧输入
+    - iterator: 迭代器调用时的 IteratorCall，否则为 None
+    - line: 源文本中的行号（从 1 开始）
+    """
+    __slots__ = ("outputs", "operator", "operands", "iterator", "line")
+
+    def __init__(self, outputs, operator, operands, iterator=None, line: int = 0):
+        self.outputs = outputs
+        self.operator = operator
+        self.operands = operands
+        self.iterator = iterator
+        self.line = line
+
+    @property
+    def inputs(self):
+        return [operand.text for operand in self.operands]
+
+    @property
+    def is_assignment(self):
+        return self.operator is None
+
+    def __repr__(self):
+        if self.iterator is not None:
+            return f"Equation({', '.join(self.outputs)} = ({self.iterator!r})({', '.join(self.inputs)}))"
+        if self.operator is None:
+            return f"Equation({', '.join(self.outputs)} = {self.inputs[0]})"
+        return f"Equation({', '.join(self.outputs)} = {self.operator}({', '.join(self.inputs)}))"
+
+
+def tokenize_line(text: str, line_no: int):
+    """
+    返回 [(kind, value, column), ...]，忽略空白和注释；column 从 1 开始。
+    """
+    tokens = []
+    for match in TOKEN_REGEX.finditer(text):
+        kind = TOKEN_KINDS[match.lastindex]
+        if kind == "SKIP" or kind == "COMMENT":
+            continue
+        if kind == "ERROR":
+            raise DataflowSyntaxError(f"无法识别的字符 {match.group()!r}", line_no, match.start() + 1, text)
+        tokens.append((kind, match.group(), match.start() + 1))
+    return tokens
+
+
+class LineParser:
+    """
+    单行递归下降分析器。
+    """
+    __slots__ = ("tokens", "pos", "line_no", "text")
+
+    def __init__(self, tokens, line_no: int, text: str):
+        self.tokens = tokens
+        self.pos = 0
+        self.line_no = line_no
+        self.text = text
+
+    def error(self, message: str, token=None):
+        if token is None:
+            token = self.tokens[self.pos] if self.pos < len(self.tokens) else None
+        column = token[2] if token is not None else len(self.text.rstrip()) + 1
+        return DataflowSyntaxError(message, self.line_no, column, self.text)
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def expect(self, kind: str, value: str = None):
+        token = self.peek()
+        if token is None or token[0] != kind or (value is not None and token[1] != value):
+            expected = value if value is not None else kind
+            found = token[1] if token is not None else "行尾"
+            raise self.error(f"期望 {expected}，实际为 {found}")
+        self.pos += 1
+        return token
+
+    def parse_equation(self):
+        outputs = [self.expect("NAME")[1]]
+        while self.peek() is not None and self.peek()[0] == "COMMA":
+            self.pos += 1
+            outputs.append(self.expect("NAME")[1])
+        self.expect("OP", "=")
+
+        token = self.peek()
+        if token is None:
+            raise self.error("等号右侧缺少表达式")
+
+        # (mapfoldwi ...)(...)
+        if token[0] == "LPAREN":
+            iterator = self.parse_iterator()
+            operands = self.parse_arguments()
+            equation = Equation(outputs, iterator.iterator, operands, iterator, self.line_no)
+        # operator (...)
+        elif self.pos + 1 < len(self.tokens) and self.tokens[self.pos + 1][0] == "LPAREN" and token[0] in ("NAME", "OP"):
+            self.pos += 1
+            operands = self.parse_arguments()
+            equation = Equation(outputs, token[1], operands, None, self.line_no)
+        # 赋值
+        else:
+            equation = Equation(outputs, None, [self.parse_operand()], None, self.line_no)
+
+        if self.peek() is not None:
+            raise self.error(f"多余的内容 {self.peek()[1]!r}")
+        return equation
+
+    def parse_iterator(self):
+        self.expect("LPAREN")
+        iterator = self.expect("NAME")
+        if iterator[1] not in ITERATORS:
+            raise self.error(f"不支持的迭代器 {iterator[1]!r}", iterator)
+        accumulators = self.expect("NUMBER")[1]
+        operator = self.expect("NAME")[1]
+        self.expect("OP", "<<")
+        size = self.expect("NUMBER")[1]
+        self.expect("OP", ">>")
+        self.expect("NAME", "if")
+        condition = self.expect("NAME")[1]
+        self.expect("RPAREN")
+        return IteratorCall(iterator[1], accumulators, operator, size, condition)
+
+    def parse_arguments(self):
+        self.expect("LPAREN")
+        operands = []
+        if self.peek() is not None and self.peek()[0] == "RPAREN":
+            self.pos += 1
+            return operands
+        while True:
+            operands.append(self.parse_operand())
+            token = self.peek()
+            if token is not None and token[0] == "COMMA":
+                self.pos += 1
+                continue
+            self.expect("RPAREN")
+            return operands
+
+    def parse_operand(self):
+        token = self.peek()
+        if token is None:
+            raise self.error("缺少操作数")
+        kind = token[0]
+        if kind == "NAME":
+            self.pos += 1
+            return Operand("name", token[1], token[2])
+        if kind == "NUMBER":
+            self.pos += 1
+            return Operand("number", token[1], token[2])
+        # 负数常量：- 紧跟数字
+        if kind == "OP" and token[1] == "-":
+            following = self.tokens[self.pos + 1] if self.pos + 1 < len(self.tokens) else None
+            if following is not None and following[0] == "NUMBER":
+                self.pos += 2
+                return Operand("number", "-" + following[1], token[2])
+        raise self.error(f"无效的操作数 {token[1]!r}")
+
+
+def split_operands(text: str, start: int):
+    """
+    将快速匹配得到的参数串切分为 Operand 列表，start 为参数串在行内的起始下标（0 起）。
+    参数串已由正则校验过，这里只需按逗号切分并计算列号。
+    """
+    operands = []
+    if text is None:
+        return operands
+    column = start + 1
+    for item in text.split(","):
+        name = item.strip()
+        first = name[0]
+        operands.append(Operand("number" if first.isdigit() or first == "-" else "name",
+                                name, column + len(item) - len(item.lstrip())))
+        column += len(item) + 1
+    return operands
+
+
+def parse_line(line: str, line_no: int):
+    """
+    解析一行，空行/纯注释返回 None。
+    """
+    match = LINE_REGEX.match(line)
+    if match is not None:
+        outputs, operator, arguments, value = match.groups()
+        outputs = [name.strip() for name in outputs.split(",")] if "," in outputs else [outputs]
+        if operator is not None:
+            return Equation(outputs, operator, split_operands(arguments, match.start(3)), None, line_no)
+        if value not in ITERATORS:
+            return Equation(outputs, None, split_operands(value, match.start(4)), None, line_no)
+
+    tokens = tokenize_line(line, line_no)
+    if not tokens:
+        return None
+    return LineParser(tokens, line_no, line).parse_equation()
+
+
+def parse_dataflow(text: str):
+    """
+    解析整个文本块，返回 [Equation, ...]；语法错误抛出 DataflowSyntaxError（含行号和列号）。
+    解析期间暂停循环垃圾回收：每行都会新建 Equation/Operand 对象且都不会成为垃圾，
+    大文本块上分代回收反复扫描这些对象的耗时与解析本身相当。
+    """
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        equations = []
+        for line_no, line in enumerate(text.splitlines(), 1):
+            equation = parse_line(line, line_no)
+            if equation is not None:
+                equations.append(equation)
+        return equations
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+# 带延迟语义的运算符：其输出可以在定义之前被引用，用于打断反馈环
+DELAY_OPERATORS = {"pre", "fby"}
+
+# 不支持前向引用的运算符：输出类型取自输入（pre/fby），或为特殊格式（cast）
+NO_FORWARD_OPERATORS = {"pre", "fby", "cast"}
+
+
+class DataflowScheduleError(ValueError):
+    def __init__(self, message: str, line: int):
+        super().__init__(f"第 {line} 行: {message}")
+        self.line = line
+
+
+def equation_reads(equation):
+    """
+    返回等式读取的变量名（按出现顺序），不含常量、cast 的目标类型、fby 的延迟拍数和常量默认值。
+    """
+    if equation.iterator is not None:
+        return [equation.iterator.condition] + [op.text for op in equation.operands if op.kind == "name"]
+    operands = equation.operands
+    if equation.operator == "cast":
+        operands = operands[:1]
+    elif equation.operator == "fby":
+        # 与 create_fby_equation 一致：默认值以 _L 开头时才是变量
+        operands = [op for index, op in enumerate(operands)
+                    if index == 0 or (index == 2 and op.text.startswith("_L"))]
+    return [op.text for op in operands if op.kind == "name"]
+
+
+def is_delay_equation(equation):
+    return equation.iterator is None and equation.operator in DELAY_OPERATORS
+
+
+def can_forward(equation, forward_names):
+    """
+    等式能否在 forward_names 中的变量尚未创建时先生成：
+    只允许普通运算符/Operator 调用，且至少有一个已存在的变量操作数用于推断输出类型。
+    """
+    if equation.iterator is not None or equation.operator is None or equation.operator in NO_FORWARD_OPERATORS:
+        return False
+    return any(op.kind == "name" and op.text not in forward_names for op in equation.operands)
+
+
+def find_cycle(remaining, producers_of, equations):
+    """
+    在剩余节点中沿前驱走，直到重复，返回环上的变量名（用于报错）。
+    """
+    start = next(iter(remaining))
+    seen = {}
+    node = start
+    path = []
+    while node not in seen:
+        seen[node] = len(path)
+        path.append(node)
+        node = next(p for p in producers_of[node] if p in remaining)
+    cycle = path[seen[node]:]
+    cycle.reverse()
+    return [equations[index].outputs[0] for index in cycle]
+
+
+def schedule_equations(equations, is_known=None):
+    """
+    根据变量依赖对等式做拓扑排序（线性时间），返回 [(equation, forward_names), ...]。
+    - 依赖未在块内定义、且 is_known(name) 为 False 的变量：报错
+    - 同一变量被多次定义：报错
+    - 不经过 pre/fby 的环：报错
+    - 经过 pre/fby 的环：先生成读取延迟输出的等式，forward_names 为其中尚未创建的变量，
+      由调用方在整个块生成完后补上引用和连线
+    所有检查都在生成之前完成，出错时模型不会被修改。
+    """
+    count = len(equations)
+    producers = {}
+    for index, equation in enumerate(equations):
+        for name in equation.outputs:
+            if name in producers:
+                raise DataflowScheduleError(f"变量 {name} 被重复定义（第 {equations[producers[name]].line} 行已定义）",
+                                            equation.line)
+            producers[name] = index
+
+    # consumers[i]: 读取等式 i 输出的等式；hard 表示生产者不是 pre/fby，必须先生成
+    consumers = [[] for _ in range(count)]
+    producers_of = [[] for _ in range(count)]
+    indegree = [0] * count
+    hard_indegree = [0] * count
+    for index, equation in enumerate(equations):
+        for name in equation_reads(equation):
+            producer = producers.get(name)
+            if producer is None:
+                if is_known is not None and not is_known(name):
+                    raise DataflowScheduleError(f"未定义的变量 {name}", equation.line)
+                continue
+            hard = not is_delay_equation(equations[producer])
+            consumers[producer].append((index, hard))
+            indegree[index] += 1
+            if hard:
+                hard_indegree[index] += 1
+                producers_of[index].append(producer)
+
+    # 1. 只看必须先后生成的边，检查瞬时环
+    remaining_hard = hard_indegree[:]
+    ready = [index for index in range(count) if remaining_hard[index] == 0]
+    visited = 0
+    while ready:
+        node = ready.pop()
+        visited += 1
+        for consumer, hard in consumers[node]:
+            if hard:
+                remaining_hard[consumer] -= 1
+                if remaining_hard[consumer] == 0:
+                    ready.append(consumer)
+    if visited < count:
+        remaining = {index for index in range(count) if remaining_hard[index] > 0}
+        cycle = find_cycle(remaining, producers_of, equations)
+        line = equations[min(remaining)].line
+        raise DataflowScheduleError(f"存在未经 pre/fby 打断的循环依赖: {' -> '.join(cycle + cycle[:1])}", line)
+
+    # 2. 生成顺序：所有依赖都已生成的等式按原文顺序依次生成；卡住时只剩经过 pre/fby 的环，
+    #    从 hard 依赖已满足的等式里挑一个允许前向引用的先生成
+    emitted = [False] * count
+    defined = set()
+    order = []
+    ready = deque(index for index in range(count) if indegree[index] == 0)
+    hard_ready = deque(index for index in range(count) if hard_indegree[index] == 0)
+
+    def emit(node, forward_names):
+        emitted[node] = True
+        order.append((equations[node], forward_names))
+        defined.update(equations[node].outputs)
+        for consumer, hard in consumers[node]:
+            indegree[consumer] -= 1
+            if indegree[consumer] == 0 and not emitted[consumer]:
+                ready.append(consumer)
+            if hard:
+                hard_indegree[consumer] -= 1
+                if hard_indegree[consumer] == 0:
+                    hard_ready.append(consumer)
+
+    while len(order) < count:
+        if ready:
+            node = ready.popleft()
+            if not emitted[node]:
+                emit(node, frozenset())
+            continue
+
+        candidates = [node for node in hard_ready if not emitted[node]]
+        hard_ready.clear()
+        hard_ready.extend(candidates)
+        for node in candidates:
+            equation = equations[node]
+            forward_names = frozenset(name for name in equation_reads(equation)
+                                      if name in producers and name not in defined)
+            if can_forward(equation, forward_names):
+                emit(node, forward_names)
+                break
+        else:
+            line = equations[candidates[0]].line if candidates else 0
+            raise DataflowScheduleError("pre/fby 反馈环中没有可以先生成的等式（无法推断输出类型）", line)
+
+    return order
@@ -1,6 +1,8 @@
 # scadeAgentTools.py
-import json
+import json, functools, time
 from SCADEAPI import SCADE_Builder
+from SCADEParser import parse_dataflow, DataflowSyntaxError
+from SCADETrace import tracer
 
 # 全局注册表
 registry = {}
@@ -8,9 +10,25 @@ builder = SCADE_Builder()
 
 
 # 装饰器：自动将函数加入 registry
-def register(func):
-    registry[func.__name__] = func
-    return func
+# 默认在 builder.model_lock 内执行，与后台异步写盘互斥；locked=False 用于需要等待后台写盘的工具
+# 每次调用记录一个 tool:<名称> 的追踪 span
+def register(func=None, *, locked=True):
+    def decorator(func):
+        span_name = f"tool:{func.__name__}"
+
+        @functools.wraps(func)
+        def traced_func(arguments):
+            with tracer.span(span_name):
+                if not locked:
+                    return func(arguments)
+                with builder.model_lock:
+                    return func(arguments)
+        registry[func.__name__] = traced_func
+        return traced_func
+
+    if func is None:
+        return decorator
+    return decorator(func)
 
 # ✅ 注册函数
 @register
@@ -55,14 +73,76 @@ def create_output(arguments) -> str:
     builder.create_output(output_name, output_type)
     return f"✅ Output {output_name} 创建完成"
 
+def declaration_items(arguments, with_value: bool = False):
+    # [{"name": ..., "type": ..., "value": ...}, ...] -> ([(name, type[, value]), ...], 错误信息或 None)
+    fields = ("name", "type", "value") if with_value else ("name", "type")
+    items = arguments.get('items') or []
+    if not isinstance(items, list):
+        return None, "❌ items 必须是数组"
+    result = []
+    for index, item in enumerate(items, 1):
+        if not isinstance(item, dict):
+            return None, f"❌ 第 {index} 项不是对象: {item!r}"
+        invalid = [field for field in fields if not isinstance(item.get(field), str)]
+        if invalid:
+            return None, f"❌ 第 {index} 项缺少字符串字段 {', '.join(invalid)}: {item!r}"
+        result.append(tuple(item[field] for field in fields))
+    return result, None
+
+def create_declarations(create, label: str, scope: str, arguments, with_value: bool = False) -> str:
+    items, error = declaration_items(arguments, with_value)
+    if error is not None:
+        return error
+    result = create(items)
+    if result is None:
+        return f"❌ 批量创建 {label} 失败：当前未选择 {scope}"
+    return f"✅ 已批量创建 {label} {result['created']} 个，跳过已存在或重复的名称 {result['skipped']} 个"
+
+@register
+def create_inputs(arguments) -> str:
+    return create_declarations(builder.create_inputs, "Input", "Operator", arguments)
+
+@register
+def create_outputs(arguments) -> str:
+    return create_declarations(builder.create_outputs, "Output", "Operator", arguments)
+
+@register
+def create_locals(arguments) -> str:
+    return create_declarations(builder.create_locals, "局部变量", "Operator", arguments)
+
+@register
+def create_constants(arguments) -> str:
+    return create_declarations(builder.create_constants, "Constant", "Package", arguments, with_value=True)
+
+@register
+def create_sensors(arguments) -> str:
+    return create_declarations(builder.create_sensors, "Sensor", "Package", arguments)
+
 @register
 def create_dataFlow(arguments) -> str:
     text = arguments.get('text')
-    builder.create_dataFlow(text)
+    patch = arguments.get('patch', False)
+    max_diagram_size = arguments.get('max_diagram_size')
+    delta = builder.create_dataFlow(text, patch=patch, max_diagram_size=max_diagram_size)
+    if delta is None:
+        return "❌ 数据流生成失败：当前未选择 Operator"
     builder.save_project()
     #builder.shutdown_jvm()
+    if patch:
+        return (f"✅ 数据流已增量更新：新增 {delta['added']}，删除 {delta['removed']}，"
+                f"修改 {delta['changed']}，未变 {delta['unchanged']} 条")
     return "✅ 代码块已解析并生成"
 
+@register
+def layout_diagram(arguments) -> str:
+    diagram_name = arguments.get('diagram')
+    result = builder.layout_dataflow_diagrams(diagram_name)
+    if result is None:
+        return f"⚠️ 当前 Operator 没有数据流图 {diagram_name}" if diagram_name else "⚠️ 当前 Operator 没有数据流图"
+    diagrams, count = result
+    builder.save_project()
+    return f"✅ 已重新布局 {diagrams} 张图，共 {count} 个等式"
+
 @register
 def create_stateMachine(arguments) -> str:
     sm_name = arguments.get('sm_name')
@@ -73,6 +153,207 @@ def create_stateMachine(arguments) -> str:
     # builder.shutdown_jvm()
     return f"✅ StateMachine {sm_name} 创建完成"
 
+@register
+def begin_transaction(arguments) -> str:
+    if not builder.begin_transaction():
+        return "⚠️ 事务已在进行中"
+    return "✅ 事务已开始，提交前不会写盘"
+
+@register
+def commit_transaction(arguments) -> str:
+    deferred_saves = builder.commit_transaction()
+    if deferred_saves is None:
+        return "⚠️ 当前没有进行中的事务"
+    return f"✅ 事务已提交，项目写盘 1 次（合并了 {deferred_saves} 次保存）"
+
+@register
+def abort_transaction(arguments) -> str:
+    if not builder.abort_transaction():
+        return "⚠️ 当前没有进行中的事务"
+    return "✅ 事务已放弃，模型已恢复为事务开始时的状态"
+
+# 关闭时要等待后台线程写盘，后台线程写盘需要 model_lock，因此不能持锁调用
+@register(locked=False)
+def set_write_behind(arguments) -> str:
+    enabled = arguments.get('enabled')
+    builder.set_write_behind(bool(enabled))
+    return "✅ 已开启异步写盘" if enabled else "✅ 已关闭异步写盘"
+
+@register
+def set_xscade_writer(arguments) -> str:
+    enabled = bool(arguments.get('enabled'))
+    if not builder.set_xscade_writer(enabled):
+        return "⚠️ 只有 memory 后端支持 XSCADE 写出器"
+    return "✅ 已开启 XSCADE 写盘" if enabled else "✅ 已关闭 XSCADE 写盘"
+
+@register(locked=False)
+def wait_saved(arguments) -> str:
+    timeout = arguments.get('timeout')
+    if not builder.flush(timeout):
+        return "⚠️ 等待超时，仍有保存未落盘"
+    return "✅ 所有修改均已保存到磁盘"
+
+@register(locked=False)
+def start_trace(arguments) -> str:
+    tracer.start(builder.backend)
+    return "✅ 已开始记录追踪 span 和后端调用次数"
+
+@register(locked=False)
+def stop_trace(arguments) -> str:
+    path = arguments.get('path')
+    tracer.stop()
+    summary = tracer.format_summary()
+    if path:
+        tracer.export_chrome_trace(path)
+        return f"✅ 追踪已写入 {path}\n{summary}"
+    return f"✅ 追踪已停止\n{summary}"
+
+@register(locked=False)
+def list_operators(arguments) -> str:
+    index = builder.get_project_index(arguments.get('project_dir'), arguments.get('project_name'))
+    if index is None:
+        return "❌ 无法读取项目"
+    names = index.operator_names(arguments.get('package'))
+    lines = [f"✅ 共 {len(names)} 个 Operator"]
+    for name in names:
+        operator = index.operators[name]
+        lines.append(f"{name} ({operator['kind']}): {len(operator['inputs'])} 输入, "
+                     f"{len(operator['outputs'])} 输出 [{operator['file']}]")
+    return "\n".join(lines)
+
+@register(locked=False)
+def validate_project(arguments) -> str:
+    issues = builder.validate_project(arguments.get('project_dir'), arguments.get('project_name'), arguments.get('workers'))
+    if issues is None:
+        return "❌ 无法读取项目"
+    errors = sum(1 for issue in issues if issue[0] == "error")
+    lines = [f"{'❌' if errors else '✅'} 项目校验完成: {errors} 个错误, {len(issues) - errors} 个警告"]
+    for severity, file_name, path, message in issues:
+        lines.append(f"{'❌' if severity == 'error' else '⚠️'} [{file_name}] {path}: {message}")
+    return "\n".join(lines)
+
+@register(locked=False)
+def describe_operator(arguments) -> str:
+    operator_name = arguments.get('operator_name')
+    index = builder.get_project_index(arguments.get('project_dir'), arguments.get('project_name'))
+    if index is None:
+        return "❌ 无法读取项目"
+    operator = index.find_operator(operator_name)
+    if operator is None:
+        return f"❌ 未找到 Operator: {operator_name}"
+    lines = [f"✅ Operator {operator_name} ({operator['kind']}) [{operator['file']}]"]
+    for role, label in (("inputs", "输入"), ("outputs", "输出"), ("locals", "局部变量")):
+        lines.append(f"{label}: " + (", ".join(f"{name}: {type_name}" for name, type_name in operator[role]) or "无"))
+    for state_machine in operator['state_machines']:
+        lines.append(f"状态机 {state_machine['canvas']}{state_machine['name']}: " + ", ".join(state_machine['states']))
+    return "\n".join(lines)
+
+
+# run_batch 中不允许的工具：事务和写盘由 run_batch 自己管理；
+# set_write_behind 关闭时要等待后台写盘，在持有 model_lock 的 run_batch 中会死锁
+BATCH_EXCLUDED = {"run_batch", "begin_transaction", "commit_transaction", "abort_transaction", "wait_saved", "set_write_behind"}
+
+JSON_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list, tuple),
+    "object": (dict,),
+}
+
+
+def validate_schema(schema: dict, value, path: str = "arguments"):
+    """
+    按 tools 中的 JSON schema 检查参数（type / properties / required / additionalProperties / items / minItems / maxItems），
+    返回错误信息列表。
+    """
+    expected = schema.get("type")
+    if expected in JSON_TYPES:
+        if not isinstance(value, JSON_TYPES[expected]) or (expected in ("integer", "number") and isinstance(value, bool)):
+            return [f"{path} 应为 {expected}"]
+    errors = []
+    if expected == "object":
+        properties = schema.get("properties", {})
+        errors += [f"{path} 缺少 {name}" for name in schema.get("required", []) if name not in value]
+        for name, item in value.items():
+            if name in properties:
+                errors += validate_schema(properties[name], item, f"{path}.{name}")
+            elif schema.get("additionalProperties") is False:
+                errors.append(f"{path} 不支持参数 {name}")
+    elif expected == "array":
+        if len(value) < schema.get("minItems", 0) or len(value) > schema.get("maxItems", len(value)):
+            errors.append(f"{path} 元素个数不符")
+        if "items" in schema:
+            for index, item in enumerate(value):
+                errors += validate_schema(schema["items"], item, f"{path}[{index}]")
+    return errors
+
+
+def validate_step(index: int, step) -> list:
+    if not isinstance(step, dict) or not isinstance(step.get("tool"), str):
+        return [f"第 {index} 步缺少 tool"]
+    name = step["tool"]
+    if name not in registry:
+        return [f"第 {index} 步: 未知的工具 {name}"]
+    if name in BATCH_EXCLUDED:
+        return [f"第 {index} 步: {name} 不能在 run_batch 中使用"]
+    arguments = step.get("arguments", {})
+    errors = [f"第 {index} 步 {name}: {error}" for error in validate_schema(TOOL_SCHEMAS.get(name, {"type": "object"}), arguments)]
+    # 数据流块先做一次语法检查，避免执行到一半才失败
+    if not errors and name == "create_dataFlow":
+        try:
+            parse_dataflow(arguments["text"])
+        except DataflowSyntaxError as e:
+            errors.append(f"第 {index} 步 {name}: {e}")
+    return errors
+
+
+@register
+def run_batch(arguments) -> str:
+    steps = arguments.get('steps') or []
+    atomic = arguments.get('atomic', False)
+
+    # 先检查所有步骤，有错误时一步都不执行
+    errors = [error for index, step in enumerate(steps, 1) for error in validate_step(index, step)]
+    if errors:
+        return "❌ 批量执行未开始，参数检查失败：\n" + "\n".join(errors)
+
+    # 所有步骤在一个事务中执行，各工具内部的 save_project 只记为待保存，最后统一写盘一次
+    own_transaction = not builder.in_transaction
+    if own_transaction:
+        builder.begin_transaction()
+
+    lines = []
+    failed = None
+    start = time.perf_counter()
+    for index, step in enumerate(steps, 1):
+        name = step["tool"]
+        step_start = time.perf_counter()
+        try:
+            result = registry[name](step.get("arguments", {}))
+        except Exception as e:
+            failed = index
+            lines.append(f"{index}. {name} {(time.perf_counter() - step_start) * 1000:.1f} ms ❌ {type(e).__name__}: {e}")
+            break
+        lines.append(f"{index}. {name} {(time.perf_counter() - step_start) * 1000:.1f} ms {result}")
+    elapsed = time.perf_counter() - start
+
+    save_start = time.perf_counter()
+    if not own_transaction:
+        save_note = "在外部事务中，未写盘"
+    elif failed is not None and atomic:
+        builder.abort_transaction()
+        save_note = "已回滚，未写盘"
+    else:
+        builder.commit_transaction()
+        save_note = f"写盘 {(time.perf_counter() - save_start) * 1000:.1f} ms"
+
+    done = len(steps) if failed is None else failed - 1
+    status = "✅" if failed is None else "❌"
+    header = f"{status} 批量执行 {done}/{len(steps)} 步，耗时 {elapsed * 1000:.1f} ms（{save_note}）"
+    return "\n".join([header] + lines)
+
 
 tools = [
     {
@@ -174,6 +455,142 @@ tools = [
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_inputs",
+            "description": "在当前 Operator 中一次添加多个输入端口，比逐个调用 create_input 快得多。已存在的名称会被跳过。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "items": {
+                        "type": "array",
+                        "description": "要添加的输入列表，按顺序创建。",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string", "description": "名称"},
+                                "type": {"type": "string", "description": "数据类型，例如 int32、bool、uint16^5、uint32^10^20"}
+                            },
+                            "required": ["name", "type"],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["items"],
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_outputs",
+            "description": "在当前 Operator 中一次添加多个输出端口。已存在的名称会被跳过。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "items": {
+                        "type": "array",
+                        "description": "要添加的输出列表，按顺序创建。",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string", "description": "名称"},
+                                "type": {"type": "string", "description": "数据类型，例如 int32、bool、uint16^5、uint32^10^20"}
+                            },
+                            "required": ["name", "type"],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["items"],
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_locals",
+            "description": "在当前 Operator（或当前状态）中一次添加多个局部变量。已存在的名称会被跳过。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "items": {
+                        "type": "array",
+                        "description": "要添加的局部变量列表。",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string", "description": "名称"},
+                                "type": {"type": "string", "description": "数据类型，例如 int32、bool、uint16^5、uint32^10^20"}
+                            },
+                            "required": ["name", "type"],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["items"],
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_constants",
+            "description": "在当前 Package 中一次添加多个常量。已存在的名称会被跳过。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "items": {
+                        "type": "array",
+                        "description": "要添加的常量列表。",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string", "description": "名称"},
+                                "type": {"type": "string", "description": "数据类型，例如 int32、bool、uint16^5、uint32^10^20"},
+                                "value": {"type": "string", "description": "常量值，数组用 JSON 写法，例如 [1, 2, 3]"}
+                            },
+                            "required": ["name", "type", "value"],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["items"],
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_sensors",
+            "description": "在当前 Package 中一次添加多个传感器（Sensor）。已存在的名称会被跳过。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "items": {
+                        "type": "array",
+                        "description": "要添加的传感器列表。",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string", "description": "名称"},
+                                "type": {"type": "string", "description": "数据类型，例如 int32、bool、uint16^5、uint32^10^20"}
+                            },
+                            "required": ["name", "type"],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["items"],
+                "additionalProperties": False
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
@@ -224,7 +641,9 @@ Output_02 = _L5
 
 ---
 
-                    """}
+                    """},
+                    "patch": {"type": "boolean", "description": "为 true 时把 text 视为当前 canvas 数据流的完整新版本，只新增、删除或修改有变化的等式（连同其局部变量和连线），返回差异；默认 false，全部生成到新的图中"},
+                    "max_diagram_size": {"type": "integer", "description": "每张图最多的等式数。等式很多时按依赖关系拆成多张图（分页），跨页的连线不画；不填则全部放在一张图中"}
                 },
                 "required": ["text"],
                 "additionalProperties": False
@@ -269,6 +688,206 @@ Output_02 = _L5
       "additionalProperties": False
     }
   }
-}
+},
+    {
+        "type": "function",
+        "function": {
+            "name": "layout_diagram",
+            "description": "对当前 Operator 的数据流图重新做分层布局，整理所有等式节点的位置和连线折点。默认布局所有 Dataflow_diagram（分页生成的多张图都会处理），也可以只指定一张。create_dataFlow 会自动布局，patch 模式多次修改后可调用本工具整体整理。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "diagram": {"type": "string", "description": "只布局这张图，例如 Dataflow_diagram_2；省略时布局全部"}
+                },
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "begin_transaction",
+            "description": "开始事务。开始前尚未保存的修改会先写盘；之后的修改只作用于内存，直到 commit_transaction 时统一保存一次；适合连续多次创建操作。",
+            "parameters": {
+                "type": "object",
+                "properties": {},
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "commit_transaction",
+            "description": "提交事务，把事务期间的所有修改一次性保存到项目文件。",
+            "parameters": {
+                "type": "object",
+                "properties": {},
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "abort_transaction",
+            "description": "放弃事务，丢弃事务期间的所有修改，模型恢复为事务开始时的状态。",
+            "parameters": {
+                "type": "object",
+                "properties": {},
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "set_write_behind",
+            "description": "开启或关闭异步写盘。开启后保存在后台进行并合并连续的保存请求，工具调用立即返回。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "enabled": {"type": "boolean", "description": "true 开启，false 关闭（关闭前会等待已提交的保存完成）。"}
+                },
+                "required": ["enabled"],
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_operators",
+            "description": "列出项目中的 Operator 及其输入/输出数。直接读取磁盘上的 .etp/.xscade 建立只读索引，不需要 JVM，也不加载模型（未保存的修改不在其中）。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "project_dir": {"type": "string", "description": "项目目录，省略时使用当前项目。"},
+                    "project_name": {"type": "string", "description": "项目名（不含 .etp），省略时使用当前项目。"},
+                    "package": {"type": "string", "description": "只列出该包（含子包）中的 Operator，例如 Package1。"}
+                },
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "validate_project",
+            "description": "校验磁盘上的项目文件：按 .xscade 文件分发到多个进程并行解析和检查（重复声明、重复赋值、未声明或未赋值的变量），再做跨文件检查（重复定义、未定义的类型和 Operator）。不需要 JVM。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "project_dir": {"type": "string", "description": "项目目录，省略时使用当前项目。"},
+                    "project_name": {"type": "string", "description": "项目名（不含 .etp），省略时使用当前项目。"},
+                    "workers": {"type": "integer", "description": "并行解析的进程数，省略时使用环境变量 SCADE_INDEX_WORKERS 或 CPU 数。"}
+                },
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "describe_operator",
+            "description": "从只读项目索引中查询一个 Operator 的输入、输出、局部变量及其类型和状态机。不需要 JVM，也不加载模型。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "operator_name": {"type": "string", "description": "Operator 限定名，例如 Package1::Operator1；名称唯一时也可只写 Operator 名。"},
+                    "project_dir": {"type": "string", "description": "项目目录，省略时使用当前项目。"},
+                    "project_name": {"type": "string", "description": "项目名（不含 .etp），省略时使用当前项目。"}
+                },
+                "required": ["operator_name"],
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "set_xscade_writer",
+            "description": "memory 后端下开启或关闭 XSCADE 写出器。开启后保存时不经 JVM 直接把 Package 写成 .xscade 文件并更新 .etp 的文件列表。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "enabled": {"type": "boolean", "description": "true 开启，false 关闭。"}
+                },
+                "required": ["enabled"],
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "wait_saved",
+            "description": "等待所有修改写入磁盘。异步写盘模式下，需要确保数据已落盘再继续时调用。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "timeout": {"type": "number", "description": "最长等待秒数，不填则一直等待。"}
+                },
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "start_trace",
+            "description": "开始记录性能追踪：每个工具调用和 builder 阶段（parse、resolve、emit、layout、save）的耗时及后端调用次数（jpype 后端为 factory_calls，只含工厂/工具类调用；memory 后端为 model_calls，含全部对象模型调用）。",
+            "parameters": {
+                "type": "object",
+                "properties": {},
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "stop_trace",
+            "description": "停止记录性能追踪，返回汇总表；给出 path 时同时导出 Chrome trace-event JSON（可在 chrome://tracing 或 Perfetto 中查看）。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string", "description": "导出的 trace JSON 文件路径，可选。"}
+                },
+                "additionalProperties": False
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "run_batch",
+            "description": "一次调用按顺序执行多个工具，例如切换路径、批量创建输入输出、生成数据流。执行前检查所有步骤的参数，有错误时一步都不执行；执行时只在最后写盘一次，返回每一步的结果和耗时。不能包含 run_batch、事务相关工具、wait_saved 和 set_write_behind。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "steps": {
+                        "type": "array",
+                        "description": "按顺序执行的步骤。",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "tool": {"type": "string", "description": "工具名称，例如 create_inputs、create_dataFlow"},
+                                "arguments": {"type": "object", "description": "该工具的参数，与单独调用时相同"}
+                            },
+                            "required": ["tool"],
+                            "additionalProperties": False
+                        }
+                    },
+                    "atomic": {"type": "boolean", "description": "为 true 时某一步失败则放弃整批修改，模型恢复为 run_batch 开始时的状态（开始前尚未保存的修改会先写盘，不会丢失）；在外部事务中执行时不单独回滚，由外部事务决定。默认 false，保留并保存失败前已完成的步骤"}
+                },
+                "required": ["steps"],
+                "additionalProperties": False
+            }
+        }
+    }
 
 ]
+
+# 工具名 -> 参数 schema，run_batch 检查参数时使用
+TOOL_SCHEMAS = {tool["function"]["name"]: tool["function"]["parameters"] for tool in tools}
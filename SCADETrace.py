@@ -0,0 +1,198 @@
+# SCADETrace.py
+# 观测工具：
+#   - log:    分级日志（替代原来的 emoji print），参数按 %s 惰性格式化，级别关闭时不做任何格式化
+#             ❌ -> error，⚠️ -> warning，✅ -> info，🟡🔵🔹🔸 -> debug
+#             默认级别由环境变量 SCADE_LOG_LEVEL 指定（默认 INFO）
+#   - tracer: 嵌套计时 span（工具调用、builder 各阶段：parse / resolve / emit / layout / save ...），
+#             每个 span 记录期间的后端调用次数（口径由后端的 call_metric 决定：jpype 为 factory_calls，
+#             只统计工厂/工具类的调用；memory 为 model_calls，统计全部对象模型调用）；可导出 Chrome trace-event JSON（chrome://tracing、Perfetto）
+#             和汇总表。未开启时 span() 返回共享的空上下文，几乎没有开销。
+import collections, contextlib, json, logging, os, sys, threading, time
+
+# 日志
+
+class StdoutHandler(logging.StreamHandler):
+    """
+    每次输出时取当前的 sys.stdout，这样守护进程把 stdout 重定向到 stderr、或 redirect_stdout 时同样生效。
+    """
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+log = logging.getLogger("scade")
+if not log.handlers:
+    handler = StdoutHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+    log.propagate = False
+
+try:
+    log.setLevel(os.environ.get("SCADE_LOG_LEVEL", "INFO").upper())
+except ValueError:
+    # 无效的级别不能让导入失败，退回 INFO
+    log.setLevel(logging.INFO)
+    log.warning("⚠️ 无效的 SCADE_LOG_LEVEL: %s，使用 INFO", os.environ["SCADE_LOG_LEVEL"])
+
+
+def set_log_level(level):
+    """
+    设置日志级别，level 可以是 "DEBUG" / "INFO" / "WARNING" / "ERROR" 或 logging 的数值级别。
+    """
+    log.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+# 追踪
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.local = threading.local()
+        self.counter = None
+        self.counting = None
+        # 调用次数在导出和汇总中的名称，取自后端的 call_metric
+        self.call_metric = "backend_calls"
+        self.origin = 0.0
+        self.lock = threading.Lock()
+
+    def start(self, backend=None):
+        """
+        开始记录 span，清空之前的记录；传入 backend 时同时统计后端调用次数。
+        """
+        self.stop()
+        self.events = []
+        self.origin = time.perf_counter()
+        if backend is not None:
+            self.call_metric = getattr(backend, "call_metric", "backend_calls")
+            self.counting = contextlib.ExitStack()
+            self.counter = self.counting.enter_context(backend.count_calls(collections.Counter()))
+            if self.counter is None:
+                self.counting.close()
+                self.counting = None
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+        if self.counting is not None:
+            self.counting.close()
+            self.counting = None
+        self.counter = None
+
+    def total_calls(self):
+        counter = self.counter
+        return sum(counter.values()) if counter is not None else None
+
+    def span(self, name: str, **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def record(self, event: dict):
+        with self.lock:
+            self.events.append(event)
+
+    def export_chrome_trace(self, path: str):
+        """
+        写出 Chrome trace-event JSON（"X" 完整事件，时间单位为微秒）。
+        """
+        trace_events = []
+        pid = os.getpid()
+        for event in self.events:
+            args = dict(event["args"])
+            if event["calls"] is not None:
+                args[self.call_metric] = event["calls"]
+            trace_events.append({
+                "name": event["name"],
+                "cat": event["name"].split(":", 1)[0],
+                "ph": "X",
+                "ts": round(event["start"] * 1e6, 3),
+                "dur": round(event["duration"] * 1e6, 3),
+                "pid": pid,
+                "tid": event["tid"],
+                "args": args,
+            })
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return path
+
+    def summary(self):
+        """
+        按 span 名称汇总：{name: {"count", "total", "self", "calls"}}，total/self 单位为秒；
+        self 为扣除直接子 span 后的耗时。
+        """
+        rows = {}
+        for event in self.events:
+            row = rows.setdefault(event["name"], {"count": 0, "total": 0.0, "self": 0.0, "calls": None})
+            row["count"] += 1
+            row["total"] += event["duration"]
+            row["self"] += event["duration"] - event["children"]
+            if event["calls"] is not None:
+                row["calls"] = (row["calls"] or 0) + event["calls"]
+        return rows
+
+    def format_summary(self):
+        rows = sorted(self.summary().items(), key=lambda item: item[1]["total"], reverse=True)
+        lines = [f"{'span':<40}{'次数':>8}{'总耗时(ms)':>14}{'自身(ms)':>12}{'平均(ms)':>12}{self.call_metric:>16}"]
+        for name, row in rows:
+            lines.append(f"{name:<40}{row['count']:>8}{row['total'] * 1000:>14.2f}{row['self'] * 1000:>12.2f}"
+                         f"{row['total'] * 1000 / row['count']:>12.3f}{str(row['calls']):>16}")
+        return "\n".join(lines)
+
+
+class Span:
+    __slots__ = ("tracer", "name", "args", "start", "calls", "children")
+
+    def __init__(self, tracer: Tracer, name: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.children = 0.0
+
+    def __enter__(self):
+        stack = self.tracer.local.__dict__.setdefault("stack", [])
+        stack.append(self)
+        self.calls = self.tracer.total_calls()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        duration = end - self.start
+        tracer = self.tracer
+        stack = tracer.local.stack
+        stack.pop()
+        if stack:
+            stack[-1].children += duration
+        if self.start < tracer.origin:
+            # 在本次 start() 之前开始的 span（例如 start_trace 所在的工具调用）不属于这次记录，丢弃
+            return False
+        calls = tracer.total_calls()
+        args = self.args
+        if exc_type is not None:
+            args = dict(args, error=f"{exc_type.__name__}: {exc}")
+        tracer.record({
+            "name": self.name,
+            "start": self.start - tracer.origin,
+            "duration": duration,
+            "children": self.children,
+            "tid": threading.get_ident(),
+            "depth": len(stack),
+            "calls": calls - self.calls if calls is not None and self.calls is not None else None,
+            "args": args,
+        })
+        return False
+
+
+NULL_SPAN = contextlib.nullcontext()
+
+tracer = Tracer()
+if os.environ.get("SCADE_TRACE"):
+    tracer.start()
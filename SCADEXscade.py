@@ -0,0 +1,535 @@
+# SCADEXscade.py
+# 不经过 JVM 的 XSCADE 写出器：把 memory 后端中的模型直接流式写成 .xscade 文件，并更新 .etp 的文件列表。
+#   - 每个 .xscade 的根是 <File>，其下 <declarations> 中是该 resource 的 Package
+#   - 元素名即类名；属性特性写成 XML 属性，包含特性写成同名的包装元素
+#   - 模型引用写成按名称的 Ref 元素（VariableRef / ConstVarRef / TypeRef / OperatorRef / StateRef），
+#     包外的声明使用 "P1::P2::Name" 限定名
+#   - editor pragma 使用 ed: 前缀并在该元素上把默认命名空间切换为 editor（其中的图形元素不再加前缀），
+#     图形元素对模型对象的引用（presentable、srcEquation、dstEquation）写成被引用对象的 oid
+#   - codegen pragma 的 data 写成元素文本
+# 通过 SCADE_Builder.set_xscade_writer(True) 挂到 SCADEMemory.set_resource_writer，此后 save_project 真正写盘；
+# 同时设置 SCADEMemory.set_model_reader，loadModel 改为用 read_model 从这些文件重建模型，不再保存内存快照。
+# 写出按对象逐行生成并分块写入，内存占用与模型大小无关（不构建 DOM）；先写临时文件再替换，避免留下半个文件。
+import os
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+from SCADETrace import log
+import SCADEMemory
+
+NAMESPACES = {
+    "scade": "http://www.esterel-technologies.com/ns/scade/6",
+    "editor": "http://www.esterel-technologies.com/ns/scade/pragmas/editor/8",
+    "codegen": "http://www.esterel-technologies.com/ns/scade/pragmas/codegen/3",
+}
+PREFIXES = {"scade": "", "editor": "ed:", "codegen": "kcg:"}
+
+# 模型引用的元素名：(特性名, 被引用对象的类名) -> Ref 元素名，特性名为 None 表示任意特性
+REF_TAGS = {
+    ("lefts", "Variable"): "VariableRef",
+    (None, "Variable"): "ConstVarRef",
+    (None, "Constant"): "ConstVarRef",
+    (None, "Sensor"): "ConstVarRef",
+    (None, "Type"): "TypeRef",
+    (None, "Operator"): "OperatorRef",
+    (None, "State"): "StateRef",
+}
+
+# editor 图形元素中按 oid 写成 XML 属性的引用：特性名 -> 属性名
+OID_REFS = {
+    "equation": "presentable",
+    "stateMachine": "presentable",
+    "state": "presentable",
+    "transition": "presentable",
+    "srcEquation": "srcEquation",
+    "dstEquation": "dstEquation",
+}
+
+# 写成元素文本的属性特性：(命名空间, 类名) -> 特性名
+TEXT_FEATURES = {("codegen", "Pragma"): "data"}
+
+# 累积到这么多行写一次文件
+CHUNK_LINES = 4096
+
+# 每个类的写出计划：EClass -> (属性列表, 子元素列表, 文本特性)，首次遇到时生成
+PLANS = {}
+
+
+def class_plan(eclass):
+    """
+    按 SCHEMA 生成类的写出计划，访问方法直接取类上的 getX，避免每个对象重复拼方法名。
+    """
+    plan = PLANS.get(eclass)
+    if plan is not None:
+        return plan
+    cls = eclass.python_class
+    text_feature = TEXT_FEATURES.get((eclass.namespace, eclass.name))
+    attributes, children, text = [], [], None
+    for feature in eclass.features:
+        name, kind = feature[0], feature[1]
+        if kind == "view":
+            continue
+        getter = getattr(cls, "get" + SCADEMemory.capitalize(name))
+        default = feature[2] if len(feature) > 2 else None
+        if name == text_feature:
+            text = getter
+        elif kind == "attr" or (kind == "ref" and eclass.namespace == "editor" and name in OID_REFS):
+            attributes.append((OID_REFS.get(name, name) if kind == "ref" else name, kind, getter, default))
+        else:
+            children.append((name, kind, getter))
+    plan = PLANS[eclass] = (attributes, children, text)
+    return plan
+
+
+def attribute_text(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def presentable_oid(obj):
+    """
+    图形元素引用的 oid：EquationGE 等取其表示的模型对象的 oid。
+    """
+    if obj is None:
+        return None
+    if obj.eclass.namespace == "editor" and hasattr(obj, "getEquation"):
+        obj = obj.getEquation()
+    return SCADEMemory.EditorPragmasUtil.getOid(obj) if obj is not None else None
+
+
+def qualified_name(obj) -> str:
+    """
+    引用使用的名称：局部变量和状态只用名称，包中的声明加上外层包名。
+    """
+    name = obj.getName()
+    if obj.eclass.name in ("Variable", "State"):
+        return name
+    parts = [name]
+    container = obj.eContainer()
+    while container is not None and container.eclass.name == "Package":
+        parts.append(container.getName())
+        container = container.eContainer()
+    return "::".join(reversed(parts))
+
+
+def ref_tag(feature: str, target) -> str:
+    class_name = target.eclass.name
+    return REF_TAGS.get((feature, class_name)) or REF_TAGS.get((None, class_name)) or f"{class_name}Ref"
+
+
+def element_lines(obj, depth: int, namespace: str):
+    """
+    逐行生成 obj 的 XML。namespace 为外层元素的默认命名空间，命名空间变化时在本元素上重新声明。
+    """
+    eclass = obj.eclass
+    attributes, children, text_getter = class_plan(eclass)
+    indent = "\t" * depth
+    # 与外层命名空间相同时不加前缀（外层已把默认命名空间切换过来），否则加前缀并切换默认命名空间
+    if eclass.namespace == namespace:
+        tag = eclass.name
+    else:
+        tag = PREFIXES[eclass.namespace] + eclass.name
+
+    parts = [indent, "<", tag]
+    if eclass.namespace != namespace:
+        parts.append(f" xmlns={quoteattr(NAMESPACES[eclass.namespace])}")
+    for name, kind, getter, default in attributes:
+        value = getter(obj)
+        if kind == "ref":
+            value = presentable_oid(value)
+        if value is None or (default is False and value is False):
+            continue
+        parts.append(f" {name}={quoteattr(attribute_text(value))}")
+
+    text = text_getter(obj) if text_getter is not None else None
+    child_blocks = []
+    for name, kind, getter in children:
+        value = getter(obj)
+        if kind in ("many", "refs", "attrs"):
+            items = list(value)
+            if items:
+                child_blocks.append((name, kind, items))
+        elif value is not None:
+            child_blocks.append((name, kind, [value]))
+
+    if text is not None:
+        parts.append(f">{escape(str(text))}</{tag}>")
+        yield "".join(parts)
+        return
+    if not child_blocks:
+        parts.append("/>")
+        yield "".join(parts)
+        return
+    parts.append(">")
+    yield "".join(parts)
+
+    inner = indent + "\t"
+    item_indent = inner + "\t"
+    for name, kind, items in child_blocks:
+        if kind == "attrs":
+            for item in items:
+                yield f"{inner}<{name}>{escape(str(item))}</{name}>"
+            continue
+        yield f"{inner}<{name}>"
+        for item in items:
+            if kind in ("ref", "refs"):
+                yield f"{item_indent}<{ref_tag(name, item)} name={quoteattr(qualified_name(item))}/>"
+            else:
+                yield from element_lines(item, depth + 2, eclass.namespace)
+        yield f"{inner}</{name}>"
+    yield f"{indent}</{tag}>"
+
+
+def file_lines(declarations):
+    yield '<?xml version="1.0" encoding="UTF-8"?>'
+    namespaces = "".join(f" xmlns{':' + prefix[:-1] if prefix else ''}={quoteattr(NAMESPACES[namespace])}"
+                         for namespace, prefix in PREFIXES.items())
+    yield f"<File{namespaces}>"
+    yield "\t<declarations>"
+    for declaration in declarations:
+        yield from element_lines(declaration, 2, "scade")
+    yield "\t</declarations>"
+    yield "</File>"
+
+
+def write_lines(path: str, lines) -> int:
+    """
+    分块写入 lines（先写 path.tmp 再替换），返回写入的行数。
+    """
+    temp_path = path + ".tmp"
+    count = 0
+    with open(temp_path, "w", encoding="utf-8", newline="\n") as stream:
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= CHUNK_LINES:
+                stream.write("\n".join(chunk))
+                stream.write("\n")
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            stream.write("\n".join(chunk))
+            stream.write("\n")
+            count += len(chunk)
+    os.replace(temp_path, path)
+    return count
+
+
+def write_xscade(path: str, declarations) -> int:
+    """
+    把一组顶层声明（通常是一个 Package）写成 .xscade 文件，返回行数。
+    """
+    return write_lines(path, file_lines(declarations))
+
+
+def write_project(path: str, persist_as):
+    """
+    更新 .etp 中的 FileRef 列表：已有的项目文件保留其余内容，只追加缺少的 FileRef（放在
+    扩展名含 xscade 的 Folder 中，没有时放在 roots 下）；文件不存在时写一个最小的项目文件。
+    返回新增的 FileRef 数。
+    """
+    if os.path.exists(path):
+        tree = ET.parse(path)
+        root = tree.getroot()
+    else:
+        root = ET.Element("Project")
+        ET.SubElement(root, "props")
+        tree = ET.ElementTree(root)
+
+    registered = {element.get("persistAs") for element in root.iter("FileRef")}
+    missing = [name for name in persist_as if name not in registered]
+    if not missing and os.path.exists(path):
+        return 0
+
+    parent = None
+    for folder in root.iter("Folder"):
+        if "xscade" in (folder.get("extensions") or ""):
+            parent = folder.find("elements")
+            if parent is None:
+                parent = ET.SubElement(folder, "elements")
+            break
+    if parent is None:
+        parent = root.find("roots")
+        if parent is None:
+            parent = ET.SubElement(root, "roots")
+    for name in missing:
+        ET.SubElement(parent, "FileRef", {"persistAs": name})
+
+    ET.indent(tree, space="\t")
+    temp_path = path + ".tmp"
+    tree.write(temp_path, encoding="UTF-8", xml_declaration=True)
+    os.replace(temp_path, path)
+    return len(missing)
+
+
+def write_resource(resource):
+    """
+    SCADEMemory 的 resource 写出函数：.etp 更新文件列表，其余 resource 写成 .xscade。
+    """
+    path = resource.getURI().toFileString()
+    contents = list(resource.getContents())
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if path.endswith(".etp"):
+        persist_as = [file_ref.getPersistAs() for project in contents if project.eclass.name == "Project"
+                      for file_ref in project.getFileRefs()]
+        added = write_project(path, persist_as)
+        log.debug("🟡 写入项目文件 %s，新增 %s 个 FileRef", path, added)
+        return
+
+    declarations = [obj for obj in contents if obj.eclass.namespace == "scade"]
+    lines = write_xscade(path, declarations)
+    log.debug("🟡 写入 %s: %s 行", path, lines)
+
+
+# 读取时按整数解析的属性（其余属性按 SCHEMA 默认值为 bool 的解析为 bool，否则保留字符串）
+INT_ATTRIBUTES = {"x", "y", "width", "height", "leftVarIndex", "rightExprIndex"}
+URI_NAMESPACES = {uri: namespace for namespace, uri in NAMESPACES.items()}
+OID_ATTRIBUTES = {}
+for feature_name, attribute_name in OID_REFS.items():
+    OID_ATTRIBUTES.setdefault(attribute_name, []).append(feature_name)
+
+
+def split_tag(tag: str):
+    """
+    "{uri}Name" -> (命名空间, Name)；不认识的命名空间返回 (None, Name)。
+    """
+    if tag[0] == "{":
+        uri, _, name = tag[1:].partition("}")
+        return URI_NAMESPACES.get(uri), name
+    return "scade", tag
+
+
+def parse_attribute(eclass, name: str, text: str):
+    for feature in eclass.features:
+        if feature[0] == name:
+            if name in INT_ATTRIBUTES:
+                return int(text)
+            if len(feature) > 2 and isinstance(feature[2], bool):
+                return text == "true"
+            return text
+    return text
+
+
+def read_xscade(path: str, model, resource, pending: list):
+    """
+    流式读取一个 .xscade：顶层声明加入 model 和 resource，未解析的引用追加到 pending：
+    (对象, 特性名, 特性种类, Ref 元素名, 名称) 或 (对象, 特性名, "oid", None, oid)。
+    已处理完的 XML 元素立即从树上摘掉，内存占用只与嵌套深度有关。
+    """
+    # 栈帧：("object", 对象) / ("feature", 所属对象, 特性名, 特性种类) / ("skip",)
+    stack = []
+    elements = []
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            elements.append(element)
+            frame = stack[-1] if stack else None
+            namespace, name = split_tag(element.tag)
+            if frame is None:
+                # <File> 本身和其下的 <declarations> 包装元素
+                stack.append(("root",) if name == "File" else ("feature", None, "declarations", "many"))
+            elif frame[0] == "root":
+                stack.append(("feature", None, name, "many"))
+            elif frame[0] == "object":
+                owner = frame[1]
+                kind = next((feature[1] for feature in owner.eclass.features if feature[0] == name), None)
+                stack.append(("feature", owner, name, kind) if kind is not None else ("skip",))
+            elif frame[0] == "feature" and frame[3] in ("ref", "refs"):
+                pending.append((frame[1], frame[2], frame[3], name, element.get("name")))
+                stack.append(("skip",))
+            elif frame[0] == "feature" and frame[3] in ("contains", "many") and namespace is not None:
+                owner, feature_name, kind = frame[1], frame[2], frame[3]
+                obj = SCADEMemory.CLASSES[namespace][name]()
+                for attribute, text in element.attrib.items():
+                    if attribute in OID_ATTRIBUTES and obj.eclass.namespace == "editor":
+                        for ref_name in OID_ATTRIBUTES[attribute]:
+                            if hasattr(obj, "set" + SCADEMemory.capitalize(ref_name)):
+                                pending.append((obj, ref_name, "oid", None, text))
+                    elif hasattr(obj, "set" + SCADEMemory.capitalize(attribute)):
+                        getattr(obj, "set" + SCADEMemory.capitalize(attribute))(parse_attribute(obj.eclass, attribute, text))
+                if owner is None:
+                    model.getDeclarations().add(obj)
+                    resource.getContents().add(obj)
+                elif kind == "many":
+                    getattr(owner, "get" + SCADEMemory.capitalize(feature_name))().add(obj)
+                else:
+                    getattr(owner, "set" + SCADEMemory.capitalize(feature_name))(obj)
+                stack.append(("object", obj))
+            else:
+                stack.append(("skip",))
+            continue
+
+        frame = stack.pop()
+        if frame[0] == "object":
+            obj = frame[1]
+            text_feature = TEXT_FEATURES.get((obj.eclass.namespace, obj.eclass.name))
+            if text_feature is not None and element.text:
+                getattr(obj, "set" + SCADEMemory.capitalize(text_feature))(element.text)
+        elif frame[0] == "feature" and frame[3] == "attrs":
+            getattr(frame[1], "get" + SCADEMemory.capitalize(frame[2]))().add(element.text or "")
+        elements.pop()
+        if elements:
+            del elements[-1][-1]
+
+
+def declaration_scopes(model):
+    """
+    包中声明的限定名索引：限定名 -> 对象（预定义类型只用名称）。
+    """
+    scopes = {type_obj.getName(): type_obj for type_obj in model.getPredefinedTypes()}
+
+    def visit(container, prefix):
+        for declaration in container.getDeclarations():
+            name = prefix + declaration.getName()
+            if declaration.eclass.name == "Package":
+                visit(declaration, name + "::")
+            scopes.setdefault(name, declaration)
+    visit(model, "")
+    return scopes
+
+
+def enclosing(obj, class_name: str):
+    while obj is not None and obj.eclass.name != class_name:
+        obj = obj.eContainer()
+    return obj
+
+
+def package_prefixes(obj):
+    """
+    obj 所在的各级包前缀，由内到外，最后是空前缀，例如 ["P1::P2::", "P1::", ""]。
+    """
+    names = []
+    container = obj.eContainer()
+    while container is not None:
+        if container.eclass.name == "Package":
+            names.append(container.getName())
+        container = container.eContainer()
+    names.reverse()
+    return ["::".join(names[:count]) + "::" for count in range(len(names), 0, -1)] + [""]
+
+
+def resolve_references(model, pending: list):
+    """
+    解析 read_xscade 收集的引用，返回无法解析的引用数。
+    变量按所在 Operator 中的全部变量（含状态、分支中的局部变量）查找，找不到时再按包声明查找。
+    """
+    scopes = declaration_scopes(model)
+    operator_variables = {}
+    state_machines = {}
+    oids = {}
+    for obj in SCADEMemory.EcoreUtil.getAllContents(model):
+        if obj.eclass.namespace == "editor" and hasattr(obj, "getOid") and obj.getOid() is not None:
+            container = obj.eContainer()
+            if container is not None and container.eclass.namespace == "scade":
+                oids[obj.getOid()] = container
+
+    def variables_of(operator):
+        variables = operator_variables.get(operator)
+        if variables is None:
+            variables = operator_variables[operator] = {}
+            for obj in SCADEMemory.EcoreUtil.getAllContents(operator):
+                if obj.eclass.name == "Variable":
+                    variables.setdefault(obj.getName(), obj)
+        return variables
+
+    def lookup(obj, tag, name):
+        if tag in ("VariableRef", "ConstVarRef"):
+            operator = enclosing(obj, "Operator")
+            if operator is not None and name in variables_of(operator):
+                return variables_of(operator)[name]
+        if tag == "StateRef":
+            state_machine = enclosing(obj, "StateMachine")
+            if state_machine is None:
+                return None
+            states = state_machines.get(state_machine)
+            if states is None:
+                states = state_machines[state_machine] = {state.getName(): state for state in state_machine.getStates()}
+            return states.get(name)
+        for prefix in package_prefixes(obj):
+            target = scopes.get(prefix + name)
+            if target is not None:
+                return target
+        return None
+
+    unresolved = 0
+    equation_ges = {}
+    oid_refs = []
+    for obj, feature, kind, tag, name in pending:
+        if kind == "oid":
+            oid_refs.append((obj, feature, name))
+            continue
+        target = lookup(obj, tag, name)
+        if target is None:
+            unresolved += 1
+            log.warning("⚠️ 无法解析引用 %s %s", tag, name)
+        elif kind == "refs":
+            getattr(obj, "get" + SCADEMemory.capitalize(feature))().add(target)
+        else:
+            getattr(obj, "set" + SCADEMemory.capitalize(feature))(target)
+
+    # 先解析 presentable，再按等式找到 EquationGE 解析连线两端
+    for obj, feature, oid in oid_refs:
+        if feature in ("srcEquation", "dstEquation"):
+            continue
+        target = oids.get(oid)
+        if target is None:
+            unresolved += 1
+            continue
+        getattr(obj, "set" + SCADEMemory.capitalize(feature))(target)
+        if feature == "equation":
+            equation_ges[target] = obj
+    for obj, feature, oid in oid_refs:
+        if feature not in ("srcEquation", "dstEquation"):
+            continue
+        target = equation_ges.get(oids.get(oid))
+        if target is None:
+            unresolved += 1
+            continue
+        getattr(obj, "set" + SCADEMemory.capitalize(feature))(target)
+    return unresolved
+
+
+def read_model(project_uri, resource_set):
+    """
+    SCADEMemory 的模型读取函数：按 .etp 中的 FileRef 读取全部 .xscade，重建 Model 和各 resource。
+    .etp 不存在时返回 None。
+    """
+    project_path = project_uri.toFileString()
+    if not os.path.exists(project_path):
+        return None
+    project_dir = os.path.dirname(project_path)
+    persist_as = [element.get("persistAs") for element in ET.parse(project_path).getroot().iter("FileRef")]
+
+    resource_set.resources = []
+    project_resource = resource_set.createResource(project_uri)
+    project = SCADEMemory.theProjectFactory.createProject()
+    project_resource.getContents().add(project)
+    model = resource_set.model = SCADEMemory.create_model()
+
+    pending = []
+    for name in persist_as:
+        file_ref = SCADEMemory.theProjectFactory.createFileRef()
+        file_ref.setPersistAs(name)
+        project.getFileRefs().add(file_ref)
+        path = os.path.join(project_dir, name)
+        if not name.endswith(".xscade") or not os.path.exists(path):
+            continue
+        resource = resource_set.createResource(SCADEMemory.URI.createFileURI(path))
+        read_xscade(path, model, resource, pending)
+    unresolved = resolve_references(model, pending)
+    log.debug("🟡 读取 %s 个模型文件，%s 个引用，%s 个无法解析", len(persist_as), len(pending), unresolved)
+    return model
+
+
+def enable(enabled: bool = True):
+    """
+    开启/关闭 memory 后端的 XSCADE 写盘（同时从 XSCADE 文件读取模型）。
+    """
+    SCADEMemory.set_resource_writer(write_resource if enabled else None)
+    SCADEMemory.set_model_reader(read_model if enabled else None)
+
+
+def is_enabled() -> bool:
+    return SCADEMemory.RESOURCE_WRITER is write_resource
@@ -0,0 +1,42 @@
+# 测试使用 memory 后端（纯 Python，无需 JVM 和 SCADE jar），项目写在 pytest 的临时目录中
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# SCADETools 导入时按环境变量创建 builder
+os.environ.setdefault("SCADE_BACKEND", "memory")
+
+import SCADEMemory, SCADEXscade
+from SCADEAPI import SCADE_Builder, MODEL_SESSIONS
+
+
+@pytest.fixture
+def builder(tmp_path):
+    """
+    新建项目 project（Package Pk、Operator Op 并已写盘），开启 XSCADE 写盘，使重新加载读取的是磁盘上的文件。
+    """
+    builder = SCADE_Builder("memory")
+    builder.start_jvm()
+    builder.init_scade_classes()
+    builder.set_xscade_writer(True)
+    builder.init_project_and_model(str(tmp_path), "project")
+    builder.create_package("Pk")
+    builder.create_operator("Op")
+    builder.save_project()
+    yield builder
+    if builder.write_behind:
+        builder.set_write_behind(False)
+    SCADEXscade.enable(False)
+    SCADEMemory.MEMORY_DISK.clear()
+    MODEL_SESSIONS.clear()
+
+
+@pytest.fixture
+def tools(builder, monkeypatch):
+    """
+    SCADETools.registry，工具调用作用于 builder fixture 的项目。
+    """
+    import SCADETools
+    monkeypatch.setattr(SCADETools, "builder", builder)
+    return SCADETools.registry
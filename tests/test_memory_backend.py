@@ -0,0 +1,196 @@
+# 基于 memory 后端的 SCADE_Builder 回归测试
+import collections, json, os, random, time
+
+import pytest
+
+import SCADEIndex, SCADEMemory, SCADEXscade
+from SCADEAPI import SCADE_Builder, MODEL_SESSIONS
+from SCADELayout import partition_graph
+from SCADEParser import parse_dataflow, schedule_equations, DataflowScheduleError
+
+
+def input_names(builder):
+    return [str(var.getName()) for var in builder.current_operator.getInputs()]
+
+
+def test_abort_with_write_behind_keeps_transaction_off_disk(builder, tmp_path):
+    builder.set_write_behind(True)
+    # 与持锁执行的工具相同：后台线程在 begin_transaction 之前已被唤醒，但拿不到 model_lock
+    with builder.model_lock:
+        builder.create_input("A", "int32")
+        builder.save_project()
+        time.sleep(0.1)
+        builder.begin_transaction()
+        builder.create_input("B", "int32")
+    assert builder.wait_saved(5)
+
+    text = open(os.path.join(tmp_path, "Pk.xscade"), encoding="utf-8").read()
+    assert 'name="A"' in text
+    assert 'name="B"' not in text
+
+    with builder.model_lock:
+        builder.abort_transaction()
+    assert input_names(builder) == ["A"]
+
+
+def test_abort_restores_unsaved_work_from_before_the_transaction(builder):
+    builder.create_input("A", "int32")
+    builder.begin_transaction()
+    builder.create_input("B", "int32")
+    builder.create_package("Pk2")
+    builder.abort_transaction()
+    assert [str(package.getName()) for package in builder.mainModel.getPackages()] == ["Pk"]
+    assert input_names(builder) == ["A"]
+    assert builder.current_full_dir == "Pk::Op/"
+
+
+def test_patch_mode_reports_delta(builder):
+    builder.create_input("In1", "int32")
+    builder.create_output("Out1", "int32")
+    builder.create_output("Out2", "int32")
+    builder.create_dataFlow("_L1 = In1\n_L2 = + (_L1, 1)\nOut1 = _L2\n_L3 = * (_L2, 2)\nOut2 = _L3")
+
+    delta = builder.create_dataFlow("_L1 = In1\n_L2 = + (_L1, 1)\nOut1 = _L2\n_L3 = * (_L2, 3)\nOut2 = _L3",
+                                    patch=True)
+    assert delta == {"added": [], "removed": [], "changed": ["_L3"], "unchanged": 4}
+
+    delta = builder.create_dataFlow("_L1 = In1\n_L2 = + (_L1, 1)\nOut1 = _L2\n_L4 = - (_L2, 1)\nOut2 = _L4",
+                                    patch=True)
+    assert delta["added"] == ["_L4"]
+    assert delta["removed"] == ["_L3"]
+    assert delta["changed"] == ["Out2"]
+
+
+def test_xscade_round_trip(builder, tmp_path):
+    builder.create_input("In1", "int32")
+    builder.create_output("Out1", "int32")
+    builder.create_constant("C1", "int32^2", "[1, 2]")
+    builder.switch_to_operator_by_path("Pk::Op/")
+    builder.create_dataFlow("_L1 = In1\n_L2 = + (_L1, 1)\n_L3 = pre(_L2)\nOut1 = _L3")
+    builder.save_project()
+    written = open(os.path.join(tmp_path, "Pk.xscade"), encoding="utf-8").read()
+
+    SCADEMemory.MEMORY_DISK.clear()
+    MODEL_SESSIONS.clear()
+    reloaded = SCADE_Builder("memory")
+    reloaded.init_scade_classes()
+    reloaded.load_project_and_model(str(tmp_path), "project")
+    reloaded.switch_to_operator_by_path("Pk::Op/")
+    assert input_names(reloaded) == ["In1"]
+    assert sorted(reloaded.get_ge_index()) == ["Out1", "_L1", "_L2", "_L3"]
+
+    again = os.path.join(tmp_path, "again.xscade")
+    SCADEXscade.write_xscade(again, [reloaded.mainModel.getPackages()[0]])
+    assert open(again, encoding="utf-8").read() == written
+
+
+def test_scheduler_rejects_instantaneous_cycle():
+    equations = parse_dataflow("_L1 = + (_L2, 1)\n_L2 = + (_L1, 1)")
+    with pytest.raises(DataflowScheduleError, match="循环依赖"):
+        schedule_equations(equations)
+    # 经过 pre 的环可以生成
+    schedule_equations(parse_dataflow("_L1 = + (In1, _L2)\n_L2 = pre(_L1)"), lambda name: name == "In1")
+
+
+def test_scheduler_rejects_undefined_variable():
+    with pytest.raises(DataflowScheduleError, match="未定义的变量 _L9") as info:
+        schedule_equations(parse_dataflow("_L1 = + (_L9, 1)"), lambda name: False)
+    assert info.value.line == 1
+
+
+def test_block_reading_local_without_ge_is_rejected_before_emitting(builder):
+    builder.create_input("In1", "int32")
+    builder.create_output("Out1", "int32")
+    builder.create_local("_L9", "int32")
+    with pytest.raises(DataflowScheduleError, match="_L9"):
+        builder.create_dataFlow("_L1 = In1\n_L2 = + (_L1, _L9)\nOut1 = _L2")
+    assert builder.current_canvas.getData().size() == 0
+
+
+def test_operator_result_written_to_output_is_rejected_before_emitting(builder):
+    builder.create_input("In1", "int32")
+    builder.create_output("Out1", "int32")
+    with pytest.raises(DataflowScheduleError, match="Out1"):
+        builder.create_dataFlow("_L1 = In1\nOut1 = + (_L1, _L1)")
+    assert builder.current_canvas.getData().size() == 0
+
+
+def test_unresolved_type_is_cloned_without_crashing(builder):
+    builder.create_input("I", "Unknown_T")
+    builder.create_output("O", "int32")
+    builder.create_dataFlow("_L1 = I\nO = _L1")
+    assert builder.current_canvas.getData().size() == 2
+    descriptor = builder.describe_type(builder.current_operator.getInputs()[0].getType())
+    assert descriptor.base is None and descriptor.base_type is None
+
+
+def test_create_dataFlow_tool_without_operator(tools, builder):
+    builder.current_operator = None
+    assert tools["create_dataFlow"]({"text": "_L1 = In1", "patch": True}).startswith("❌")
+
+
+def test_bulk_tools_report_counts_and_reject_malformed_items(tools):
+    result = tools["create_inputs"]({"items": [{"name": "a", "type": "int32"}, {"name": "a", "type": "int32"}]})
+    assert "Input 1 个" in result and "名称 1 个" in result
+    assert tools["create_inputs"]({"items": [{"name": "b"}]}).startswith("❌")
+
+
+def test_trace_drops_spans_started_before_restart(tools, tmp_path):
+    tools["start_trace"]({})
+    tools["start_trace"]({})
+    tools["create_input"]({"input_name": "A", "type": "int32"})
+    path = os.path.join(tmp_path, "trace.json")
+    tools["stop_trace"]({"path": path})
+    events = json.load(open(path, encoding="utf-8"))["traceEvents"]
+    assert events and min(event["ts"] for event in events) >= 0
+    assert "model_calls" in next(event for event in events if event["name"] == "tool:create_input")["args"]
+
+
+def test_partition_graph_page_count_and_cut_ratio():
+    clusters = partition_graph(1001, [(source, 1000) for source in range(1000)], 100)
+    assert max(clusters) + 1 == 11
+
+    rng = random.Random(0)
+    edges = [(rng.randrange(max(0, node - 50), node), node) for node in range(1, 2000) for _ in range(rng.choice([1, 2, 3]))]
+    clusters = partition_graph(2000, edges, 300)
+    assert max(clusters) + 1 == 7
+    assert max(collections.Counter(clusters).values()) <= 300
+    assert sum(1 for src, dst in edges if clusters[src] != clusters[dst]) / len(edges) < 0.15
+
+
+def test_index_project_uses_cache_and_reparses_changed_files(builder, tmp_path, monkeypatch):
+    for name in ("Pk2", "Pk3"):
+        builder.create_package(name)
+        builder.create_operator("Op")
+    builder.save_project()
+    project_file = os.path.join(tmp_path, "project.etp")
+
+    parsed = []
+    original = SCADEIndex.index_file
+    monkeypatch.setattr(SCADEIndex, "index_file", lambda path, name=None: parsed.append(name) or original(path, name))
+    first = SCADEIndex.index_project(project_file, workers=1)
+    assert sorted(parsed) == ["Pk.xscade", "Pk2.xscade", "Pk3.xscade"]
+
+    parsed.clear()
+    second = SCADEIndex.index_project(project_file, workers=1)
+    assert parsed == []
+    assert sorted(second.operators) == sorted(first.operators) == ["Pk2::Op", "Pk3::Op", "Pk::Op"]
+
+    builder.switch_to_operator_by_path("Pk2::Op/")
+    builder.create_operator("Op2")
+    builder.save_project()
+    SCADEIndex.index_project(project_file, workers=1)
+    assert parsed == ["Pk2.xscade"]
+
+
+def test_malformed_file_is_reported_and_others_still_validated(builder, tmp_path):
+    builder.create_package("Pk2")
+    builder.create_operator("Op")
+    builder.save_project()
+    with open(os.path.join(tmp_path, "Pk2.xscade"), "a", encoding="utf-8") as stream:
+        stream.write("<broken")
+
+    issues = builder.validate_project(workers=1)
+    assert [issue[:2] for issue in issues if "XML" in issue[3]] == [("error", "Pk2.xscade")]
+    assert "Pk::Op" in builder.project_index.operators
+    assert builder.project_index.unreadable == {"Pk2.xscade"}